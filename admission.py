@@ -0,0 +1,128 @@
+"""Admission control: reject excess load before doing any work for it
+
+Under a burst, Gunicorn's listen backlog keeps accepting connections that
+workers will only reach after the client has given up. Scoring them anyway
+just delays everyone behind them. Three cheap checks run before the body is
+read:
+
+* queue wait - how long the request waited before a worker picked it up, from
+  the `X-Request-Start` header that Heroku, Render and nginx
+  (`proxy_set_header X-Request-Start "t=${msec}"`) add
+* in-flight  - requests in progress across all workers (`InFlightTracker`)
+* rate limit - a token bucket per client (`TokenBucketLimiter`)
+
+Both trackers keep their state in shared memory allocated before the fork, like
+metrics.py, so the limits hold for the whole server, not per worker.
+"""
+import math
+import os
+import time
+import zlib
+
+import numpy as np
+
+from metrics import SharedArena
+
+
+def queue_wait(header_value, now=None):
+    """Seconds since the X-Request-Start time, or None if the header is unusable
+
+    Accepts `t=<epoch>` or a bare epoch in seconds, milliseconds, microseconds
+    or nanoseconds (the unit is inferred from the magnitude).
+    """
+    if not header_value:
+        return None
+    try:
+        started = float(header_value[2:] if header_value.startswith('t=') else header_value)
+    except ValueError:
+        return None
+    for threshold, scale in ((1e17, 1e9), (1e14, 1e6), (1e11, 1e3)):
+        if started > threshold:
+            started /= scale
+            break
+    return max(0.0, (time.time() if now is None else now) - started)
+
+
+def retry_after_header(seconds):
+    """Whole seconds for a Retry-After header, at least 1"""
+    return str(max(1, math.ceil(seconds)))
+
+
+class InFlightTracker:
+    """Requests in progress across worker processes
+
+    Each process counts in its own slot of a shared (pid, count) table, so the
+    master can clear the slot of a worker that died mid-request (see
+    gunicorn_config.child_exit) instead of leaking its count forever.
+    """
+
+    def __init__(self, slots=512):
+        self.arena = SharedArena(slots * 2)
+        self.lock = self.arena.lock
+        self.table = self.arena.values.reshape(slots, 2)
+        self._pid = None
+        self._slot = None
+
+    def _claim_slot(self):
+        # Called with the lock held, once per process
+        pid = os.getpid()
+        mine = np.flatnonzero(self.table[:, 0] == pid)
+        free = mine if len(mine) else np.flatnonzero(self.table[:, 0] == 0)
+        self._slot = int(free[0]) if len(free) else None
+        if self._slot is not None:
+            self.table[self._slot] = (pid, 0)
+        self._pid = pid
+
+    def try_enter(self, limit=0):
+        """Count one request in, unless `limit` (> 0) requests are already in flight"""
+        with self.lock:
+            if self._pid != os.getpid():
+                self._claim_slot()
+            if limit and self.table[:, 1].sum() >= limit:
+                return False
+            if self._slot is not None:
+                self.table[self._slot, 1] += 1
+            return True
+
+    def leave(self):
+        """Count one request out"""
+        if self._slot is not None and self._pid == os.getpid():
+            with self.lock:
+                self.table[self._slot, 1] -= 1
+
+    def release(self, pid):
+        """Forget a process that exited, including requests it never finished"""
+        with self.lock:
+            self.table[self.table[:, 0] == pid] = 0
+
+    def total(self):
+        return int(self.table[:, 1].sum())
+
+
+class TokenBucketLimiter:
+    """Token bucket per client: `rate` requests per second, bursts up to `burst`
+
+    Clients are hashed into a fixed number of shared buckets, so two clients
+    occasionally share one; with the default 4096 buckets that is rare for
+    the number of clients a single deployment sees.
+    """
+
+    def __init__(self, rate, burst=None, buckets=4096):
+        self.rate = float(rate)
+        self.burst = float(burst or max(1.0, rate))
+        self.buckets = buckets
+        self.arena = SharedArena(buckets * 2)
+        self.lock = self.arena.lock
+        # (tokens, last refill) per bucket; a zero timestamp refills to `burst`
+        self.table = self.arena.values.reshape(buckets, 2)
+
+    def acquire(self, client, now=None):
+        """Take a token for `client`; returns 0.0, or the seconds until one is available"""
+        bucket = self.table[zlib.crc32(client.encode('utf-8')) % self.buckets]
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            allowed = tokens >= 1.0
+            bucket[0] = tokens - 1.0 if allowed else tokens
+            bucket[1] = now
+        return 0.0 if allowed else (1.0 - tokens) / self.rate
@@ -1,10 +1,33 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Request, current_app, g, request, jsonify, send_file, stream_with_context
 from flask_cors import CORS
-import joblib
+from werkzeug.exceptions import HTTPException
 import numpy as np
 import os
+import gc
+import hashlib
+import hmac
 import logging
+import random
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
+from urllib.parse import quote, urlencode
+
+import columnar
+import streaming
+from admission import InFlightTracker, TokenBucketLimiter, queue_wait, retry_after_header
+from audit import AuditLog
+from batching import MicroBatcher
+from metrics import MetricsRegistry, StageTimer
+from serialization import DEFAULT_CSP, JSON_HEADERS, SECURITY_HEADERS, dumps, json_response, predict_response
+from static_assets import StaticAsset, cache_control
+from inference import FEATURES, FusedLinearEngine, build_engine, read_artifact
+from memory_usage import memory_usage
+from model_registry import DEFAULT_ROUTE, ModelRegistry, read_manifest
+from profiler import RequestProfiler
+from sensitivity import grid_axes, grid_features
+from validation import validate_columns, validate_input, validate_matrix, validate_records
 
 # Configure logging
 logging.basicConfig(
@@ -13,7 +36,24 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Endpoints whose payload limit differs from MAX_CONTENT_LENGTH
+ENDPOINT_CONTENT_LIMITS = {
+    'predict_batch': 'BATCH_MAX_CONTENT_LENGTH',
+    'predict_stream': 'STREAM_MAX_CONTENT_LENGTH',
+}
+
+class PredictionRequest(Request):
+    """Request class that applies per-endpoint payload limits"""
+
+    @property
+    def max_content_length(self):
+        config_key = ENDPOINT_CONTENT_LIMITS.get(self.endpoint)
+        if config_key and current_app:
+            return current_app.config[config_key]
+        return super().max_content_length
+
 app = Flask(__name__)
+app.request_class = PredictionRequest
 
 # Configure CORS - Allow all origins for public API
 CORS(app, resources={
@@ -36,266 +76,571 @@ app.config['JSON_SORT_KEYS'] = False
 app.config['JSONIFY_PRETTYPRINT_REGULAR'] = False
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024  # 16 KB max request size
 
+# Batch prediction limits (independent of MAX_CONTENT_LENGTH)
+app.config['BATCH_MAX_CONTENT_LENGTH'] = int(os.environ.get('BATCH_MAX_CONTENT_LENGTH', 4 * 1024 * 1024))
+app.config['BATCH_MAX_ROWS'] = int(os.environ.get('BATCH_MAX_ROWS', 10000))
+
+# What-if grids: maximum points (product of the swept features' lengths) per request
+app.config['GRID_MAX_POINTS'] = int(os.environ.get('GRID_MAX_POINTS', 10000))
+
+# Streaming prediction settings (no body limit unless configured)
+app.config['STREAM_MAX_CONTENT_LENGTH'] = int(os.environ['STREAM_MAX_CONTENT_LENGTH']) if os.environ.get('STREAM_MAX_CONTENT_LENGTH') else None
+app.config['STREAM_CHUNK_ROWS'] = int(os.environ.get('STREAM_CHUNK_ROWS', 1000))
+app.config['STREAM_READ_SIZE'] = int(os.environ.get('STREAM_READ_SIZE', 64 * 1024))
+
+# Prediction cache: max entries (0 disables) and time-to-live in seconds (0 = no expiry)
+app.config['PREDICTION_CACHE_SIZE'] = int(os.environ.get('PREDICTION_CACHE_SIZE', 10000))
+app.config['PREDICTION_CACHE_TTL'] = float(os.environ.get('PREDICTION_CACHE_TTL', 300))
+
+# Micro-batching of concurrent /predict calls (use with a threaded worker class)
+app.config['MICRO_BATCH_ENABLED'] = os.environ.get('MICRO_BATCH_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+app.config['MICRO_BATCH_MAX_SIZE'] = int(os.environ.get('MICRO_BATCH_MAX_SIZE', 64))
+app.config['MICRO_BATCH_MAX_WAIT_MS'] = float(os.environ.get('MICRO_BATCH_MAX_WAIT_MS', 2))
+app.config['MICRO_BATCH_TIMEOUT'] = float(os.environ.get('MICRO_BATCH_TIMEOUT', 5))
+
+# Hot reload: poll MODEL_PATH/SCALER_PATH every N seconds (0 disables), and
+# allow POST /admin/reload with "Authorization: Bearer <ADMIN_TOKEN>"
+app.config['MODEL_WATCH_INTERVAL'] = float(os.environ.get('MODEL_WATCH_INTERVAL', 10))
+# Changed files are only loaded once none of them has been modified for this
+# many seconds, so a deploy that writes the model and then the scaler is never
+# caught in between (new model, old scaler)
+app.config['MODEL_SETTLE_SECONDS'] = float(os.environ.get('MODEL_SETTLE_SECONDS', 2))
+app.config['ADMIN_TOKEN'] = os.environ.get('ADMIN_TOKEN', '')
+
+# Inference engine: 'fused' (scaler folded into coefficients) or 'sklearn'
+app.config['INFERENCE_ENGINE'] = os.environ.get('INFERENCE_ENGINE', 'fused')
+
+# Browser cache lifetime for the UI at / in seconds (0 = revalidate every time;
+# the ETag still turns unchanged reloads into 304s)
+app.config['UI_CACHE_MAX_AGE'] = int(os.environ.get('UI_CACHE_MAX_AGE', 86400))
+
+# How long CDNs and browsers may reuse a GET /predict response before
+# revalidating its ETag (which changes with the model version)
+app.config['PREDICT_GET_MAX_AGE'] = int(os.environ.get('PREDICT_GET_MAX_AGE', 60))
+
+# Prediction audit log (JSONL, appended by a background thread per worker);
+# disabled unless AUDIT_LOG_PATH is set
+app.config['AUDIT_LOG_PATH'] = os.environ.get('AUDIT_LOG_PATH', '')
+app.config['AUDIT_QUEUE_SIZE'] = int(os.environ.get('AUDIT_QUEUE_SIZE', 10000))
+app.config['AUDIT_BATCH_SIZE'] = int(os.environ.get('AUDIT_BATCH_SIZE', 500))
+app.config['AUDIT_FLUSH_INTERVAL'] = float(os.environ.get('AUDIT_FLUSH_INTERVAL', 1.0))
+app.config['AUDIT_MAX_BYTES'] = int(os.environ.get('AUDIT_MAX_BYTES', 100 * 1024 * 1024))
+app.config['AUDIT_BACKUP_COUNT'] = int(os.environ.get('AUDIT_BACKUP_COUNT', 5))
+
+# Model format: 'joblib' (MODEL_PATH + SCALER_PATH, needs scikit-learn) or
+# 'artifact' (ARTIFACT_PATH JSON from train_model.py, NumPy only)
+app.config['MODEL_FORMAT'] = os.environ.get('MODEL_FORMAT', 'joblib')
+
+# Manifest of several named artifacts and weighted routes (see model_registry.py);
+# overrides MODEL_FORMAT when set
+app.config['MODEL_REGISTRY'] = os.environ.get('MODEL_REGISTRY', '')
+
+# Admission control for the prediction endpoints (see admission.py); 0 disables a check
+app.config['ADMISSION_MAX_IN_FLIGHT'] = int(os.environ.get('ADMISSION_MAX_IN_FLIGHT', 0))
+app.config['ADMISSION_MAX_QUEUE_WAIT_MS'] = float(os.environ.get('ADMISSION_MAX_QUEUE_WAIT_MS', 0))
+app.config['ADMISSION_RETRY_AFTER'] = float(os.environ.get('ADMISSION_RETRY_AFTER', 1))
+app.config['RATE_LIMIT_PER_SECOND'] = float(os.environ.get('RATE_LIMIT_PER_SECOND', 0))
+app.config['RATE_LIMIT_BURST'] = float(os.environ.get('RATE_LIMIT_BURST', 0)) or None
+# Header identifying the client (e.g. X-API-Key); the peer address when unset
+app.config['RATE_LIMIT_KEY_HEADER'] = os.environ.get('RATE_LIMIT_KEY_HEADER', '')
+
+# Request profiling (see profiler.py): a random fraction of requests, plus any
+# request sent with `X-Profile: 1` and the admin token
+app.config['PROFILE_SAMPLE_RATE'] = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+app.config['PROFILE_OUTPUT'] = os.environ.get('PROFILE_OUTPUT', '')
+app.config['PROFILE_DUMP_EVERY'] = int(os.environ.get('PROFILE_DUMP_EVERY', 100))
+
+class PredictionCache:
+    """Thread-safe LRU cache of predictions with optional TTL"""
+
+    def __init__(self, maxsize, ttl=0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss"""
+        if self.maxsize <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Store value for key, evicting the least recently used entry if full"""
+        if self.maxsize <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl > 0 else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop all entries (statistics are kept)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return size and hit/miss/eviction counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.maxsize > 0,
+                'size': len(self._entries),
+                'max_size': self.maxsize,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+prediction_cache = PredictionCache(app.config['PREDICTION_CACHE_SIZE'], app.config['PREDICTION_CACHE_TTL'])
+
+# Metrics shared by all gunicorn workers (declared before the fork, see metrics.py)
+METRIC_ENDPOINTS = (
+    'home', 'health', 'metrics', 'predict', 'predict_get', 'predict_grid', 'predict_batch', 'predict_stream',
+    'admin_reload', 'admin_profile', 'other'
+)
+METRIC_STATUS_CODES = (
+    '200', '304', '400', '401', '404', '405', '413', '415', '429', '500', '503', 'other'
+)
+PREDICT_STAGES = ('parse', 'validate', 'cache', 'scale', 'predict', 'serialize', 'audit')
+
+metrics = MetricsRegistry('house_price')
+REQUESTS = metrics.counter(
+    'requests_total', 'HTTP requests by endpoint and status code',
+    {'endpoint': METRIC_ENDPOINTS, 'status': METRIC_STATUS_CODES}
+)
+REQUEST_LATENCY = metrics.histogram(
+    'request_duration_seconds', 'Time spent handling requests by endpoint',
+    {'endpoint': METRIC_ENDPOINTS}, quantiles=True
+)
+STAGE_LATENCY = metrics.histogram(
+    'predict_stage_duration_seconds', 'Time spent in each stage of /predict',
+    {'stage': PREDICT_STAGES}, quantiles=True
+)
+MODEL_LOADS = metrics.counter('model_loads_total', 'Model load attempts by outcome', {'outcome': ('success', 'failure')})
+MODEL_LOAD_SECONDS = metrics.gauge('model_load_duration_seconds', 'Duration of the most recent successful model load')
+# Bumped by POST /admin/reload; every worker reloads when it sees a new value
+MODEL_RELOAD_GENERATION = metrics.gauge('model_reload_generation', 'Number of reloads requested through /admin/reload')
+ADMISSION_REASONS = ('queue_wait', 'rate_limit', 'in_flight')
+ADMISSION_REJECTIONS = metrics.counter(
+    'admission_rejections_total', 'Prediction requests shed before any work was done, by reason',
+    {'reason': ADMISSION_REASONS}
+)
+IN_FLIGHT = metrics.gauge('in_flight_requests', 'Prediction requests in progress across all workers')
+QUEUE_WAIT = metrics.histogram(
+    'queue_wait_seconds', 'Time between X-Request-Start and a worker picking up a prediction request',
+    quantiles=True
+)
+AUDIT_RECORDS = metrics.counter(
+    'audit_records_total', 'Prediction audit records written or dropped (queue full or write error)',
+    {'outcome': ('written', 'dropped')}
+)
+
+# In-flight requests and rate-limit buckets, shared by all workers like the metrics
+ADMISSION_ENDPOINTS = frozenset(('predict', 'predict_get', 'predict_grid', 'predict_batch', 'predict_stream'))
+in_flight = InFlightTracker()
+rate_limiter = TokenBucketLimiter(
+    app.config['RATE_LIMIT_PER_SECOND'], app.config['RATE_LIMIT_BURST']
+) if app.config['RATE_LIMIT_PER_SECOND'] > 0 else None
+
+profiler = RequestProfiler(app.config['PROFILE_OUTPUT'] or None, app.config['PROFILE_DUMP_EVERY'])
+
+# Rejections are prebuilt so shedding load costs as little as possible
+OVERLOADED_BODY = dumps({'error': 'Service overloaded', 'message': 'The server is busy. Please retry later.'})
+RATE_LIMITED_BODY = dumps({'error': 'Too many requests', 'message': 'Rate limit exceeded. Please retry later.'})
+
 # Load model and scaler
 model = None
 scaler = None
+engine = None
+model_registry = None
 model_loaded_at = None
+model_signature = None
+rejected_signature = None
+reload_lock = threading.Lock()
+# The MODEL_RELOAD_GENERATION this process has reloaded for
+reload_generation = 0.0
 
-def load_model():
-    """Load ML model and scaler with proper error handling"""
-    global model, scaler, model_loaded_at
+# Reference input used to validate and warm up a freshly loaded model
+WARMUP_FEATURES = np.array([[3.0, 2.0, 2000.0, 10.0]])
+
+# Set by gunicorn (see gunicorn_config.post_worker_init) so long-running
+# responses can tell the arbiter the worker is still alive
+worker_heartbeat = None
+
+def notify_worker():
+    """Signal the gunicorn arbiter that this worker is making progress"""
+    if worker_heartbeat is not None:
+        worker_heartbeat()
+
+def model_paths():
+    """Return the configured model files: (artifact_path,) or (model_path, scaler_path)
+
+    With a model registry: the manifest followed by every artifact it lists.
+    """
+    if app.config['MODEL_REGISTRY']:
+        manifest = app.config['MODEL_REGISTRY']
+        return (manifest,) + tuple(read_manifest(manifest)['models'].values())
+    if app.config['MODEL_FORMAT'] == 'artifact':
+        return (os.environ.get('ARTIFACT_PATH', 'house_price_model.json'),)
+    return (
+        os.environ.get('MODEL_PATH', 'house_price_model.joblib'),
+        os.environ.get('SCALER_PATH', 'scaler.joblib')
+    )
+
+def artifact_signature(paths):
+    """Return (mtime, size) for each artifact, used to detect changes on disk"""
+    return tuple((stat.st_mtime_ns, stat.st_size) for stat in map(os.stat, paths))
+
+def load_artifacts(model_path, scaler_path):
+    """Load, validate and warm up a model/scaler pair without touching the live one"""
+    if not os.path.exists(model_path):
+        logger.error(f"Model file not found: {model_path}")
+        raise FileNotFoundError(f"Model file not found: {model_path}")
+
+    if not os.path.exists(scaler_path):
+        logger.error(f"Scaler file not found: {scaler_path}")
+        raise FileNotFoundError(f"Scaler file not found: {scaler_path}")
+
+    signature = artifact_signature((model_path, scaler_path))
+    version = files_version((model_path, scaler_path))
+
+    # Imported here so the artifact format never loads joblib or sklearn
+    import joblib
+    new_model = joblib.load(model_path)
+    new_scaler = joblib.load(scaler_path)
+
+    engine_name = app.config['INFERENCE_ENGINE']
     try:
-        model_path = os.environ.get('MODEL_PATH', 'house_price_model.joblib')
-        scaler_path = os.environ.get('SCALER_PATH', 'scaler.joblib')
+        new_engine = build_engine(engine_name, new_model, new_scaler, version=version)
+    except ValueError as e:
+        logger.warning(f"Cannot use '{engine_name}' inference engine ({str(e)}), falling back to sklearn")
+        new_engine = build_engine('sklearn', new_model, new_scaler, version=version)
 
-        if not os.path.exists(model_path):
-            logger.error(f"Model file not found: {model_path}")
-            raise FileNotFoundError(f"Model file not found: {model_path}")
+    warm_up(new_engine)
+    return new_model, new_scaler, new_engine, signature
 
-        if not os.path.exists(scaler_path):
-            logger.error(f"Scaler file not found: {scaler_path}")
-            raise FileNotFoundError(f"Scaler file not found: {scaler_path}")
+def load_serving_artifact(artifact_path):
+    """Load, validate and warm up a JSON serving artifact (no sklearn required)"""
+    if not os.path.exists(artifact_path):
+        logger.error(f"Artifact file not found: {artifact_path}")
+        raise FileNotFoundError(f"Artifact file not found: {artifact_path}")
 
-        model = joblib.load(model_path)
-        scaler = joblib.load(scaler_path)
-        model_loaded_at = datetime.utcnow().isoformat()
+    signature = artifact_signature((artifact_path,))
+    version = files_version((artifact_path,))
 
-        logger.info("Model and scaler loaded successfully!")
-        return True
-    except Exception as e:
-        logger.error(f"Error loading model: {str(e)}", exc_info=True)
+    if app.config['INFERENCE_ENGINE'] != FusedLinearEngine.name:
+        logger.warning(f"'{app.config['INFERENCE_ENGINE']}' inference engine needs joblib models, using fused")
+    new_engine = FusedLinearEngine.from_artifact(read_artifact(artifact_path))
+    new_engine.version = version
+
+    warm_up(new_engine)
+    return None, None, new_engine, signature
+
+def load_model_registry(manifest_path):
+    """Load, validate and warm up every model of a registry manifest"""
+    manifest = read_manifest(manifest_path)
+    paths = manifest['models']
+    for path in paths.values():
+        if not os.path.exists(path):
+            logger.error(f"Artifact file not found: {path}")
+            raise FileNotFoundError(f"Artifact file not found: {path}")
+
+    signature = artifact_signature((manifest_path,) + tuple(paths.values()))
+    new_registry = ModelRegistry(
+        {name: read_artifact(path) for name, path in paths.items()},
+        manifest['routes'],
+        versions={name: files_version((path,)) for name, path in paths.items()},
+        paths=paths
+    )
+    for new_engine in new_registry.engines.values():
+        warm_up(new_engine)
+    return new_registry, signature
+
+def files_version(paths):
+    """Short sha256 of the artifact files' contents, used as the model version"""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+    return digest.hexdigest()[:12]
+
+def warm_up(new_engine):
+    """Validate a freshly loaded engine with a test prediction, warming the code path"""
+    warmup = np.asarray(new_engine.predict(WARMUP_FEATURES))
+    if warmup.shape != (1,) or not np.all(np.isfinite(warmup)):
+        raise ValueError(f"Model failed warm-up prediction (got {warmup!r})")
+
+def load_model():
+    """Load ML model and scaler with proper error handling
+
+    New artifacts are loaded and warmed up next to the live ones, then swapped
+    in. Scoring only reads the `engine` reference, so requests already in
+    flight finish on the model they started with. On failure the previous
+    model keeps serving.
+    """
+    global model, scaler, engine, model_registry, model_loaded_at, model_signature
+    with reload_lock:
+        started = time.perf_counter()
+        try:
+            if app.config['MODEL_REGISTRY']:
+                new_registry, signature = load_model_registry(app.config['MODEL_REGISTRY'])
+                new_model = new_scaler = None
+                # Requests that are not routed (health, micro-batching) use the main default model
+                new_engine = new_registry.primary
+            else:
+                loader = load_serving_artifact if app.config['MODEL_FORMAT'] == 'artifact' else load_artifacts
+                new_model, new_scaler, new_engine, signature = loader(*model_paths())
+                new_registry = None
+
+            model, scaler = new_model, new_scaler
+            model_registry = new_registry
+            engine = new_engine
+            model_signature = signature
+            model_loaded_at = datetime.utcnow().isoformat()
+
+            # Cached predictions belong to the previous model
+            prediction_cache.clear()
+
+            with metrics.lock:
+                MODEL_LOADS.inc(('success',))
+                MODEL_LOAD_SECONDS.set(time.perf_counter() - started)
+
+            logger.info(f"Model and scaler loaded successfully! (version: {engine.version}, engine: {engine.name})")
+            return True
+        except Exception as e:
+            with metrics.lock:
+                MODEL_LOADS.inc(('failure',))
+            logger.error(f"Error loading model: {str(e)}", exc_info=True)
+            return False
+
+def check_for_model_update():
+    """Reload the model if its files changed on disk since it was loaded"""
+    global rejected_signature
+    try:
+        signature = artifact_signature(model_paths())
+    except (OSError, ValueError):
+        return False
+
+    # Skip unchanged files and files that already failed validation
+    if signature == model_signature or signature == rejected_signature:
         return False
 
+    # Wait until every file has settled; a later poll picks the change up
+    newest = max(mtime_ns for mtime_ns, _ in signature) / 1e9
+    if time.time() - newest < app.config['MODEL_SETTLE_SECONDS']:
+        logger.info("Model files changed on disk, waiting for them to settle")
+        return False
+
+    logger.info("Model files changed on disk, reloading")
+    if load_model():
+        return True
+    rejected_signature = signature
+    return False
+
+watcher_pid = None
+
+def start_model_watcher():
+    """Start a thread in this process that reloads the model when its files change"""
+    global watcher_pid
+    interval = app.config['MODEL_WATCH_INTERVAL']
+    if interval <= 0 or watcher_pid == os.getpid():
+        return
+
+    def watch():
+        while True:
+            time.sleep(interval)
+            try:
+                check_for_model_update()
+            except Exception as e:
+                logger.error(f"Model watcher error: {str(e)}", exc_info=True)
+
+    threading.Thread(target=watch, name='model-watcher', daemon=True).start()
+    watcher_pid = os.getpid()
+
+def select_model(data=None):
+    """Return (model_name, engine) for this request, or None if it names an unknown model
+
+    The model or route comes from the `model` field of a JSON object body, then
+    the `model` query parameter, then the X-Model header. X-Routing-Key makes
+    weighted splits sticky. Without a registry every request gets 'default'.
+    """
+    if model_registry is None:
+        return 'default', engine
+    selector = data.get('model') if isinstance(data, dict) else None
+    if selector is None:
+        selector = request.args.get('model') or request.headers.get('X-Model')
+    return model_registry.route(selector, request.headers.get('X-Routing-Key'))
+
+def unknown_model_response(request_id):
+    logger.warning(f"[{request_id}] Unknown model or route requested")
+    return jsonify({
+        'error': 'Unknown model',
+        'message': f'Model must be one of: {", ".join(model_registry.names + list(model_registry.routes))}'
+    }), 400
+
+def model_headers(model_name, scoring_engine):
+    """Response headers naming the model that scored a routed request"""
+    if model_registry is None:
+        return []
+    return [('X-Model', model_name), ('X-Model-Version', scoring_engine.version or '')]
+
+def predict_features(features, scoring_engine=None):
+    """Scale a feature matrix and predict prices for every row at once"""
+    return (scoring_engine or engine).predict(features)
+
+micro_batcher = MicroBatcher(
+    predict_features,
+    max_batch_size=app.config['MICRO_BATCH_MAX_SIZE'],
+    max_wait_ms=app.config['MICRO_BATCH_MAX_WAIT_MS']
+) if app.config['MICRO_BATCH_ENABLED'] else None
+
+def count_audit_writes(records):
+    with metrics.lock:
+        AUDIT_RECORDS.inc(('written',), records)
+
+def count_audit_drops(records):
+    with metrics.lock:
+        AUDIT_RECORDS.inc(('dropped',), records)
+
+audit_log = AuditLog(
+    app.config['AUDIT_LOG_PATH'],
+    max_queue=app.config['AUDIT_QUEUE_SIZE'],
+    batch_size=app.config['AUDIT_BATCH_SIZE'],
+    flush_interval=app.config['AUDIT_FLUSH_INTERVAL'],
+    max_bytes=app.config['AUDIT_MAX_BYTES'],
+    backup_count=app.config['AUDIT_BACKUP_COUNT'],
+    on_write=count_audit_writes,
+    on_drop=count_audit_drops
+) if app.config['AUDIT_LOG_PATH'] else None
+
+def audit(request_id, endpoint, scoring_engine, started, **fields):
+    """Queue an audit record without blocking; a full queue drops and counts it"""
+    record = {
+        'request_id': request_id,
+        'endpoint': endpoint,
+        'model': g.get('model_name'),
+        'model_version': scoring_engine.version,
+        'latency_ms': round((time.perf_counter() - started) * 1000.0, 3),
+        'pid': os.getpid(),
+    }
+    record.update(fields)
+    if not audit_log.record(record):
+        count_audit_drops(1)
+
+def warm_worker():
+    """Score and serialize one house with every engine, outside any request
+
+    Called in each gunicorn worker right after the fork (see
+    gunicorn_config.post_worker_init). A new process starts its BLAS threads
+    and faults in code pages on its first NumPy call. Otherwise the first
+    request each worker serves pays for that. Nothing is cached, counted or
+    audited.
+    """
+    engines = list(model_registry.engines.values()) if model_registry is not None else [engine]
+    _, values = validate_input(dict(zip(FEATURES, WARMUP_FEATURES[0].tolist())))
+    checked = validate_records([values, values])
+    for scoring_engine in engines:
+        if scoring_engine is not None:
+            predict_response(scoring_engine.predict(checked.features)[0], values, 'warm-up')
+
+# Reading smaps_rollup costs about a millisecond, too much for every load
+# balancer probe of /health, so each worker reuses its snapshot for a while
+MEMORY_STATS_TTL = 5.0
+memory_snapshot = (None, 0.0, None)  # (pid, taken at, stats)
+
+def memory_stats():
+    """Shared vs private memory of this worker, for /health (at most MEMORY_STATS_TTL seconds old)"""
+    global memory_snapshot
+    pid, taken, stats = memory_snapshot
+    now = time.monotonic()
+    if pid != os.getpid() or now - taken >= MEMORY_STATS_TTL:
+        stats = dict(memory_usage(), pid=os.getpid(), gc_frozen_objects=gc.get_freeze_count())
+        memory_snapshot = (os.getpid(), now, stats)
+    return stats
+
 # Load model on startup
 if not load_model():
     logger.critical("Failed to load model on startup!")
 
+# Per-model metrics, labelled with the models known at startup (still before the
+# fork). Models added by a later reload are counted under 'other'.
+MODEL_NAMES = tuple(model_registry.names if model_registry is not None else ['default']) + ('other',)
+MODEL_REQUESTS = metrics.counter(
+    'model_requests_total', 'Prediction requests by the model that scored them', {'model': MODEL_NAMES}
+)
+MODEL_LATENCY = metrics.histogram(
+    'model_request_duration_seconds', 'Prediction request latency by model', {'model': MODEL_NAMES}, quantiles=True
+)
+
+def load_ui_asset():
+    """Read and precompress index.html once, at startup"""
+    try:
+        return StaticAsset(
+            os.path.join(app.root_path, 'index.html'),
+            'text/html; charset=utf-8',
+            max_age=app.config['UI_CACHE_MAX_AGE'],
+            # The page uses inline styles and scripts
+            headers={'Content-Security-Policy': "default-src 'self'; style-src 'self' 'unsafe-inline'; script-src 'self' 'unsafe-inline'"}
+        )
+    except OSError as e:
+        logger.error(f"UI not available: {str(e)}")
+        return None
+
+ui_asset = load_ui_asset()
+
 @app.route('/', methods=['GET'])
 def home():
-    """Root endpoint - serve HTML interface directly"""
-    html = """<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>House Price Predictor</title>
-    <style>
-        * { margin: 0; padding: 0; box-sizing: border-box; }
-        html, body { width: 100%; height: 100%; }
-        body { 
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-            display: flex;
-            justify-content: center;
-            align-items: center;
-            padding: 20px;
-        }
-        .container {
-            background: white;
-            border-radius: 12px;
-            padding: 40px;
-            box-shadow: 0 20px 60px rgba(0, 0, 0, 0.3);
-            max-width: 520px;
-            width: 100%;
-        }
-        h1 { color: #1a1a1a; text-align: center; margin-bottom: 5px; font-size: 32px; }
-        .subtitle { color: #666; text-align: center; margin-bottom: 25px; font-size: 14px; }
-        .form-row { display: grid; grid-template-columns: 1fr 1fr; gap: 15px; margin-bottom: 15px; }
-        .form-group { margin-bottom: 15px; }
-        label { display: block; margin-bottom: 6px; color: #333; font-weight: 600; font-size: 13px; }
-        input { 
-            width: 100%;
-            padding: 11px 12px;
-            border: 1px solid #ddd;
-            border-radius: 6px;
-            font-size: 14px;
-            transition: all 0.2s;
-        }
-        input:focus { outline: none; border-color: #667eea; background-color: #f9f9ff; box-shadow: 0 0 0 3px rgba(102, 126, 234, 0.1); }
-        button {
-            width: 100%;
-            padding: 12px;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            border: none;
-            border-radius: 6px;
-            font-weight: 600;
-            font-size: 15px;
-            cursor: pointer;
-            transition: all 0.3s;
-            margin-top: 5px;
-        }
-        button:hover { transform: translateY(-2px); box-shadow: 0 10px 20px rgba(102, 126, 234, 0.4); }
-        button:active { transform: translateY(0); }
-        button:disabled { opacity: 0.6; cursor: not-allowed; }
-        .api-section { background: #f5f5f5; padding: 15px; border-radius: 6px; margin-bottom: 20px; }
-        .api-section label { margin-bottom: 6px; }
-        .api-section input { font-size: 12px; margin-bottom: 5px; }
-        .api-section small { color: #999; font-size: 11px; display: block; margin-top: 5px; }
-        .result { 
-            background: #f0fef5;
-            border: 2px solid #10b981;
-            border-radius: 8px;
-            padding: 20px;
-            text-align: center;
-            display: none;
-            margin-top: 20px;
-        }
-        .result.show { display: block; animation: slideIn 0.3s ease; }
-        @keyframes slideIn { from { opacity: 0; transform: translateY(-10px); } to { opacity: 1; transform: translateY(0); } }
-        .result-label { color: #666; font-size: 12px; text-transform: uppercase; letter-spacing: 1px; margin-bottom: 5px; }
-        .result-price { font-size: 42px; font-weight: 700; color: #10b981; margin-bottom: 8px; }
-        .result-details { color: #666; font-size: 12px; }
-        .error { 
-            background: #fee;
-            border: 1px solid #fcc;
-            color: #c33;
-            padding: 12px;
-            border-radius: 6px;
-            margin-top: 15px;
-            display: none;
-            font-size: 13px;
-        }
-        .error.show { display: block; }
-        @media (max-width: 480px) { .form-row { grid-template-columns: 1fr; } .container { padding: 25px; } h1 { font-size: 26px; } }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>🏠 House Price Predictor</h1>
-        <p class="subtitle">Get an accurate estimate in seconds</p>
-
-        <div class="api-section">
-            <label>API Endpoint</label>
-            <input type="text" id="apiUrl" value="http://127.0.0.1:5000" placeholder="http://127.0.0.1:5000">
-            <small>Update if running on different server</small>
-        </div>
-
-        <form id="predictionForm">
-            <div class="form-row">
-                <div class="form-group">
-                    <label>Bedrooms</label>
-                    <input type="number" id="bedrooms" min="1" max="10" value="3" required>
-                </div>
-                <div class="form-group">
-                    <label>Bathrooms</label>
-                    <input type="number" id="bathrooms" min="1" max="10" step="0.5" value="2" required>
-                </div>
-            </div>
-
-            <div class="form-row">
-                <div class="form-group">
-                    <label>Square Feet</label>
-                    <input type="number" id="sqft" min="100" max="50000" value="2000" required>
-                </div>
-                <div class="form-group">
-                    <label>Age (years)</label>
-                    <input type="number" id="age" min="0" max="100" value="10" required>
-                </div>
-            </div>
-
-            <button type="submit">Predict Price</button>
-        </form>
-
-        <div id="result" class="result">
-            <div class="result-label">Estimated Value</div>
-            <div class="result-price" id="predictedPrice"></div>
-            <div class="result-details" id="resultDetails"></div>
-        </div>
-
-        <div id="error" class="error"></div>
-    </div>
-
-    <script>
-        const form = document.getElementById('predictionForm');
-        const resultDiv = document.getElementById('result');
-        const errorDiv = document.getElementById('error');
-        const priceElement = document.getElementById('predictedPrice');
-        const resultDetails = document.getElementById('resultDetails');
-        const apiUrlInput = document.getElementById('apiUrl');
-        const submitButton = form.querySelector('button');
-
-        const savedApiUrl = localStorage.getItem('hppApiUrl');
-        if (savedApiUrl) apiUrlInput.value = savedApiUrl;
-
-        apiUrlInput.addEventListener('change', () => {
-            const apiUrl = apiUrlInput.value.trim();
-            if (apiUrl) localStorage.setItem('hppApiUrl', apiUrl);
-        });
-        
-        form.addEventListener('submit', async (e) => {
-            e.preventDefault();
-            const apiUrl = apiUrlInput.value.trim();
-            if (!apiUrl) { showError('Please enter the API endpoint'); return; }
-            const formData = {
-                bedrooms: parseFloat(document.getElementById('bedrooms').value),
-                bathrooms: parseFloat(document.getElementById('bathrooms').value),
-                sqft: parseFloat(document.getElementById('sqft').value),
-                age: parseFloat(document.getElementById('age').value)
-            };
-            if (Object.values(formData).some(v => isNaN(v) || v < 0)) {
-                showError('Please enter valid values');
-                return;
-            }
-            resultDiv.classList.remove('show');
-            errorDiv.classList.remove('show');
-            submitButton.textContent = 'Predicting...';
-            submitButton.disabled = true;
-            try {
-                const predictUrl = apiUrl.endsWith('/') ? apiUrl + 'predict' : apiUrl + '/predict';
-                const response = await fetch(predictUrl, {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify(formData)
-                });
-                const data = await response.json();
-                if (response.ok && data.success) {
-                    const price = data.prediction;
-                    const formattedPrice = new Intl.NumberFormat('en-US', {
-                        style: 'currency', currency: 'USD',
-                        minimumFractionDigits: 0, maximumFractionDigits: 0
-                    }).format(price);
-                    priceElement.textContent = formattedPrice;
-                    resultDetails.innerHTML = '<div>' + formData.bedrooms + ' bed • ' + formData.bathrooms + ' bath • ' + formData.sqft.toLocaleString() + ' sqft • ' + formData.age + ' yrs</div>';
-                    resultDiv.classList.add('show');
-                } else {
-                    showError(data.message || 'Failed to get prediction');
-                }
-            } catch (error) {
-                showError('Connection error. Check the API URL');
-            } finally {
-                submitButton.textContent = 'Predict Price';
-                submitButton.disabled = false;
-            }
-        });
-        function showError(message) {
-            errorDiv.textContent = message;
-            errorDiv.classList.add('show');
-            resultDiv.classList.remove('show');
-        }
-    </script>
-</body>
-</html>"""
-    response = app.make_response(html)
-    response.headers['Cache-Control'] = 'max-age=0, no-cache, no-store, must-revalidate, private'
-    response.headers['Pragma'] = 'no-cache'
-    response.headers['Expires'] = '-1'
-    response.headers['Content-Type'] = 'text/html; charset=utf-8'
-    response.headers['Content-Security-Policy'] = "default-src 'self'; style-src 'self' 'unsafe-inline'; script-src 'self' 'unsafe-inline'"
-    return response
+    """Root endpoint - serve the precompressed HTML interface"""
+    if ui_asset is None:
+        return not_found(None)
+    return ui_asset.response(request)
 
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint with detailed diagnostics"""
     try:
-        model_loaded = model is not None and scaler is not None
+        model_loaded = engine is not None
         status_code = 200 if model_loaded else 503
 
         return jsonify({
             'status': 'healthy' if model_loaded else 'unhealthy',
             'model_loaded': model_loaded,
             'model_loaded_at': model_loaded_at,
+            'model_version': engine.version if engine is not None else None,
+            'inference_engine': engine.name if engine is not None else None,
+            'model_format': 'registry' if model_registry is not None else app.config['MODEL_FORMAT'],
+            'model_registry': model_registry.stats() if model_registry is not None else {'enabled': False},
+            'cache': prediction_cache.stats(),
+            'micro_batching': micro_batcher.stats() if micro_batcher is not None else {'enabled': False},
+            'audit_log': audit_log.stats() if audit_log is not None else {'enabled': False},
+            'admission': admission_stats(),
+            'profiling': dict(profiler.stats(), sample_rate=app.config['PROFILE_SAMPLE_RATE']),
+            'memory': memory_stats(),
             'timestamp': datetime.utcnow().isoformat(),
             'environment': os.environ.get('FLASK_ENV', 'production')
         }), status_code
@@ -306,53 +651,16 @@ def health():
             'error': 'Health check failed'
         }), 503
 
-def validate_input(data):
-    """Validate input data with proper bounds checking"""
-    required_fields = ['bedrooms', 'bathrooms', 'sqft', 'age']
-
-    # Check for missing fields
-    for field in required_fields:
-        if field not in data:
-            return False, f'Missing required field: {field}'
-
-    # Validate data types and ranges
-    try:
-        bedrooms = float(data['bedrooms'])
-        bathrooms = float(data['bathrooms'])
-        sqft = float(data['sqft'])
-        age = float(data['age'])
-
-        # Reasonable bounds checking
-        if not (0 <= bedrooms <= 20):
-            return False, 'Bedrooms must be between 0 and 20'
-
-        if not (0 <= bathrooms <= 15):
-            return False, 'Bathrooms must be between 0 and 15'
-
-        if not (100 <= sqft <= 50000):
-            return False, 'Square footage must be between 100 and 50,000'
-
-        if not (0 <= age <= 200):
-            return False, 'Age must be between 0 and 200 years'
-
-        return True, {
-            'bedrooms': bedrooms,
-            'bathrooms': bathrooms,
-            'sqft': sqft,
-            'age': age
-        }
-
-    except (ValueError, TypeError) as e:
-        return False, f'Invalid data type: {str(e)}'
-
 @app.route('/predict', methods=['POST'])
 def predict():
     """Predict house price with comprehensive error handling"""
     request_id = datetime.utcnow().isoformat()
+    timer = g.stage_timer
+    timer.skip()
 
     try:
         # Check if model is loaded
-        if model is None or scaler is None:
+        if engine is None:
             logger.error(f"[{request_id}] Model not loaded")
             return jsonify({
                 'error': 'Model not available',
@@ -375,9 +683,11 @@ def predict():
                 'error': 'Empty request',
                 'message': 'Request body cannot be empty'
             }), 400
+        timer.mark('parse')
 
         # Validate input
         is_valid, result = validate_input(data)
+        timer.mark('validate')
         if not is_valid:
             logger.warning(f"[{request_id}] Validation failed: {result}")
             return jsonify({
@@ -387,34 +697,47 @@ def predict():
 
         validated_data = result
 
-        # Extract and prepare features
-        features = np.array([[
-            validated_data['bedrooms'],
-            validated_data['bathrooms'],
-            validated_data['sqft'],
-            validated_data['age']
-        ]])
+        # Use one model for the whole request, even if a reload swaps it meanwhile
+        selected = select_model(data)
+        if selected is None:
+            return unknown_model_response(request_id)
+        g.model_name, current_engine = selected
+
+        # Serve repeated houses from the cache before scaling and predicting
+        features_row = tuple(validated_data[field] for field in FEATURES)
+        cache_key = (current_engine.version,) + features_row
+        prediction = prediction_cache.get(cache_key)
+        timer.mark('cache')
+
+        if prediction is None:
+            if micro_batcher is not None and current_engine is engine:
+                # Scored together with other concurrent requests
+                prediction = micro_batcher.predict(features_row, timeout=app.config['MICRO_BATCH_TIMEOUT'])
+            else:
+                # Extract and prepare features
+                features = np.array([features_row])
 
-        # Scale features
-        features_scaled = scaler.transform(features)
+                # Scale features
+                features_scaled = current_engine.transform(features)
+                timer.mark('scale')
 
-        # Make prediction
-        prediction = model.predict(features_scaled)[0]
+                # Make prediction
+                prediction = float(current_engine.predict_scaled(features_scaled)[0])
+            timer.mark('predict')
+            prediction_cache.put(cache_key, prediction)
 
         logger.info(f"[{request_id}] Prediction successful: {prediction}")
+        timer.skip()
 
-        return jsonify({
-            'success': True,
-            'prediction': round(float(prediction), 2),
-            'currency': 'USD',
-            'input': {
-                'bedrooms': validated_data['bedrooms'],
-                'bathrooms': validated_data['bathrooms'],
-                'sqft': validated_data['sqft'],
-                'age': validated_data['age']
-            },
-            'request_id': request_id
-        }), 200
+        response = predict_response(prediction, validated_data, request_id)
+        if model_registry is not None:
+            response.headers.extend(model_headers(g.model_name, current_engine))
+        timer.mark('serialize')
+
+        if audit_log is not None:
+            audit(request_id, 'predict', current_engine, timer.started, input=validated_data, prediction=round(prediction, 2))
+            timer.mark('audit')
+        return response, 200
 
     except ValueError as e:
         logger.error(f"[{request_id}] Value error: {str(e)}", exc_info=True)
@@ -431,17 +754,646 @@ def predict():
             'request_id': request_id
         }), 500
 
+def canonical_number(value):
+    """Shortest text for a validated float: 2000.0 -> '2000', 2.5 -> '2.5', -0.0 -> '0'"""
+    text = repr(value + 0.0)  # -0.0 + 0.0 == 0.0
+    return text[:-2] if text.endswith('.0') else text
+
+def canonical_query(values, model_name=None):
+    """Query string with the features in FEATURES order and canonical numbers
+
+    Every value is percent-encoded (spaces as %20, no reserved characters left
+    bare), so encoding the parsed canonical query again gives the same string.
+    """
+    pairs = [(field, canonical_number(values[field])) for field in FEATURES]
+    if model_name:
+        pairs.append(('model', model_name))
+    return urlencode(pairs, quote_via=quote)
+
+def canonical_selector(selector):
+    """The model selector as canonical URLs carry it: None when it changes nothing
+
+    Without a registry every selector is ignored. With one, naming the default
+    route, or the default route's only model, is the same as naming nothing.
+    """
+    if model_registry is None or not selector:
+        return None
+    names, _ = model_registry.routes[DEFAULT_ROUTE]
+    if selector == DEFAULT_ROUTE or (len(names) == 1 and selector == names[0]):
+        return None
+    return selector
+
+def prediction_etag(scoring_engine, model_name, query):
+    """ETag (unquoted) for one prediction: changes whenever the model version does"""
+    return hashlib.blake2b(f'{scoring_engine.version}|{model_name}|{query}'.encode('utf-8'), digest_size=12).hexdigest()
+
+@app.route('/predict', methods=['GET'], endpoint='predict_get')
+def predict_get():
+    """Cacheable prediction: GET /predict?bedrooms=3&bathrooms=2&sqft=2000&age=10
+
+    Equivalent queries (other parameter order or number formatting, unknown
+    parameters) are redirected to one canonical URL so shared caches store each
+    house once. Responses carry an ETag derived from the model version and the
+    inputs, and matching If-None-Match requests get a 304 without scoring.
+    """
+    request_id = datetime.utcnow().isoformat()
+
+    if engine is None:
+        logger.error(f"[{request_id}] Model not loaded")
+        return jsonify({
+            'error': 'Model not available',
+            'message': 'The prediction model is not loaded. Please contact support.'
+        }), 503
+
+    is_valid, result = validate_input(request.args)
+    if not is_valid:
+        return jsonify({
+            'error': 'Validation error',
+            'message': result
+        }), 400
+
+    requested = request.args.get('model')
+    selector = canonical_selector(requested)
+    query = canonical_query(result, selector)
+    if request.query_string.decode('utf-8', 'replace') != query:
+        response = app.redirect(f'{request.path}?{query}', 301)
+        # The canonical form never changes, so the redirect itself can be cached
+        # for long. Dropping a redundant model depends on the registry, which a
+        # reload can change, so that redirect is kept only as long as a response.
+        dropped_model = bool(requested) and selector is None
+        response.headers['Cache-Control'] = cache_control(app.config['PREDICT_GET_MAX_AGE'] if dropped_model else 86400)
+        return response
+
+    # The URL alone decides the model, so a shared cache can key on it. A model
+    # named in the X-Model header is moved into the URL instead.
+    header_model = canonical_selector(request.headers.get('X-Model')) if selector is None else None
+    if header_model:
+        response = app.redirect(f'{request.path}?{canonical_query(result, header_model)}', 302)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        response.headers['Vary'] = 'X-Model'
+        return response
+
+    if model_registry is None:
+        selected = 'default', engine
+    else:
+        selected = model_registry.route(selector, request.headers.get('X-Routing-Key'))
+    if selected is None:
+        return unknown_model_response(request_id)
+    g.model_name, current_engine = selected
+
+    # A weighted split picks a model per user (X-Routing-Key), so it must not be shared
+    split = (
+        model_registry is not None and selector not in model_registry.engines
+        and len(model_registry.routes[selector or 'default'][0]) > 1
+    )
+    etag = prediction_etag(current_engine, g.model_name, query)
+    headers = [
+        ('ETag', f'"{etag}"'),
+        ('Cache-Control', 'private, no-cache' if split else cache_control(app.config['PREDICT_GET_MAX_AGE'])),
+    ] + model_headers(g.model_name, current_engine)
+    if model_registry is not None:
+        headers.append(('Vary', 'X-Model, X-Routing-Key' if split else 'X-Model'))
+
+    if request.if_none_match.contains_weak(etag):
+        return app.response_class(status=304, headers=headers)
+
+    features_row = tuple(result[field] for field in FEATURES)
+    cache_key = (current_engine.version,) + features_row
+    prediction = prediction_cache.get(cache_key)
+    if prediction is None:
+        prediction = float(predict_features(np.array([features_row]), current_engine)[0])
+        prediction_cache.put(cache_key, prediction)
+
+    response = predict_response(prediction, result, request_id)
+    response.headers.extend(headers)
+    if audit_log is not None:
+        audit(request_id, 'predict_get', current_engine, g.stage_timer.started, input=result, prediction=round(prediction, 2))
+    return response
+
+@app.route('/predict/grid', methods=['POST'])
+def predict_grid():
+    """Price curve or surface for one house with one or two features swept
+
+    The whole grid is scored in one vectorized call. Marginal effects are the
+    model's per-unit price change for every feature.
+    """
+    request_id = datetime.utcnow().isoformat()
+
+    try:
+        if engine is None:
+            logger.error(f"[{request_id}] Model not loaded")
+            return jsonify({
+                'error': 'Model not available',
+                'message': 'The prediction model is not loaded. Please contact support.'
+            }), 503
+
+        data = request.get_json(silent=True) if request.is_json else None
+        if not isinstance(data, dict) or not isinstance(data.get('base'), dict) or 'vary' not in data:
+            logger.warning(f"[{request_id}] Grid request without base and vary")
+            return jsonify({
+                'error': 'Invalid request format',
+                'message': "Request must be a JSON object with 'base' and 'vary'"
+            }), 400
+
+        try:
+            axes = grid_axes(data['vary'], app.config['GRID_MAX_POINTS'])
+        except ValueError as e:
+            logger.warning(f"[{request_id}] Invalid grid: {str(e)}")
+            return jsonify({
+                'error': 'Validation error',
+                'message': str(e)
+            }), 400
+        # Swept features may be left out of the base house
+        base = dict(data['base'])
+        for field, values in axes:
+            base.setdefault(field, float(values[0]))
+        is_valid, result = validate_input(base)
+        if not is_valid:
+            logger.warning(f"[{request_id}] Validation failed: {result}")
+            return jsonify({
+                'error': 'Validation error',
+                'message': result
+            }), 400
+
+        selected = select_model(data)
+        if selected is None:
+            return unknown_model_response(request_id)
+        g.model_name, current_engine = selected
+
+        features, shape = grid_features(result, axes)
+        prices = predict_features(features, current_engine).reshape(shape)
+        effects = current_engine.marginal_effects()
+
+        logger.info(f"[{request_id}] Grid prediction: {len(features)} points over {', '.join(field for field, _ in axes)}")
+
+        response = json_response({
+            'success': True,
+            'base': result,
+            'axes': {field: values.tolist() for field, values in axes},
+            'prices': np.round(prices, 2).tolist(),
+            'marginal_effects': None if effects is None else {
+                field: round(effect, 2) for field, effect in zip(FEATURES, effects.tolist())
+            },
+            'currency': 'USD',
+            'request_id': request_id
+        }, headers=model_headers(g.model_name, current_engine))
+        if audit_log is not None:
+            audit(request_id, 'predict_grid', current_engine, g.stage_timer.started,
+                  input=result, axes={field: len(values) for field, values in axes}, points=len(features))
+        return response
+
+    except Exception as e:
+        logger.error(f"[{request_id}] Unexpected error in grid prediction: {str(e)}", exc_info=True)
+        return jsonify({
+            'error': 'Internal server error',
+            'message': 'An unexpected error occurred. Please try again later.',
+            'request_id': request_id
+        }), 500
+
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    """Predict prices for a list of houses in a single vectorized call"""
+    request_id = datetime.utcnow().isoformat()
+
+    try:
+        # Check if model is loaded
+        if engine is None:
+            logger.error(f"[{request_id}] Model not loaded")
+            return jsonify({
+                'error': 'Model not available',
+                'message': 'The prediction model is not loaded. Please contact support.'
+            }), 503
+
+        body_format = columnar.MIMETYPE_FORMATS.get(request.mimetype)
+        if body_format is not None:
+            return predict_batch_binary(request_id, body_format)
+
+        if not request.is_json:
+            logger.warning(f"[{request_id}] Batch request is not JSON")
+            return jsonify({
+                'error': 'Invalid request format',
+                'message': 'Request must be JSON'
+            }), 400
+
+        data = request.get_json(silent=True)
+
+        # Accept either a bare list or {"houses": [...]}
+        houses = data.get('houses') if isinstance(data, dict) else data
+        if not isinstance(houses, list) or not houses:
+            logger.warning(f"[{request_id}] Batch request has no houses")
+            return jsonify({
+                'error': 'Empty request',
+                'message': 'Request body must be a non-empty list of houses'
+            }), 400
+
+        max_rows = app.config['BATCH_MAX_ROWS']
+        if len(houses) > max_rows:
+            logger.warning(f"[{request_id}] Batch of {len(houses)} houses exceeds limit of {max_rows}")
+            return jsonify({
+                'error': 'Request too large',
+                'message': f'Batch size exceeds maximum of {max_rows} houses'
+            }), 413
+
+        # Validate all rows at once, then scale and predict the valid ones in one call
+        checked = validate_records(houses)
+        errors = [
+            {'index': index, 'error': 'Validation error', 'message': message}
+            for index, message in checked.errors
+        ]
+        selected = select_model(data)
+        if selected is None:
+            return unknown_model_response(request_id)
+        g.model_name, current_engine = selected
+
+        predictions = []
+        if len(checked.features):
+            prices = predict_features(checked.features, current_engine)
+            predictions = [
+                {'index': index, 'prediction': round(price, 2), 'input': dict(zip(FEATURES, values))}
+                for index, values, price in zip(np.flatnonzero(checked.valid).tolist(), checked.features.tolist(), prices.tolist())
+            ]
+
+        logger.info(f"[{request_id}] Batch prediction: {len(predictions)} succeeded, {len(errors)} failed")
+
+        response = json_response({
+            'success': True,
+            'count': len(houses),
+            'predicted': len(predictions),
+            'failed': len(errors),
+            'currency': 'USD',
+            'predictions': predictions,
+            'errors': errors,
+            'request_id': request_id
+        }, headers=model_headers(g.model_name, current_engine))
+        if audit_log is not None:
+            audit(request_id, 'predict_batch', current_engine, g.stage_timer.started,
+                  count=len(houses), failed=len(errors), predictions=predictions)
+        return response
+
+    except HTTPException:
+        # Let the registered error handlers (e.g. 413) respond
+        raise
+
+    except Exception as e:
+        logger.error(f"[{request_id}] Unexpected error in batch prediction: {str(e)}", exc_info=True)
+        return jsonify({
+            'error': 'Internal server error',
+            'message': 'An unexpected error occurred. Please try again later.',
+            'request_id': request_id
+        }), 500
+
+def predict_batch_binary(request_id, body_format):
+    """/predict/batch for .npy and Arrow IPC bodies, answered in the same format
+
+    Predictions are returned at full float64 precision, one per input row, NaN
+    (.npy) or null (Arrow) for rows that failed validation.
+    """
+    if not columnar.available(body_format):
+        return jsonify({
+            'error': 'Unsupported media type',
+            'message': 'Arrow IPC bodies need pyarrow on the server; send .npy (application/x-npy) instead'
+        }), 415
+
+    data = request.get_data(cache=False)
+    try:
+        if body_format == columnar.NPY:
+            features = columnar.read_npy(data)
+            n_rows = features.shape[0]
+            checked = validate_matrix(features)
+        else:
+            columns, n_rows = columnar.read_arrow(data)
+            checked = validate_columns(columns, n_rows)
+    except ValueError as e:
+        logger.warning(f"[{request_id}] Invalid {body_format} batch body: {str(e)}")
+        return jsonify({
+            'error': 'Invalid request format',
+            'message': str(e)
+        }), 400
+
+    if n_rows == 0:
+        return jsonify({
+            'error': 'Empty request',
+            'message': 'Request body must contain at least one house'
+        }), 400
+
+    max_rows = app.config['BATCH_MAX_ROWS']
+    if n_rows > max_rows:
+        logger.warning(f"[{request_id}] Batch of {n_rows} houses exceeds limit of {max_rows}")
+        return jsonify({
+            'error': 'Request too large',
+            'message': f'Batch size exceeds maximum of {max_rows} houses'
+        }), 413
+
+    selected = select_model()
+    if selected is None:
+        return unknown_model_response(request_id)
+    g.model_name, current_engine = selected
+
+    predictions = np.full(n_rows, np.nan)
+    if len(checked.features):
+        predictions[checked.valid] = predict_features(checked.features, current_engine)
+
+    if body_format == columnar.NPY:
+        body = columnar.write_npy(predictions)
+    else:
+        messages = [None] * n_rows
+        for index, message in checked.errors:
+            messages[index] = message
+        body = columnar.write_arrow(predictions, messages)
+
+    failed = len(checked.errors)
+    logger.info(f"[{request_id}] Binary batch prediction: {n_rows - failed} succeeded, {failed} failed")
+    if audit_log is not None:
+        valid_rows = np.flatnonzero(checked.valid)
+        audit(request_id, 'predict_batch', current_engine, g.stage_timer.started, count=n_rows, failed=failed,
+              format=body_format,
+              predictions=[{'index': i, 'prediction': round(p, 2)} for i, p in zip(valid_rows.tolist(), predictions[valid_rows].tolist())])
+
+    return app.response_class(body, mimetype=columnar.FORMAT_MIMETYPES[body_format], headers=[
+        ('X-Request-ID', request_id), ('X-Predicted', str(n_rows - failed)), ('X-Failed', str(failed)),
+    ] + model_headers(g.model_name, current_engine))
+
+def score_stream_chunk(chunk, output_format, scoring_engine, request_id=None):
+    """Validate and score one chunk of streamed records, returning (text, succeeded, failed)"""
+    started = time.perf_counter()
+    checked = validate_records([record if record is not None else {} for _, record, _ in chunk])
+    errors = dict(checked.errors)
+    # Lines that could not be parsed report the parse error instead
+    errors.update({i: error for i, (_, _, error) in enumerate(chunk) if error is not None})
+
+    prices = predict_features(checked.features, scoring_engine).tolist() if len(checked.features) else []
+    scored = iter(zip(checked.features.tolist(), prices))
+
+    rows = []
+    for i, (index, _, _) in enumerate(chunk):
+        if i in errors:
+            rows.append({'index': index, 'error': 'Validation error', 'message': errors[i]})
+        else:
+            values, price = next(scored)
+            rows.append({'index': index, 'prediction': round(price, 2), 'input': dict(zip(FEATURES, values))})
+
+    if audit_log is not None:
+        audit(request_id, 'predict_stream', scoring_engine, started, count=len(rows), failed=len(errors),
+              predictions=[row for row in rows if 'prediction' in row])
+    return streaming.format_rows(rows, output_format), len(rows) - len(errors), len(errors)
+
+@app.route('/predict/stream', methods=['POST'])
+def predict_stream():
+    """Score an NDJSON or CSV upload chunk by chunk and stream the results back"""
+    request_id = datetime.utcnow().isoformat()
+
+    # Check if model is loaded
+    if engine is None:
+        logger.error(f"[{request_id}] Model not loaded")
+        return jsonify({
+            'error': 'Model not available',
+            'message': 'The prediction model is not loaded. Please contact support.'
+        }), 503
+
+    input_format = streaming.INPUT_CONTENT_TYPES.get(request.mimetype)
+    if input_format is None:
+        logger.warning(f"[{request_id}] Unsupported stream content type: {request.mimetype}")
+        return jsonify({
+            'error': 'Unsupported media type',
+            'message': 'Request must be NDJSON (application/x-ndjson) or CSV (text/csv)'
+        }), 415
+
+    # Output format: ?format=, then an explicit Accept type, then same as input
+    output_format = request.args.get('format') or next(
+        (streaming.MIMETYPE_FORMATS[mimetype] for mimetype, _ in request.accept_mimetypes
+         if mimetype in streaming.MIMETYPE_FORMATS),
+        input_format
+    )
+    if output_format not in streaming.FORMAT_MIMETYPES:
+        return jsonify({
+            'error': 'Invalid request format',
+            'message': f'Output format must be one of: {", ".join(streaming.FORMAT_MIMETYPES)}'
+        }), 400
+
+    chunk_rows = app.config['STREAM_CHUNK_ROWS']
+    # Score the whole stream with one model, even if a reload happens meanwhile
+    selected = select_model()
+    if selected is None:
+        return unknown_model_response(request_id)
+    g.model_name, stream_engine = selected
+    lines = streaming.iter_lines(request.stream, read_size=app.config['STREAM_READ_SIZE'])
+
+    def generate():
+        succeeded = failed = 0
+        if output_format == streaming.CSV:
+            yield streaming.csv_header()
+        try:
+            chunk = []
+            for record in streaming.iter_records(lines, input_format):
+                chunk.append(record)
+                if len(chunk) >= chunk_rows:
+                    text, ok, bad = score_stream_chunk(chunk, output_format, stream_engine, request_id)
+                    succeeded, failed, chunk = succeeded + ok, failed + bad, []
+                    notify_worker()
+                    yield text
+            if chunk:
+                text, ok, bad = score_stream_chunk(chunk, output_format, stream_engine, request_id)
+                succeeded, failed = succeeded + ok, failed + bad
+                yield text
+        except (streaming.LineTooLong, ValueError, HTTPException) as e:
+            # Headers are already sent, so report the problem in-band and stop
+            message = e.description if isinstance(e, HTTPException) else str(e)
+            logger.warning(f"[{request_id}] Stream aborted: {message}")
+            yield streaming.format_rows([{'index': None, 'error': 'Invalid request format', 'message': message}], output_format)
+        except Exception as e:
+            logger.error(f"[{request_id}] Unexpected error in stream prediction: {str(e)}", exc_info=True)
+            yield streaming.format_rows([{'index': None, 'error': 'Internal server error', 'message': 'An unexpected error occurred'}], output_format)
+        logger.info(f"[{request_id}] Stream prediction: {succeeded} succeeded, {failed} failed")
+
+    return app.response_class(
+        stream_with_context(generate()),
+        mimetype=streaming.FORMAT_MIMETYPES[output_format],
+        headers=[('X-Request-ID', request_id)] + model_headers(g.model_name, stream_engine)
+    )
+
+def is_admin_request():
+    """Check the request carries a valid admin bearer token"""
+    token = app.config['ADMIN_TOKEN']
+    provided = request.headers.get('Authorization', '')
+    return bool(token) and hmac.compare_digest(provided.encode(), f'Bearer {token}'.encode())
+
+@app.route('/admin/reload', methods=['POST'])
+def admin_reload():
+    """Reload the model in this worker, and have every other worker reload before its next request"""
+    global reload_generation
+    if not app.config['ADMIN_TOKEN']:
+        return not_found(None)
+
+    if not is_admin_request():
+        logger.warning(f"Unauthorized reload attempt from {request.remote_addr}")
+        return jsonify({
+            'error': 'Unauthorized',
+            'message': 'A valid admin token is required'
+        }), 401
+
+    previous_version = engine.version if engine is not None else None
+    if not load_model():
+        return jsonify({
+            'error': 'Reload failed',
+            'message': 'The new model could not be loaded; the previous model is still serving'
+        }), 500
+
+    # Only after a successful load, so workers never chase a model that fails
+    with metrics.lock:
+        reload_generation = MODEL_RELOAD_GENERATION.value() + 1
+        MODEL_RELOAD_GENERATION.set(reload_generation)
+
+    return jsonify({
+        'success': True,
+        'model_version': engine.version,
+        'previous_version': previous_version,
+        'model_loaded_at': model_loaded_at,
+        'worker_pid': os.getpid(),
+        'reload_generation': int(reload_generation),
+        'message': 'Reloaded in this worker; every other worker reloads before its next request'
+    }), 200
+
+@app.route('/admin/profile', methods=['GET'])
+def admin_profile():
+    """Collapsed stacks of the requests profiled by this worker (flamegraph.pl input)"""
+    if not app.config['ADMIN_TOKEN']:
+        return not_found(None)
+
+    if not is_admin_request():
+        logger.warning(f"Unauthorized profile access from {request.remote_addr}")
+        return jsonify({
+            'error': 'Unauthorized',
+            'message': 'A valid admin token is required'
+        }), 401
+
+    body = profiler.collapsed()
+    if request.args.get('reset') in ('1', 'true', 'yes'):
+        profiler.reset()
+    return app.response_class(body, mimetype='text/plain', headers={'X-Worker-PID': str(os.getpid())})
+
+@app.route('/metrics', methods=['GET'], endpoint='metrics')
+def metrics_endpoint():
+    """Prometheus metrics aggregated across all gunicorn workers"""
+    with metrics.lock:
+        IN_FLIGHT.set(in_flight.total())
+    return app.response_class(metrics.expose(), mimetype='text/plain; version=0.0.4')
+
+def admission_stats():
+    """Shedding thresholds, current load and rejection counts, for /health"""
+    return {
+        'in_flight': in_flight.total(),
+        'max_in_flight': app.config['ADMISSION_MAX_IN_FLIGHT'],
+        'max_queue_wait_ms': app.config['ADMISSION_MAX_QUEUE_WAIT_MS'],
+        'rate_limit': {
+            'per_second': rate_limiter.rate, 'burst': rate_limiter.burst
+        } if rate_limiter is not None else {'enabled': False},
+        'rejected': {reason: int(ADMISSION_REJECTIONS.value((reason,))) for reason in ADMISSION_REASONS},
+    }
+
+def reject(reason, body, status, retry_after):
+    """Cheap 503/429 with Retry-After; the request body is never read"""
+    with metrics.lock:
+        ADMISSION_REJECTIONS.inc((reason,))
+    response = app.response_class(
+        body, status=status, headers=list(JSON_HEADERS) + [('Retry-After', retry_after_header(retry_after))]
+    )
+    response.security_headers_applied = True
+    return response
+
+@app.before_request
+def start_request_timer():
+    """Start timing the request for /metrics"""
+    g.stage_timer = StageTimer()
+
+@app.before_request
+def follow_admin_reload():
+    """Reload the model if /admin/reload ran in another worker since this one last loaded"""
+    global reload_generation
+    generation = MODEL_RELOAD_GENERATION.value()
+    if generation != reload_generation:
+        reload_generation = generation
+        logger.info(f"Reload requested through /admin/reload (generation {int(generation)}), reloading")
+        load_model()
+
+@app.before_request
+def admit_request():
+    """Shed prediction requests that waited too long, exceed their rate or find the server full"""
+    if request.endpoint not in ADMISSION_ENDPOINTS:
+        return None
+    config = app.config
+
+    waited = queue_wait(request.headers.get('X-Request-Start'))
+    if waited is not None:
+        g.queue_wait = waited
+        max_wait_ms = config['ADMISSION_MAX_QUEUE_WAIT_MS']
+        if max_wait_ms and waited * 1000.0 > max_wait_ms:
+            return reject('queue_wait', OVERLOADED_BODY, 503, config['ADMISSION_RETRY_AFTER'])
+
+    if rate_limiter is not None:
+        key_header = config['RATE_LIMIT_KEY_HEADER']
+        client = (request.headers.get(key_header) if key_header else None) or request.remote_addr or ''
+        wait = rate_limiter.acquire(client)
+        if wait:
+            return reject('rate_limit', RATE_LIMITED_BODY, 429, wait)
+
+    if not in_flight.try_enter(config['ADMISSION_MAX_IN_FLIGHT']):
+        return reject('in_flight', OVERLOADED_BODY, 503, config['ADMISSION_RETRY_AFTER'])
+    g.admitted = True
+    return None
+
+@app.before_request
+def start_profiling():
+    """Profile sampled requests and admin requests that ask for it with X-Profile"""
+    rate = app.config['PROFILE_SAMPLE_RATE']
+    if (rate and random.random() < rate) or (request.headers.get('X-Profile') == '1' and is_admin_request()):
+        g.profiled = True
+        profiler.start(request.endpoint or 'other')
+
+@app.teardown_request
+def finish_request(error=None):
+    """Count an admitted request out once its response (or stream) has finished"""
+    if g.pop('profiled', False):
+        profiler.stop()
+    if g.pop('admitted', False):
+        in_flight.leave()
+
+@app.after_request
+def record_request_metrics(response):
+    """Record request count, status code and stage latencies"""
+    timer = g.pop('stage_timer', None)
+    if timer is None:
+        return response
+    model_name = g.get('model_name')
+
+    endpoint = request.endpoint if request.endpoint in METRIC_ENDPOINTS else 'other'
+    status = str(response.status_code)
+    if status not in METRIC_STATUS_CODES:
+        status = 'other'
+
+    elapsed = timer.elapsed()
+    with metrics.lock:
+        REQUESTS.inc((endpoint, status))
+        REQUEST_LATENCY.observe(elapsed, (endpoint,))
+        for stage, seconds in timer.stages:
+            STAGE_LATENCY.observe(seconds, (stage,))
+        if 'queue_wait' in g:
+            QUEUE_WAIT.observe(g.queue_wait)
+        if model_name is not None:
+            MODEL_REQUESTS.inc((model_name,))
+            MODEL_LATENCY.observe(elapsed, (model_name,))
+    return response
+
 @app.after_request
 def add_security_headers(response):
     """Add security headers to all responses"""
-    response.headers['X-Content-Type-Options'] = 'nosniff'
-    response.headers['X-Frame-Options'] = 'DENY'
-    response.headers['X-XSS-Protection'] = '1; mode=block'
-    response.headers['Strict-Transport-Security'] = 'max-age=31536000; includeSubDomains'
+    # Responses built by serialization.py carry them already
+    if getattr(response, 'security_headers_applied', False):
+        return response
+    for name, value in SECURITY_HEADERS:
+        response.headers[name] = value
     # Only set CSP if not already set by the route
     if 'Content-Security-Policy' not in response.headers:
-        response.headers['Content-Security-Policy'] = "default-src 'self'"
-    response.headers['Referrer-Policy'] = 'strict-origin-when-cross-origin'
+        response.headers['Content-Security-Policy'] = DEFAULT_CSP
     return response
 
 @app.errorhandler(404)
@@ -483,4 +1435,5 @@ def internal_error(error):
 if __name__ == '__main__':
     # For production, use a WSGI server like Gunicorn
     port = int(os.environ.get('PORT', 5001))
+    start_model_watcher()
     app.run(host='0.0.0.0', port=port, debug=False)
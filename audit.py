@@ -0,0 +1,213 @@
+"""Asynchronous, batched JSONL audit log of predictions
+
+Request threads only put a dict on a bounded in-memory queue. If the queue is
+full the record is dropped and counted, never waited on. A background thread
+per process collects records into batches and flushes a batch when it reaches
+`batch_size` records or has been open for `flush_interval` seconds. It
+encodes the batch and appends it with a single write.
+
+Several gunicorn workers append to the same file. Each batch is written while
+holding an exclusive flock on `<path>.lock`, so batches never interleave. The
+same lock covers rotation: when the file reaches `max_bytes` it is renamed to
+`<path>.1` (older files shift up to `backup_count`). Before every write, the
+other workers notice the inode change and reopen `<path>`. Where there is no
+flock (Windows), msvcrt.locking takes its place.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+from process_thread import ProcessThread
+from serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+def _file_locking():
+    """(lock, unlock) for an open lock file: flock, msvcrt.locking on Windows, else no locking
+
+    Imported here rather than at module level, so that without fcntl only
+    the audit log (when enabled) falls back, not the whole app.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        pass
+    else:
+        return (lambda f: fcntl.flock(f, fcntl.LOCK_EX)), (lambda f: fcntl.flock(f, fcntl.LOCK_UN))
+
+    try:
+        import msvcrt
+    except ImportError:
+        logger.warning("No file locking available; audit batches from several processes may interleave")
+        return (lambda f: None), (lambda f: None)
+
+    def lock(f):
+        # Lock the first byte; LK_LOCK retries for about 10 seconds, then raises OSError
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+    def unlock(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    return lock, unlock
+
+
+class AuditLog:
+    """Bounded-queue, group-commit JSONL writer shared safely by processes"""
+
+    def __init__(self, path, max_queue=10000, batch_size=500, flush_interval=1.0,
+                 max_bytes=100 * 1024 * 1024, backup_count=5, on_write=None, on_drop=None):
+        self.path = path
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        # Called with the number of records after each successful batch write
+        self.on_write = on_write
+        # Called with the number of records lost when a batch write fails
+        # (queue-full drops are reported by record() returning False)
+        self.on_drop = on_drop
+        self._queue = queue.Queue(max_queue)
+        self._lock = threading.Lock()
+        self._lock_file, self._unlock_file = _file_locking()
+        # Workers are forked from the master that created the log, so each
+        # starts its own writer, with an empty queue, on its first record
+        self._writer = ProcessThread(self._run, 'audit-log', on_start=self._reset)
+        self._fd = None
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.rotations = 0
+        self.write_errors = 0
+
+    def _reset(self):
+        # Records queued and counted by the parent, and its descriptor, are not ours
+        self._queue = queue.Queue(self.max_queue)
+        self._fd = None
+        self.written = self.dropped = self.batches = self.rotations = self.write_errors = 0
+        atexit.register(self.close)
+
+    def record(self, entry):
+        """Queue one record; returns False (and counts a drop) if the queue is full"""
+        self._writer.ensure_started()
+        try:
+            self._queue.put_nowait(entry)
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+
+    def close(self, timeout=5.0):
+        """Flush queued records and stop the writer thread of this process"""
+        if not self._writer.running:
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._writer.join(timeout)
+
+    def _run(self):
+        while True:
+            batch, stop = self._collect()
+            if batch:
+                self._write_batch(batch)
+            if stop:
+                if self._fd is not None:
+                    os.close(self._fd)
+                    self._fd = None
+                return
+
+    def _collect(self):
+        """Block for the first record, then gather until the batch is full or due"""
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is _STOP:
+                return batch, True
+            batch.append(entry)
+        return batch, False
+
+    def _write_batch(self, batch):
+        data = b''.join(dumps(entry) + b'\n' for entry in batch)
+        try:
+            with open(self.path + '.lock', 'a') as lock_file:
+                self._lock_file(lock_file)
+                try:
+                    fd = self._current_fd()
+                    size = os.fstat(fd).st_size
+                    if self.max_bytes and size > 0 and size + len(data) > self.max_bytes:
+                        self._rotate()
+                        fd = self._current_fd()
+                    os.write(fd, data)
+                finally:
+                    self._unlock_file(lock_file)
+        except OSError as e:
+            with self._lock:
+                self.write_errors += 1
+                self.dropped += len(batch)
+            logger.error(f"Audit log write failed, {len(batch)} records lost: {str(e)}")
+            if self.on_drop is not None:
+                self.on_drop(len(batch))
+            return
+
+        with self._lock:
+            self.written += len(batch)
+            self.batches += 1
+        if self.on_write is not None:
+            self.on_write(len(batch))
+
+    def _current_fd(self):
+        """Append descriptor for `path`, reopened if another process rotated it"""
+        if self._fd is not None:
+            try:
+                if os.stat(self.path).st_ino == os.fstat(self._fd).st_ino:
+                    return self._fd
+            except FileNotFoundError:
+                pass
+            os.close(self._fd)
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        return self._fd
+
+    def _rotate(self):
+        """Shift path -> path.1 -> ... -> path.<backup_count>; call with the lock held"""
+        if self.backup_count > 0:
+            for i in range(self.backup_count - 1, 0, -1):
+                source = f'{self.path}.{i}'
+                if os.path.exists(source):
+                    os.replace(source, f'{self.path}.{i + 1}')
+            os.replace(self.path, f'{self.path}.1')
+        else:
+            os.truncate(self.path, 0)
+        self.rotations += 1
+
+    def stats(self):
+        """Counters for this worker process"""
+        return {
+            'enabled': True,
+            'path': self.path,
+            'queued': self._queue.qsize() if self._writer.running else 0,
+            'max_queue': self.max_queue,
+            'written': self.written,
+            'dropped': self.dropped,
+            'batches': self.batches,
+            'rotations': self.rotations,
+            'write_errors': self.write_errors,
+        }
@@ -0,0 +1,106 @@
+"""Adaptive micro-batching of concurrent single-row predictions
+
+With a threaded worker (gunicorn ``gthread``), several request threads can be
+inside /predict at the same time. Instead of each one paying the full NumPy
+dispatch cost for a 1x4 matrix, they hand their row to a MicroBatcher, whose
+background thread scores everything that arrives within a short window as one
+matrix and hands each caller its own result.
+
+The window adapts to load: when recent batches have been single rows the
+batcher flushes immediately, so a lightly loaded worker adds no latency.
+"""
+import logging
+import queue
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from process_thread import ProcessThread
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """Coalesce concurrent single-row predictions into one matrix call"""
+
+    def __init__(self, predict_fn, max_batch_size=64, max_wait_ms=2.0):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.SimpleQueue()
+        # Request threads of each gunicorn worker hand rows to that worker's own
+        # batching thread, started with a fresh queue on the first submit()
+        self._worker = ProcessThread(self._run, 'micro-batcher', on_start=self._reset)
+        # Exponentially weighted average batch size, used to decide whether to wait
+        self._average_batch = 1.0
+        self.batches = 0
+        self.requests = 0
+        self.largest_batch = 0
+
+    def _reset(self):
+        self._queue = queue.SimpleQueue()
+
+    def submit(self, row):
+        """Queue one feature row and return a Future for its prediction"""
+        self._worker.ensure_started()
+        future = Future()
+        self._queue.put((row, future))
+        return future
+
+    def predict(self, row, timeout=None):
+        """Score one feature row, blocking until its batch has been scored"""
+        return self.submit(row).result(timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        # Take whatever is already waiting without blocking
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        # Only hold the batch open when recent traffic has been concurrent
+        if len(batch) < self.max_batch_size and self._average_batch > 1.5:
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            rows = [row for row, _ in batch]
+            futures = [future for _, future in batch]
+            try:
+                predictions = self.predict_fn(np.array(rows, dtype=np.float64))
+            except Exception as e:
+                logger.error(f"Micro-batch of {len(batch)} failed: {str(e)}", exc_info=True)
+                for future in futures:
+                    future.set_exception(e)
+            else:
+                for future, prediction in zip(futures, predictions):
+                    future.set_result(float(prediction))
+
+            self._average_batch = 0.8 * self._average_batch + 0.2 * len(batch)
+            self.batches += 1
+            self.requests += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+
+    def stats(self):
+        """Return batch counters for this worker"""
+        return {
+            'enabled': True,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000.0,
+            'batches': self.batches,
+            'requests': self.requests,
+            'average_batch_size': round(self.requests / self.batches, 2) if self.batches else 0.0,
+            'largest_batch': self.largest_batch
+        }
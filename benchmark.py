@@ -0,0 +1,470 @@
+"""Reproducible micro-benchmarks and load tests for the house price API
+
+    python benchmark.py micro                       # in-process micro-benchmarks
+    python benchmark.py startup                     # cold start, RSS and worker shared/private memory
+    GUNICORN_GC_FREEZE=false python benchmark.py startup   # the same without gc.freeze, to compare
+    python benchmark.py load --workers 4            # start gunicorn locally and load it
+    python benchmark.py load --url http://host:5000 # load an already running server
+    python benchmark.py run --output results.json --baseline benchmark_baseline.json
+    python benchmark.py compare results.json benchmark_baseline.json
+
+Results are written as JSON. `compare` (and `run --baseline`) exits non-zero
+when any metric is worse than the baseline by more than --tolerance.
+"""
+import argparse
+import http.client
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+from datetime import datetime
+from urllib.parse import urlparse
+
+import numpy as np
+
+from memory_usage import memory_usage
+
+SAMPLE_HOUSE = {'bedrooms': 3, 'bathrooms': 2, 'sqft': 2000, 'age': 10}
+PREDICT_GET_URL = '/predict?bedrooms=3&bathrooms=2&sqft=2000&age=10'
+GRID_REQUEST = {
+    'base': SAMPLE_HOUSE, 'vary': {'sqft': {'min': 800, 'max': 5000, 'steps': 50}, 'age': {'min': 0, 'max': 95, 'steps': 20}}
+}
+BATCH_SIZE = 1000
+
+
+def measure(fn, min_time=0.2, repeat=5):
+    """Time fn like timeit.autorange and return the median time per call"""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    per_call = statistics.median(timer.timeit(number) / number for _ in range(repeat))
+    return {'ns_per_op': per_call * 1e9, 'ops_per_sec': 1.0 / per_call}
+
+
+def run_micro():
+    """Benchmark validation, scaling and prediction in-process"""
+    # Keep per-request INFO logging out of the measurements
+    logging.disable(logging.INFO)
+    import app as app_module
+    import columnar
+    from flask import jsonify
+    from inference import build_engine
+    from serialization import json_response, predict_response
+    from validation import validate_records
+
+    model, scaler = app_module.model, app_module.scaler
+    sklearn_engine = build_engine('sklearn', model, scaler)
+    fused_engine = build_engine('fused', model, scaler)
+
+    rng = np.random.default_rng(0)
+    row = np.array([[3.0, 2.0, 2000.0, 10.0]])
+    batch = np.column_stack([
+        rng.integers(1, 6, BATCH_SIZE), rng.integers(1, 4, BATCH_SIZE),
+        rng.integers(800, 5000, BATCH_SIZE), rng.integers(0, 50, BATCH_SIZE)
+    ]).astype(np.float64)
+    houses = [dict(zip(app_module.FEATURES, values)) for values in batch.tolist()]
+
+    client = app_module.app.test_client()
+    app_module.prediction_cache = app_module.PredictionCache(0)
+    # Only requests carrying an old X-Request-Start are shed
+    app_module.app.config['ADMISSION_MAX_QUEUE_WAIT_MS'] = 1000
+
+    # Response bodies as /predict and /predict/batch build them
+    request_id = datetime.utcnow().isoformat()
+    values = {field: float(value) for field, value in SAMPLE_HOUSE.items()}
+    single_payload = {'success': True, 'prediction': 312345.67, 'currency': 'USD', 'input': values, 'request_id': request_id}
+    batch_payload = {
+        'success': True, 'count': BATCH_SIZE, 'predicted': BATCH_SIZE, 'failed': 0, 'currency': 'USD',
+        'predictions': [
+            {'index': i, 'prediction': 312345.67, 'input': house} for i, house in enumerate(houses)
+        ],
+        'errors': [], 'request_id': request_id
+    }
+    context = app_module.app.app_context()
+    context.push()
+    predict_get_etag = client.get(PREDICT_GET_URL).headers['ETag']
+    batch_npy = columnar.write_npy(batch)
+
+    cases = {
+        'validate_input': (lambda: app_module.validate_input(SAMPLE_HOUSE), 1),
+        f'validate_input_loop_{BATCH_SIZE}': (lambda: [app_module.validate_input(house) for house in houses], BATCH_SIZE),
+        f'validate_records_{BATCH_SIZE}': (lambda: validate_records(houses), BATCH_SIZE),
+        'scale_sklearn_1': (lambda: scaler.transform(row), 1),
+        'predict_sklearn_1': (lambda: sklearn_engine.predict(row), 1),
+        'predict_fused_1': (lambda: fused_engine.predict(row), 1),
+        f'scale_sklearn_{BATCH_SIZE}': (lambda: scaler.transform(batch), BATCH_SIZE),
+        f'predict_sklearn_{BATCH_SIZE}': (lambda: sklearn_engine.predict(batch), BATCH_SIZE),
+        f'predict_fused_{BATCH_SIZE}': (lambda: fused_engine.predict(batch), BATCH_SIZE),
+        'serialize_jsonify_1': (lambda: jsonify(single_payload), 1),
+        'serialize_fast_1': (lambda: predict_response(312345.67, values, request_id), 1),
+        f'serialize_jsonify_{BATCH_SIZE}': (lambda: jsonify(batch_payload), BATCH_SIZE),
+        f'serialize_fast_{BATCH_SIZE}': (lambda: json_response(batch_payload), BATCH_SIZE),
+        'endpoint_home_gzip': (lambda: client.get('/', headers={'Accept-Encoding': 'gzip'}), 1),
+        'endpoint_home_304': (lambda: client.get('/', headers={'If-None-Match': app_module.ui_asset.variants['identity'][1]}), 1),
+        'endpoint_predict': (lambda: client.post('/predict', json=SAMPLE_HOUSE), 1),
+        f'endpoint_predict_batch_{BATCH_SIZE}': (lambda: client.post('/predict/batch', json=houses), BATCH_SIZE),
+        f'endpoint_predict_batch_npy_{BATCH_SIZE}': (lambda: client.post('/predict/batch', data=batch_npy, content_type='application/x-npy'), BATCH_SIZE),
+        'endpoint_predict_get': (lambda: client.get(PREDICT_GET_URL), 1),
+        'endpoint_predict_grid_50x20': (lambda: client.post('/predict/grid', json=GRID_REQUEST), 1000),
+        'endpoint_predict_get_304': (lambda: client.get(PREDICT_GET_URL, headers={'If-None-Match': predict_get_etag}), 1),
+        # A request that queued longer than ADMISSION_MAX_QUEUE_WAIT_MS (set above)
+        'endpoint_predict_shed': (lambda: client.post('/predict', json=SAMPLE_HOUSE, headers={'X-Request-Start': 't=1'}), 1),
+    }
+
+    results = {}
+    for name, (fn, rows) in cases.items():
+        result = measure(fn)
+        result['rows_per_sec'] = result['ops_per_sec'] * rows
+        results[name] = result
+        print(f"{name:<32} {result['ns_per_op'] / 1000:>12.2f} us/op {result['rows_per_sec']:>16,.0f} rows/s", file=sys.stderr)
+
+    context.pop()
+    logging.disable(logging.NOTSET)
+    return results
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for(host, port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection(host, port, timeout=1)
+            connection.request('GET', '/health')
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f'Server on port {port} did not become healthy')
+
+
+def start_server(workers, env=None):
+    """Start gunicorn with the repo config on a free port; return (process, port)"""
+    port = _free_port()
+    server_env = dict(os.environ, PORT=str(port), GUNICORN_WORKERS=str(workers), LOG_LEVEL='warning')
+    server_env.update(env or {})
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'app:app', '--config', 'gunicorn_config.py', '--access-logfile', '/dev/null'],
+        env=server_env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    try:
+        _wait_for('127.0.0.1', port)
+    except RuntimeError:
+        process.kill()
+        raise
+    return process, port
+
+
+def stop_server(process):
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def child_pids(parent_pid):
+    """PIDs whose parent is parent_pid (Linux /proc)"""
+    children = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == parent_pid:
+            children.append(int(entry))
+    return children
+
+
+def process_memory(pid):
+    """Resident, shared and private memory of a process in KB (Linux /proc)"""
+    return memory_usage(pid)
+
+
+# Run in a fresh interpreter: time `import app` (which loads the model) and report memory
+STARTUP_PROBE = r"""
+import json, sys, time
+started = time.perf_counter()
+import app
+elapsed = time.perf_counter() - started
+with open('/proc/self/status') as f:
+    rss_kb = next(int(line.split()[1]) for line in f if line.startswith('VmRSS:'))
+print(json.dumps({
+    'import_seconds': elapsed, 'rss_kb': rss_kb, 'modules': len(sys.modules),
+    'sklearn_imported': 'sklearn' in sys.modules, 'model_loaded': app.engine is not None,
+}))
+"""
+
+
+def run_startup(formats=('joblib', 'artifact'), repeat=5, workers=2):
+    """Measure cold start and memory for each MODEL_FORMAT
+
+    For each format: `import app` in a fresh interpreter (median of `repeat`
+    runs, plus the whole process wall time), and a gunicorn boot until the
+    first healthy response. Worker memory is measured after a second of load,
+    once the workers have run their own allocations and garbage collections:
+    mean RSS, and how much of it is still shared with the master.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    results = {}
+    for model_format in formats:
+        env = dict(os.environ, MODEL_FORMAT=model_format, MODEL_WATCH_INTERVAL='0', PYTHONWARNINGS='ignore')
+        probes = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            completed = subprocess.run(
+                [sys.executable, '-c', STARTUP_PROBE], env=env, cwd=here,
+                capture_output=True, text=True, check=True
+            )
+            probe = json.loads(completed.stdout.strip().splitlines()[-1])
+            probe['process_seconds'] = time.perf_counter() - started
+            probes.append(probe)
+
+        started = time.perf_counter()
+        process, port = start_server(workers, {'MODEL_FORMAT': model_format, 'MODEL_WATCH_INTERVAL': '0'})
+        boot_seconds = time.perf_counter() - started
+        try:
+            drive_load('127.0.0.1', port, workers, 1.0)
+            worker_memory = [process_memory(pid) for pid in child_pids(process.pid)]
+            master_rss = process_memory(process.pid).get('rss_kb', 0)
+        finally:
+            stop_server(process)
+
+        def worker_mean(key):
+            values = [memory[key] for memory in worker_memory if key in memory]
+            return statistics.mean(values) if values else None
+
+        result = {
+            'import_seconds': statistics.median(p['import_seconds'] for p in probes),
+            'process_seconds': statistics.median(p['process_seconds'] for p in probes),
+            'rss_kb': statistics.median(p['rss_kb'] for p in probes),
+            'modules': probes[-1]['modules'],
+            'sklearn_imported': probes[-1]['sklearn_imported'],
+            'model_loaded': probes[-1]['model_loaded'],
+            'gunicorn_boot_seconds': boot_seconds,
+            'gunicorn_master_rss_kb': master_rss,
+            'gunicorn_worker_rss_kb': worker_mean('rss_kb'),
+            'gunicorn_worker_shared_kb': worker_mean('shared_kb'),
+            'gunicorn_worker_private_kb': worker_mean('private_kb'),
+        }
+        results[model_format] = result
+        print(
+            f"{model_format:<10} import {result['import_seconds'] * 1000:>8.1f} ms  process {result['process_seconds'] * 1000:>8.1f} ms  "
+            f"rss {result['rss_kb'] / 1024:>7.1f} MB  modules {result['modules']:>5}  "
+            f"gunicorn boot {boot_seconds:>6.2f} s  worker rss {(result['gunicorn_worker_rss_kb'] or 0) / 1024:>7.1f} MB "
+            f"(shared {(result['gunicorn_worker_shared_kb'] or 0) / 1024:.1f}, private {(result['gunicorn_worker_private_kb'] or 0) / 1024:.1f})",
+            file=sys.stderr
+        )
+    return results
+
+
+def _client(args):
+    """Send requests on one keep-alive connection until the deadline"""
+    host, port, path, body, deadline = args
+    headers = {'Content-Type': 'application/json'}
+    latencies = []
+    errors = 0
+    connection = http.client.HTTPConnection(host, port, timeout=30)
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            connection.request('POST', path, body=body, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            if response.status == 200:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            connection.close()
+            connection = http.client.HTTPConnection(host, port, timeout=30)
+    connection.close()
+    return latencies, errors
+
+
+def drive_load(host, port, concurrency, duration, path='/predict', payload=None):
+    """Run `concurrency` client processes against the server for `duration` seconds"""
+    body = json.dumps(payload or SAMPLE_HOUSE)
+    deadline = time.monotonic() + duration
+    with multiprocessing.get_context('fork').Pool(concurrency) as pool:
+        results = pool.map(_client, [(host, port, path, body, deadline)] * concurrency)
+
+    latencies = np.sort(np.concatenate([np.asarray(lat, dtype=np.float64) for lat, _ in results]))
+    errors = sum(err for _, err in results)
+    if latencies.size == 0:
+        return {'requests': 0, 'errors': errors, 'throughput_rps': 0.0}
+    return {
+        'requests': int(latencies.size),
+        'errors': int(errors),
+        'throughput_rps': latencies.size / duration,
+        'p50_ms': float(np.percentile(latencies, 50) * 1000),
+        'p99_ms': float(np.percentile(latencies, 99) * 1000),
+    }
+
+
+def run_load(concurrency_levels, duration, workers=None, url=None, env=None):
+    """Load-test a local gunicorn (or `url`) at each concurrency level"""
+    process = None
+    if url:
+        parsed = urlparse(url)
+        host, port = parsed.hostname, parsed.port or 80
+    else:
+        process, port = start_server(workers, env)
+        host = '127.0.0.1'
+
+    try:
+        # Warm every worker before measuring
+        drive_load(host, port, max(concurrency_levels), 1.0)
+        results = {}
+        for concurrency in concurrency_levels:
+            result = drive_load(host, port, concurrency, duration)
+            results[f'c{concurrency}'] = result
+            print(
+                f"concurrency {concurrency:>4}: {result['throughput_rps']:>10,.0f} req/s "
+                f"p50 {result.get('p50_ms', float('nan')):>7.2f} ms p99 {result.get('p99_ms', float('nan')):>7.2f} ms "
+                f"errors {result['errors']}",
+                file=sys.stderr
+            )
+        if process is not None:
+            results['memory'] = {str(pid): process_memory(pid) for pid in child_pids(process.pid)}
+        return results
+    finally:
+        if process is not None:
+            stop_server(process)
+
+
+def metadata():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        'timestamp': datetime.utcnow().isoformat(),
+        'commit': commit or None,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+# (section, metric, True if higher is better)
+COMPARED_METRICS = [
+    ('micro', 'ns_per_op', False),
+    ('load', 'throughput_rps', True),
+    ('load', 'p50_ms', False),
+    ('load', 'p99_ms', False),
+    ('startup', 'process_seconds', False),
+    ('startup', 'rss_kb', False),
+    ('startup', 'gunicorn_worker_private_kb', False),
+]
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of regressions of results against baseline"""
+    regressions = []
+    for section, metric, higher_is_better in COMPARED_METRICS:
+        for name, values in results.get(section, {}).items():
+            old = baseline.get(section, {}).get(name, {}).get(metric)
+            new = values.get(metric) if isinstance(values, dict) else None
+            if old is None or new is None or old == 0:
+                continue
+            change = (new - old) / old
+            worse = change < -tolerance if higher_is_better else change > tolerance
+            status = 'REGRESSION' if worse else 'ok'
+            print(f"{section}.{name}.{metric:<16} {old:>14.2f} -> {new:>14.2f} ({change:+.1%}) {status}", file=sys.stderr)
+            if worse:
+                regressions.append({'name': f'{section}.{name}.{metric}', 'baseline': old, 'current': new, 'change': change})
+    return regressions
+
+
+def _write_json(path, data):
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='House price API benchmarks.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_load_arguments(sub):
+        sub.add_argument('--workers', type=int, default=2, help='Gunicorn workers to start (default: 2)')
+        sub.add_argument('--concurrency', default='1,8,32', help='Comma-separated client counts (default: 1,8,32)')
+        sub.add_argument('--duration', type=float, default=5.0, help='Seconds per concurrency level (default: 5)')
+        sub.add_argument('--url', help='Load an already running server instead of starting one')
+
+    def add_output_arguments(sub):
+        sub.add_argument('--output', help='Write results JSON to this file')
+        sub.add_argument('--baseline', help='Compare against this baseline JSON')
+        sub.add_argument('--save-baseline', help='Also write the results as a new baseline')
+        sub.add_argument('--tolerance', type=float, default=0.15, help='Allowed relative regression (default: 0.15)')
+
+    add_output_arguments(subparsers.add_parser('micro', help='In-process micro-benchmarks'))
+    startup_parser = subparsers.add_parser('startup', help='Cold start and memory per model format')
+    startup_parser.add_argument('--formats', default='joblib,artifact', help='Comma-separated MODEL_FORMAT values')
+    startup_parser.add_argument('--repeat', type=int, default=5, help='Fresh interpreters per format (default: 5)')
+    startup_parser.add_argument('--workers', type=int, default=2, help='Gunicorn workers to start (default: 2)')
+    add_output_arguments(startup_parser)
+    load_parser = subparsers.add_parser('load', help='Load test gunicorn')
+    add_load_arguments(load_parser)
+    add_output_arguments(load_parser)
+    run_parser = subparsers.add_parser('run', help='Micro-benchmarks and load test')
+    add_load_arguments(run_parser)
+    add_output_arguments(run_parser)
+    compare_parser = subparsers.add_parser('compare', help='Compare two result files')
+    compare_parser.add_argument('results')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('--tolerance', type=float, default=0.15)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'compare':
+        with open(args.results) as f:
+            results = json.load(f)
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        return 1 if compare(results, baseline, args.tolerance) else 0
+
+    results = {'meta': metadata()}
+    if args.command in ('micro', 'run'):
+        results['micro'] = run_micro()
+    if args.command == 'startup':
+        results['startup'] = run_startup(args.formats.split(','), repeat=args.repeat, workers=args.workers)
+    if args.command in ('load', 'run'):
+        levels = [int(level) for level in args.concurrency.split(',')]
+        results['load'] = run_load(levels, args.duration, workers=args.workers, url=args.url)
+
+    if args.output:
+        _write_json(args.output, results)
+    if args.save_baseline:
+        _write_json(args.save_baseline, results)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s) against {args.baseline}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,157 @@
+"""Generate synthetic house data at any scale, in parallel, as shards
+
+    python generate_data.py data/houses --rows 100000000                  # Parquet shards of 1M rows
+    python generate_data.py data/houses --rows 5000000 --format npy --workers 8
+    python generate_data.py data/houses --rows 1000000 --format csv --chunk-size 250000 --seed 7
+
+Rows are produced in chunks of --chunk-size. Chunk i draws from its own
+random stream, SeedSequence(seed, spawn_key=(i,)), so the output depends only
+on --seed, --rows and --chunk-size. The number of workers and the order in
+which they finish do not matter. Each worker writes its chunk straight to
+`part-<i>.<format>` in the output directory; nothing is sent back to the
+parent. A manifest.json written last records the parameters and shards.
+
+Shards have the columns bedrooms, bathrooms, sqft, age and price (.npy shards
+are a float64 matrix in that order). `train_model.py --stream <dir>` reads a
+shard directory directly, and score_bulk.py scores one shard at a time.
+Parquet needs pyarrow.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from inference import FEATURES
+
+COLUMNS = FEATURES + ['price']
+FORMATS = ('parquet', 'csv', 'npy')
+
+
+def price(bedrooms, bathrooms, sqft, age, noise):
+    """House price from its features (simplified formula) plus noise"""
+    return 50000 + bedrooms * 30000 + bathrooms * 25000 + sqft * 150 + age * -2000 + noise
+
+
+def make_dataset(n_samples=1000):
+    """The small in-memory dataset train_model.py trains on by default
+
+    Draws from the legacy RandomState(42) stream in the original order, so the
+    committed model can be reproduced exactly.
+    """
+    import pandas as pd
+
+    rng = np.random.RandomState(42)
+    df = pd.DataFrame({
+        'bedrooms': rng.randint(1, 6, n_samples),
+        'bathrooms': rng.randint(1, 4, n_samples),
+        'sqft': rng.randint(800, 5000, n_samples),
+        'age': rng.randint(0, 50, n_samples),
+    })
+    df['price'] = price(df['bedrooms'], df['bathrooms'], df['sqft'], df['age'], rng.normal(0, 50000, n_samples))
+    return df
+
+
+def generate_chunk(seed, index, n_rows):
+    """Chunk `index` as {column: array}, drawn from its own seeded stream"""
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(index,)))
+    columns = {
+        'bedrooms': rng.integers(1, 6, n_rows),
+        'bathrooms': rng.integers(1, 4, n_rows),
+        'sqft': rng.integers(800, 5000, n_rows),
+        'age': rng.integers(0, 50, n_rows),
+    }
+    columns['price'] = price(*(columns[field] for field in FEATURES), rng.normal(0, 50000, n_rows))
+    return columns
+
+
+def shard_name(index, file_format):
+    return f'part-{index:05d}.{file_format}'
+
+
+def write_shard(columns, path, file_format):
+    """Write one chunk to `path`, via a temporary file so readers never see half a shard"""
+    partial = path + '.partial'
+    if file_format == 'npy':
+        with open(partial, 'wb') as f:
+            np.save(f, np.column_stack([columns[name] for name in COLUMNS]).astype(np.float64))
+    elif file_format == 'csv':
+        import pandas as pd
+        pd.DataFrame(columns, columns=COLUMNS).to_csv(partial, index=False)
+    else:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        pq.write_table(pa.table({name: columns[name] for name in COLUMNS}), partial)
+    os.replace(partial, path)
+
+
+def _generate_shard(output_dir, file_format, seed, index, n_rows):
+    """Worker task: generate and write one shard; returns (index, rows, seconds)"""
+    started = time.perf_counter()
+    write_shard(generate_chunk(seed, index, n_rows), os.path.join(output_dir, shard_name(index, file_format)), file_format)
+    return index, n_rows, time.perf_counter() - started
+
+
+def generate(output_dir, rows, chunk_size=1_000_000, file_format='parquet', seed=42, workers=None, progress=None):
+    """Write `rows` synthetic houses to shards in `output_dir`; returns the manifest"""
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown format: {file_format} (expected one of {', '.join(FORMATS)})")
+    if file_format == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise SystemExit("Parquet support requires pyarrow: pip install pyarrow")
+    os.makedirs(output_dir, exist_ok=True)
+
+    chunks = [(index, min(chunk_size, rows - start)) for index, start in enumerate(range(0, rows, chunk_size))]
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = [
+            pool.submit(_generate_shard, output_dir, file_format, seed, index, n_rows)
+            for index, n_rows in chunks
+        ]
+        done = 0
+        for future in as_completed(futures):
+            _, n_rows, _ = future.result()
+            done += n_rows
+            if progress is not None:
+                progress(done, rows, time.perf_counter() - started)
+
+    manifest = {
+        'rows': rows,
+        'chunk_size': chunk_size,
+        'seed': seed,
+        'format': file_format,
+        'columns': COLUMNS,
+        'shards': [{'path': shard_name(index, file_format), 'rows': n_rows} for index, n_rows in chunks],
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+    with open(os.path.join(output_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+        f.write('\n')
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('output', help='Output directory for the shards')
+    parser.add_argument('--rows', type=int, required=True, help='Total number of rows')
+    parser.add_argument('--chunk-size', type=int, default=1_000_000, help='Rows per shard (default: 1,000,000)')
+    parser.add_argument('--format', choices=FORMATS, default='parquet', help='Shard format (default: parquet)')
+    parser.add_argument('--seed', type=int, default=42, help='Root seed (default: 42)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: all cores)')
+    args = parser.parse_args(argv)
+
+    def progress(done, total, seconds):
+        print(f"\r{done:,}/{total:,} rows ({done / seconds if seconds else 0:,.0f} rows/s)", end='', file=sys.stderr)
+
+    manifest = generate(args.output, args.rows, args.chunk_size, args.format, args.seed, args.workers, progress)
+    print(f"\nWrote {len(manifest['shards'])} {args.format} shards to {args.output} in {manifest['seconds']:.2f}s",
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
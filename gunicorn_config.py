@@ -1,14 +1,50 @@
 """Gunicorn production configuration"""
+import gc
+import json
 import os
 import multiprocessing
 
+# Settings recommended by tune_gunicorn.py for this machine, if present.
+# Explicit environment variables always take precedence over the profile.
+profile_path = os.environ.get('GUNICORN_PROFILE', 'gunicorn_profile.json')
+profile = {}
+if profile_path and os.path.exists(profile_path):
+    with open(profile_path) as f:
+        profile = json.load(f).get('config', {})
+    for name, value in profile.get('env', {}).items():
+        os.environ.setdefault(name, str(value))
+
+def setting(env_name, profile_key, default):
+    """Environment variable, else tuned profile value, else default"""
+    return os.environ.get(env_name, profile.get(profile_key, default))
+
 # Server socket
 bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
-backlog = 2048
+# Connections waiting for a worker. A shorter queue refuses excess connections
+# sooner; see also ADMISSION_MAX_QUEUE_WAIT_MS in app.py
+backlog = int(os.environ.get('GUNICORN_BACKLOG', 2048))
 
 # Worker processes
-workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
-worker_class = 'sync'
+workers = int(setting('GUNICORN_WORKERS', 'workers', multiprocessing.cpu_count() * 2 + 1))
+# Use 'gthread' with GUNICORN_THREADS > 1 together with MICRO_BATCH_ENABLED=true
+# to score concurrent /predict calls as one matrix
+worker_class = setting('GUNICORN_WORKER_CLASS', 'worker_class', 'sync')
+threads = int(setting('GUNICORN_THREADS', 'threads', 1))
+
+# Native BLAS/OpenMP threads per worker. Every worker would otherwise start a
+# pool as large as the machine, oversubscribing cores across workers. The
+# variables must be set before NumPy is imported, i.e. before the app preloads.
+native_threads = int(setting('NATIVE_THREADS', 'native_threads', 1))
+for name in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS',
+             'BLIS_NUM_THREADS', 'VECLIB_MAXIMUM_THREADS', 'NUMEXPR_NUM_THREADS'):
+    os.environ.setdefault(name, str(native_threads))
+
+# Imported here, in the master, so workers do not each import it after the fork
+try:
+    from threadpoolctl import threadpool_limits
+except ImportError:
+    threadpool_limits = None
+
 worker_connections = 1000
 max_requests = 1000
 max_requests_jitter = 50
@@ -37,8 +73,13 @@ limit_request_line = 4094
 limit_request_fields = 100
 limit_request_field_size = 8190
 
-# Enable preload to save memory
+# Load the app and model once in the master; workers share those pages
+# copy-on-write. Garbage collection in a worker writes to the header of every
+# object it scans, un-sharing the pages that hold them. So once the app is
+# loaded, the master freezes its objects out of the collector before forking
+# (see when_ready / pre_fork). Set GUNICORN_GC_FREEZE=false to compare.
 preload_app = True
+gc_freeze = os.environ.get('GUNICORN_GC_FREEZE', 'true').lower() in ('1', 'true', 'yes')
 
 # Restart workers gracefully
 graceful_timeout = 30
@@ -53,12 +94,61 @@ def on_reload(server):
 
 def when_ready(server):
     """Called just after the server is started."""
+    if preload_app and gc_freeze:
+        # Everything workers import is imported by now (threadpoolctl above).
+        # Collect startup garbage once, so it is not frozen along with the rest
+        gc.collect()
+        gc.freeze()
+        server.log.info(f"Froze {gc.get_freeze_count()} objects before forking workers")
     server.log.info("Gunicorn server is ready. Spawning workers...")
 
+def pre_fork(server, worker):
+    """Called just before a worker is forked, in the master process."""
+    # Also freeze what the master allocated since, e.g. before respawning a
+    # worker that hit max_requests
+    if preload_app and gc_freeze:
+        gc.freeze()
+
 def on_exit(server):
     """Called just before exiting Gunicorn."""
     server.log.info("Shutting down Gunicorn server...")
 
+def post_worker_init(worker):
+    """Called just after a worker has initialized the application."""
+    # Let long streaming responses heartbeat so they outlive `timeout`
+    import app as app_module
+    app_module.worker_heartbeat = worker.notify
+
+    # Enforce the native thread limit even if a library was loaded before the
+    # environment variables above took effect
+    if threadpool_limits is not None:
+        threadpool_limits(limits=native_threads)
+
+    # Workers are forked from the preloaded master, so pick up any model
+    # files that changed since then and keep watching for new ones
+    app_module.check_for_model_update()
+    app_module.start_model_watcher()
+
+    # Start this process's BLAS threads and touch the scoring path now, not
+    # on the first request
+    app_module.warm_worker()
+    worker.log.info(f"Worker {worker.pid} memory: {app_module.memory_stats()}")
+
+def worker_exit(server, worker):
+    """Called just after a worker has been exited, in the worker process."""
+    # Write out audit records still queued in this worker
+    import app as app_module
+    if app_module.audit_log is not None:
+        app_module.audit_log.close()
+    # Keep the stacks this worker profiled
+    app_module.profiler.dump()
+
+def child_exit(server, worker):
+    """Called just after a worker has been exited, in the master process."""
+    # A worker killed mid-request (e.g. on timeout) never counted its requests out
+    import app as app_module
+    app_module.in_flight.release(worker.pid)
+
 def worker_int(worker):
     """Called when a worker receives the SIGINT or SIGQUIT signal."""
     worker.log.info("Worker received SIGINT or SIGQUIT")
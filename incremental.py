@@ -0,0 +1,234 @@
+"""Out-of-core fitting of the scaler and linear model
+
+The training data is read in chunks and reduced to sufficient statistics: row
+count, means and the co-moment matrix of [features, price]. Chunk statistics
+are merged with Chan et al.'s pairwise update, which stays numerically stable
+for large row counts, so memory is bounded by the chunk size no matter how
+many rows there are. From the statistics we get exactly what
+StandardScaler.fit and LinearRegression.fit would compute on the full data,
+and R² for any linear model.
+
+Rows are assigned to the holdout set by a hash of their row number, so the
+split does not depend on the chunk size or on how files are read.
+"""
+import os
+import time
+
+import numpy as np
+
+from inference import FEATURES
+
+TARGET = 'price'
+
+# 64-bit golden-ratio multiplier for hashing row numbers into the holdout split
+_SPLIT_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+class MomentAccumulator:
+    """Running count, mean and co-moment matrix of row vectors"""
+
+    def __init__(self, n_columns):
+        self.count = 0
+        self.mean = np.zeros(n_columns)
+        self.comoment = np.zeros((n_columns, n_columns))
+
+    def update(self, rows):
+        """Merge a (rows, n_columns) block into the running statistics"""
+        n = rows.shape[0]
+        if n == 0:
+            return
+        mean = rows.mean(axis=0)
+        centered = rows - mean
+        comoment = centered.T @ centered
+
+        total = self.count + n
+        delta = mean - self.mean
+        self.comoment += comoment + np.outer(delta, delta) * (self.count * n / total)
+        self.mean += delta * (n / total)
+        self.count = total
+
+    def merge(self, other):
+        """Merge another accumulator's statistics into this one"""
+        if other.count == 0:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.comoment += other.comoment + np.outer(delta, delta) * (self.count * other.count / total)
+        self.mean += delta * (other.count / total)
+        self.count = total
+
+    def r2(self, coef, intercept):
+        """R² of price ≈ features . coef + intercept over the accumulated rows
+
+        Uses residual = [features, price] . v - intercept with v = [-coef, 1],
+        so SSE = v' M v + n * mean(residual)² and SST = M[price, price].
+        """
+        v = np.append(-np.asarray(coef, dtype=np.float64), 1.0)
+        residual_mean = float(self.mean @ v) - intercept
+        sse = float(v @ self.comoment @ v) + self.count * residual_mean ** 2
+        sst = float(self.comoment[-1, -1])
+        return 1.0 - sse / sst if sst > 0 else float('nan')
+
+
+def holdout_mask(row_numbers, test_fraction):
+    """True for rows in the holdout set; depends only on the global row number"""
+    if test_fraction <= 0:
+        return np.zeros(len(row_numbers), dtype=bool)
+    hashed = (np.asarray(row_numbers, dtype=np.uint64) * _SPLIT_MULTIPLIER) >> np.uint64(40)
+    return hashed < np.uint64(int(test_fraction * (1 << 24)))
+
+
+def iter_training_chunks(path, chunk_size, target=TARGET):
+    """Yield (rows, len(FEATURES) + 1) float64 blocks of [FEATURES, target] from a file
+
+    CSV and Parquet must have the FEATURES and target columns; .npy must be a
+    2-D matrix with the FEATURES columns followed by the target. Parquet needs
+    pyarrow. A directory is read as the shards written by generate_data.py.
+    """
+    columns = FEATURES + [target]
+    if os.path.isdir(path):
+        # A shard directory from generate_data.py, read in shard order
+        for name in sorted(os.listdir(path)):
+            if name.startswith('part-') and not name.endswith('.partial'):
+                yield from iter_training_chunks(os.path.join(path, name), chunk_size, target)
+        return
+
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension == '.npy':
+        data = np.load(path, mmap_mode='r')
+        if data.ndim != 2 or data.shape[1] != len(columns):
+            raise ValueError(f"Expected a (rows, {len(columns)}) matrix, got shape {data.shape}")
+        for start in range(0, data.shape[0], chunk_size):
+            yield np.asarray(data[start:start + chunk_size], dtype=np.float64)
+
+    elif extension == '.csv':
+        import pandas as pd
+        for frame in pd.read_csv(path, usecols=columns, chunksize=chunk_size):
+            yield frame[columns].to_numpy(dtype=np.float64)
+
+    elif extension in ('.parquet', '.pq'):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Parquet support requires pyarrow: pip install pyarrow")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns):
+            yield np.column_stack([batch.column(name).to_numpy(zero_copy_only=False) for name in columns]).astype(np.float64)
+
+    else:
+        raise ValueError(f"Unsupported training data format: {extension}")
+
+
+class TrainingStats:
+    """Train and holdout accumulators fed chunk by chunk"""
+
+    def __init__(self, test_fraction=0.2):
+        self.test_fraction = test_fraction
+        self.train = MomentAccumulator(len(FEATURES) + 1)
+        self.test = MomentAccumulator(len(FEATURES) + 1)
+        self.rows_read = 0
+        self.rows_skipped = 0
+
+    def update(self, block):
+        """Add one [FEATURES, target] block; rows with non-finite values are skipped"""
+        row_numbers = np.arange(self.rows_read, self.rows_read + block.shape[0])
+        self.rows_read += block.shape[0]
+
+        finite = np.isfinite(block).all(axis=1)
+        if not finite.all():
+            self.rows_skipped += int((~finite).sum())
+            block, row_numbers = block[finite], row_numbers[finite]
+
+        test = holdout_mask(row_numbers, self.test_fraction)
+        self.train.update(block[~test])
+        self.test.update(block[test])
+
+
+def fit_linear(stats):
+    """StandardScaler + LinearRegression equivalent to fitting on the training rows
+
+    Returns (model, scaler) as fitted scikit-learn objects.
+    """
+    from sklearn.linear_model import LinearRegression
+    from sklearn.preprocessing import StandardScaler
+
+    n = stats.count
+    n_features = len(FEATURES)
+    if n <= n_features:
+        raise ValueError(f"Need more than {n_features} training rows, got {n}")
+
+    mean = stats.mean[:n_features]
+    var = np.diag(stats.comoment)[:n_features] / n
+    # StandardScaler leaves constant features unscaled
+    scale = np.where(var > 0, np.sqrt(var), 1.0)
+
+    # Normal equations on standardized (and therefore centered) features
+    xx = stats.comoment[:n_features, :n_features] / np.outer(scale, scale)
+    xy = stats.comoment[:n_features, -1] / scale
+    coef, _, rank, _ = np.linalg.lstsq(xx, xy, rcond=None)
+    # Singular values of the standardized design matrix, as LinearRegression reports them
+    singular = np.sqrt(np.clip(np.linalg.eigvalsh(xx)[::-1], 0.0, None))
+
+    scaler = StandardScaler()
+    scaler.feature_names_in_ = np.array(FEATURES, dtype=object)
+    scaler.n_features_in_ = n_features
+    scaler.n_samples_seen_ = n
+    scaler.mean_ = mean.copy()
+    scaler.var_ = var
+    scaler.scale_ = scale
+
+    model = LinearRegression()
+    model.n_features_in_ = n_features
+    model.coef_ = coef
+    model.rank_ = int(rank)
+    model.singular_ = singular
+    # Standardized training features have zero mean, so the intercept is the mean price
+    model.intercept_ = float(stats.mean[-1])
+    return model, scaler
+
+
+def raw_coefficients(model, scaler):
+    """(coef, intercept) of the model expressed on unscaled features"""
+    coef = model.coef_ / scaler.scale_
+    return coef, float(model.intercept_ - scaler.mean_ @ coef)
+
+
+def train_streaming(path, chunk_size=200_000, test_fraction=0.2, progress=None):
+    """Fit the model from a file too large for memory
+
+    Returns (model, scaler, report) where report holds row counts, R² scores
+    and throughput. `progress`, if given, is called with the TrainingStats
+    after each chunk.
+    """
+    stats = TrainingStats(test_fraction)
+    started = time.perf_counter()
+    read_seconds = 0.0
+    chunks = 0
+
+    chunk_started = time.perf_counter()
+    for block in iter_training_chunks(path, chunk_size):
+        read_seconds += time.perf_counter() - chunk_started
+        stats.update(block)
+        chunks += 1
+        if progress is not None:
+            progress(stats)
+        chunk_started = time.perf_counter()
+
+    model, scaler = fit_linear(stats.train)
+    coef, intercept = raw_coefficients(model, scaler)
+    seconds = time.perf_counter() - started
+
+    report = {
+        'rows': stats.rows_read,
+        'train_rows': stats.train.count,
+        'test_rows': stats.test.count,
+        'skipped_rows': stats.rows_skipped,
+        'chunks': chunks,
+        'chunk_size': chunk_size,
+        'train_r2': stats.train.r2(coef, intercept),
+        'test_r2': stats.test.r2(coef, intercept) if stats.test.count else float('nan'),
+        'seconds': seconds,
+        'read_seconds': read_seconds,
+        'rows_per_sec': stats.rows_read / seconds if seconds else float('inf'),
+    }
+    return model, scaler, report
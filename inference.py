@@ -0,0 +1,223 @@
+"""Inference engines for the house price model
+
+The sklearn engine scores through the fitted scaler and model exactly as they
+were trained. The fused engine folds the scaler's mean/scale into the linear
+regression coefficients once, at load time, so scoring is a single dot product
+without sklearn's per-call input validation.
+
+`export_artifact` writes the fused engine's inputs (coefficients, intercept,
+scaler statistics, feature order) to a small checksummed JSON file, which
+`read_artifact` loads with nothing but the standard library and NumPy.
+"""
+import hashlib
+import json
+
+import numpy as np
+
+# Feature order expected by the scaler and model
+FEATURES = ['bedrooms', 'bathrooms', 'sqft', 'age']
+
+# Identifies the JSON serving artifact; bump the version on incompatible changes
+ARTIFACT_FORMAT = 'house-price-linear'
+ARTIFACT_FORMAT_VERSION = 1
+
+
+class SklearnEngine:
+    """Score through the fitted sklearn scaler and model"""
+
+    name = 'sklearn'
+    version = None
+
+    def __init__(self, model, scaler):
+        self.model = model
+        self.scaler = scaler
+        self._effects = None
+
+    @classmethod
+    def from_sklearn(cls, model, scaler):
+        return cls(model, scaler)
+
+    def transform(self, features):
+        """Scale raw features"""
+        return self.scaler.transform(features)
+
+    def predict_scaled(self, features_scaled):
+        """Predict from already-scaled features"""
+        return self.model.predict(features_scaled)
+
+    def predict(self, features):
+        """Predict prices for a 2-D feature matrix"""
+        return self.predict_scaled(self.transform(features))
+
+    def marginal_effects(self):
+        """Price change per unit increase of each feature, in FEATURES order
+
+        None when the model is not linear or the scaler is not affine: the
+        effect then differs from point to point. Folded once per engine.
+        """
+        if self._effects is None:
+            try:
+                self._effects = FusedLinearEngine.from_sklearn(self.model, self.scaler).coef
+            except ValueError:
+                self._effects = False
+        return self._effects if self._effects is not False else None
+
+
+class FusedLinearEngine:
+    """Score with the scaler folded into the regression coefficients"""
+
+    name = 'fused'
+    version = None
+
+    def __init__(self, coef, intercept):
+        self.coef = np.ascontiguousarray(coef, dtype=np.float64)
+        self.intercept = float(intercept)
+
+    @classmethod
+    def from_sklearn(cls, model, scaler):
+        """Fold a StandardScaler + linear model pair into one set of weights
+
+        price = ((x - mean) / scale) . coef + intercept
+              = x . (coef / scale) + (intercept - mean . (coef / scale))
+        """
+        return cls.fuse(*linear_parameters(model, scaler))
+
+    @classmethod
+    def from_artifact(cls, artifact):
+        """Build the engine from a dict returned by read_artifact"""
+        return cls.fuse(artifact['coef'], artifact['intercept'], artifact['mean'], artifact['scale'])
+
+    @classmethod
+    def fuse(cls, coef, intercept, mean, scale):
+        """Fold standardization statistics into linear coefficients"""
+        coef = np.asarray(coef, dtype=np.float64)
+        fused_coef = coef / np.asarray(scale, dtype=np.float64)
+        fused_intercept = float(intercept) - float(np.dot(np.asarray(mean, dtype=np.float64), fused_coef))
+        return cls(fused_coef, fused_intercept)
+
+    def transform(self, features):
+        """Scaling is folded into the coefficients, so this is a no-op"""
+        return features
+
+    def predict_scaled(self, features_scaled):
+        """Predict with the precomputed dot product"""
+        return np.dot(features_scaled, self.coef) + self.intercept
+
+    def predict(self, features):
+        """Predict prices for a 2-D feature matrix"""
+        return self.predict_scaled(np.asarray(features, dtype=np.float64))
+
+    def marginal_effects(self):
+        """Price change per unit increase of each feature: the fused coefficients"""
+        return self.coef
+
+
+def linear_parameters(model, scaler):
+    """Return (coef, intercept, mean, scale) of a linear model and its scaler
+
+    The scaler is described as transform(x) = (x - mean) / scale. Scalers
+    without `mean_` (RobustScaler, MinMaxScaler, ...) are probed instead, see
+    affine_parameters.
+    """
+    if not hasattr(model, 'coef_') or not hasattr(model, 'intercept_'):
+        raise ValueError(f"{type(model).__name__} does not expose linear coefficients")
+
+    coef = np.asarray(model.coef_, dtype=np.float64).ravel()
+    n_features = coef.shape[0]
+    if hasattr(scaler, 'mean_'):
+        mean = getattr(scaler, 'mean_', None)
+        scale = getattr(scaler, 'scale_', None)
+        mean = np.zeros(n_features) if mean is None else np.asarray(mean, dtype=np.float64)
+        scale = np.ones(n_features) if scale is None else np.asarray(scale, dtype=np.float64)
+    else:
+        mean, scale = affine_parameters(scaler, n_features)
+
+    if mean.shape != coef.shape or scale.shape != coef.shape:
+        raise ValueError(
+            f"Scaler has {mean.shape[0]} features but model has {n_features}"
+        )
+    return coef, float(np.ravel(model.intercept_)[0]), mean, scale
+
+
+def affine_parameters(scaler, n_features):
+    """Find (mean, scale) with scaler.transform(x) == (x - mean) / scale by probing
+
+    Raises ValueError if the transform is not a per-feature affine map.
+    """
+    zero = np.asarray(scaler.transform(np.zeros((1, n_features))), dtype=np.float64).ravel()
+    slope = np.asarray(scaler.transform(np.ones((1, n_features))), dtype=np.float64).ravel() - zero
+    if zero.shape != (n_features,) or np.any(slope == 0) or not np.all(np.isfinite(slope)):
+        raise ValueError(f"{type(scaler).__name__} is not an invertible per-feature affine transform")
+
+    probe = np.random.default_rng(0).uniform(-1e3, 1e4, (8, n_features))
+    if not np.allclose(scaler.transform(probe), probe * slope + zero, rtol=1e-9, atol=1e-9):
+        raise ValueError(f"{type(scaler).__name__} is not a per-feature affine transform")
+    return -zero / slope, 1.0 / slope
+
+
+def _artifact_checksum(payload):
+    """sha256 of the artifact's canonical JSON encoding, excluding the checksum itself"""
+    body = {key: value for key, value in payload.items() if key != 'checksum'}
+    encoded = json.dumps(body, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return 'sha256:' + hashlib.sha256(encoded).hexdigest()
+
+
+def export_artifact(model, scaler, path, metadata=None):
+    """Write a fitted linear model and scaler as a dependency-free JSON artifact"""
+    coef, intercept, mean, scale = linear_parameters(model, scaler)
+    if coef.shape[0] != len(FEATURES):
+        raise ValueError(f"Model has {coef.shape[0]} features, expected {len(FEATURES)}")
+
+    # Floats are written with repr(), so they load back bit-for-bit
+    payload = {
+        'format': ARTIFACT_FORMAT,
+        'format_version': ARTIFACT_FORMAT_VERSION,
+        'features': list(FEATURES),
+        'coef': coef.tolist(),
+        'intercept': intercept,
+        'mean': mean.tolist(),
+        'scale': scale.tolist(),
+        'metadata': metadata or {},
+    }
+    payload['checksum'] = _artifact_checksum(payload)
+
+    with open(path, 'w') as f:
+        json.dump(payload, f, indent=2)
+        f.write('\n')
+    return payload
+
+
+def read_artifact(path):
+    """Load and verify a JSON artifact written by export_artifact"""
+    with open(path) as f:
+        payload = json.load(f)
+
+    if payload.get('format') != ARTIFACT_FORMAT:
+        raise ValueError(f"{path} is not a {ARTIFACT_FORMAT} artifact")
+    if payload.get('format_version') != ARTIFACT_FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported artifact version {payload.get('format_version')} (expected {ARTIFACT_FORMAT_VERSION})"
+        )
+    if payload.get('checksum') != _artifact_checksum(payload):
+        raise ValueError(f"Checksum mismatch in {path}")
+    if payload['features'] != FEATURES:
+        raise ValueError(f"Artifact feature order {payload['features']} does not match {FEATURES}")
+    for key in ('coef', 'mean', 'scale'):
+        if len(payload[key]) != len(FEATURES):
+            raise ValueError(f"Artifact '{key}' has {len(payload[key])} values, expected {len(FEATURES)}")
+    return payload
+
+
+ENGINES = {
+    SklearnEngine.name: SklearnEngine,
+    FusedLinearEngine.name: FusedLinearEngine,
+}
+
+
+def build_engine(name, model, scaler, version=None):
+    """Build the named inference engine from a fitted model and scaler"""
+    if name not in ENGINES:
+        raise ValueError(f"Unknown inference engine: {name} (expected one of {', '.join(ENGINES)})")
+    engine = ENGINES[name].from_sklearn(model, scaler)
+    engine.version = version
+    return engine
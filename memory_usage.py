@@ -0,0 +1,47 @@
+"""Shared and private memory of a process, from Linux /proc/<pid>/smaps_rollup
+
+Gunicorn workers forked from a preloaded master share its pages until they
+write to them. RSS counts shared pages in every worker, so it overstates what
+each worker costs. What limits how many workers fit on a host is each worker's
+private memory, plus the shared memory once.
+
+    rss_kb      resident memory, shared pages included
+    pss_kb      proportional share: each shared page divided by its sharers
+    shared_kb   resident pages also mapped by another process (e.g. the master)
+    private_kb  resident pages only this process maps
+
+Other platforms have no /proc, so the stats are empty there.
+"""
+import os
+
+FIELDS = {
+    'Rss': 'rss_kb',
+    'Pss': 'pss_kb',
+    'Shared_Clean': 'shared_kb',
+    'Shared_Dirty': 'shared_kb',
+    'Private_Clean': 'private_kb',
+    'Private_Dirty': 'private_kb',
+    'Swap': 'swap_kb',
+}
+
+
+def memory_usage(pid='self'):
+    """Memory of `pid` in KB as {rss_kb, pss_kb, shared_kb, private_kb, swap_kb}, or {} without /proc"""
+    # smaps_rollup (Linux 4.14+) sums all mappings; older kernels list them one by one
+    for name in ('smaps_rollup', 'smaps'):
+        path = os.path.join('/proc', str(pid), name)
+        if os.path.exists(path):
+            break
+    else:
+        return {}
+
+    usage = dict.fromkeys(FIELDS.values(), 0)
+    try:
+        with open(path) as f:
+            for line in f:
+                key, _, rest = line.partition(':')
+                if key in FIELDS:
+                    usage[FIELDS[key]] += int(rest.split()[0])
+    except OSError:
+        return {}
+    return usage
@@ -0,0 +1,228 @@
+"""Low-overhead, multi-process metrics with Prometheus text exposition
+
+All counters, gauges and histograms live in one anonymous shared-memory block
+allocated when this module is imported. Gunicorn preloads the app
+(`preload_app = True`), so the block is created once in the master and every
+forked worker updates the same memory; /metrics served by any worker reports
+totals across all of them. Metrics must therefore be declared at import time,
+before the fork. Each request takes the process-shared lock once, when its
+measurements are committed.
+"""
+import bisect
+import itertools
+import mmap
+import multiprocessing
+import time
+
+import numpy as np
+
+# Histogram bucket upper bounds in seconds (+Inf is implicit)
+LATENCY_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0
+)
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class SharedArena:
+    """Fixed-size block of float64 slots shared with forked child processes"""
+
+    def __init__(self, slots=8192):
+        self._buffer = mmap.mmap(-1, slots * 8)
+        self.values = np.frombuffer(self._buffer, dtype=np.float64)
+        self.lock = multiprocessing.Lock()
+        self._next = 0
+
+    def allocate(self, count):
+        """Reserve `count` consecutive slots and return the first index"""
+        if self._next + count > len(self.values):
+            raise MemoryError('Metrics arena is full')
+        start = self._next
+        self._next += count
+        return start
+
+
+class _Metric:
+    """Base class: one block of slots per combination of label values"""
+
+    kind = None
+    slots_per_series = 1
+
+    def __init__(self, arena, name, help_text, labels=None):
+        self.arena = arena
+        self.name = name
+        self.help = help_text
+        labels = labels or {}
+        self.label_names = tuple(labels)
+        self.series = list(itertools.product(*labels.values())) or [()]
+        self._index = {key: i for i, key in enumerate(self.series)}
+        self.offset = arena.allocate(len(self.series) * self.slots_per_series)
+
+    def _base(self, labels):
+        """Return the first slot for a label tuple, falling back to the last series"""
+        return self.offset + self._index.get(labels, len(self.series) - 1) * self.slots_per_series
+
+    def value(self, labels=()):
+        """Current value of a counter or gauge series"""
+        return float(self.arena.values[self._base(labels)])
+
+    def _format_labels(self, labels, extra=()):
+        pairs = list(zip(self.label_names, labels)) + list(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{key}="{value}"' for key, value in pairs) + '}'
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        values = self.arena.values
+        for labels in self.series:
+            lines.append(f'{self.name}{self._format_labels(labels)} {_number(values[self._base(labels)])}')
+        return lines
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, labels=(), amount=1.0):
+        """Increment without locking; call inside MetricsRegistry.lock"""
+        self.arena.values[self._base(labels)] += amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value, labels=()):
+        self.arena.values[self._base(labels)] = value
+
+    def inc(self, labels=(), amount=1.0):
+        self.arena.values[self._base(labels)] += amount
+
+
+class Histogram(_Metric):
+    """Bucketed histogram; bucket counts are stored non-cumulatively"""
+
+    kind = 'histogram'
+
+    def __init__(self, arena, name, help_text, labels=None, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        # One slot per bucket, one for +Inf, then sum and count
+        self.slots_per_series = len(self.buckets) + 3
+        super().__init__(arena, name, help_text, labels)
+
+    def observe(self, value, labels=()):
+        """Record one observation without locking; call inside MetricsRegistry.lock"""
+        base = self._base(labels)
+        values = self.arena.values
+        values[base + bisect.bisect_left(self.buckets, value)] += 1
+        values[base + len(self.buckets) + 1] += value
+        values[base + len(self.buckets) + 2] += 1
+
+    def snapshot(self, labels=()):
+        """Return (bucket_counts, sum, count) for one series"""
+        base = self._base(labels)
+        n = len(self.buckets)
+        values = self.arena.values[base:base + n + 3].copy()
+        return values[:n + 1], values[n + 1], values[n + 2]
+
+    def quantile(self, q, labels=()):
+        """Estimate a quantile by linear interpolation inside its bucket"""
+        counts, _, total = self.snapshot(labels)
+        if total == 0:
+            return float('nan')
+        rank = q * total
+        cumulative = 0.0
+        for i, count in enumerate(counts):
+            if cumulative + count >= rank and count > 0:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        for labels in self.series:
+            counts, total_sum, total = self.snapshot(labels)
+            cumulative = np.cumsum(counts)
+            for bound, value in zip(self.buckets + ('+Inf',), cumulative):
+                le = bound if bound == '+Inf' else repr(float(bound))
+                lines.append(f'{self.name}_bucket{self._format_labels(labels, [("le", le)])} {_number(value)}')
+            lines.append(f'{self.name}_sum{self._format_labels(labels)} {_number(total_sum)}')
+            lines.append(f'{self.name}_count{self._format_labels(labels)} {_number(total)}')
+        return lines
+
+    def expose_quantiles(self, name, help_text):
+        """Estimated p50/p95/p99 as a gauge family (for dashboards without histogram_quantile)"""
+        lines = [f'# HELP {name} {help_text}', f'# TYPE {name} gauge']
+        for labels in self.series:
+            for q in QUANTILES:
+                value = self.quantile(q, labels)
+                if value == value:  # skip NaN for empty series
+                    lines.append(f'{name}{self._format_labels(labels, [("quantile", q)])} {_number(value)}')
+        return lines
+
+
+def _number(value):
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class StageTimer:
+    """Measure consecutive stages of one request with perf_counter"""
+
+    __slots__ = ('started', '_last', 'stages')
+
+    def __init__(self):
+        self.started = self._last = time.perf_counter()
+        self.stages = []
+
+    def mark(self, stage):
+        """Record the time since the previous mark under `stage`"""
+        now = time.perf_counter()
+        self.stages.append((stage, now - self._last))
+        self._last = now
+
+    def skip(self):
+        """Restart the clock without recording a stage"""
+        self._last = time.perf_counter()
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+class MetricsRegistry:
+    """Collection of metrics sharing one arena and one lock"""
+
+    def __init__(self, namespace, arena=None):
+        self.namespace = namespace
+        self.arena = arena or SharedArena()
+        self.lock = self.arena.lock
+        self._metrics = []
+        self._quantile_families = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labels=None):
+        return self._add(Counter(self.arena, f'{self.namespace}_{name}', help_text, labels))
+
+    def gauge(self, name, help_text, labels=None):
+        return self._add(Gauge(self.arena, f'{self.namespace}_{name}', help_text, labels))
+
+    def histogram(self, name, help_text, labels=None, buckets=LATENCY_BUCKETS, quantiles=False):
+        histogram = self._add(Histogram(self.arena, f'{self.namespace}_{name}', help_text, labels, buckets))
+        if quantiles:
+            self._quantile_families.append(histogram)
+        return histogram
+
+    def expose(self):
+        """Render every metric in Prometheus text format"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.expose())
+        for histogram in self._quantile_families:
+            lines.extend(histogram.expose_quantiles(
+                f'{histogram.name}_quantile', f'Estimated quantiles of {histogram.name}'
+            ))
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,148 @@
+"""Several versioned models served side by side from one process
+
+A manifest (JSON, `MODEL_REGISTRY`) names the models and how traffic is split
+between them:
+
+    {
+      "models": {
+        "baseline": "house_price_model.json",
+        "ridge-v2": "models/ridge_v2.json",
+        "west-v3": "models/west_v3.json"
+      },
+      "routes": {
+        "default": {"baseline": 90, "ridge-v2": 10},
+        "west": {"west-v3": 1}
+      }
+    }
+
+Models are JSON serving artifacts (train_model.py --artifact); paths are
+relative to the manifest. A request names a model or a route (request field or
+header, see app.py). Naming a model serves that model. Naming a route picks one
+of the route's models in proportion to its weights. Requests that name nothing
+use the "default" route. When the request carries a routing key, the pick is a
+hash of the key, so a given user always sees the same arm. Without a key it is
+random.
+
+All fused coefficients live in one read-only float64 matrix. Each engine
+scores through a view of its row. The registry is loaded before gunicorn forks
+(`preload_app`), so every worker reads the same physical pages.
+"""
+import bisect
+import hashlib
+import json
+import os
+import random
+
+import numpy as np
+
+from inference import FEATURES, FusedLinearEngine
+
+DEFAULT_ROUTE = 'default'
+
+
+def read_manifest(path):
+    """Load and check a registry manifest; model paths come back absolute"""
+    with open(path) as f:
+        manifest = json.load(f)
+
+    models = manifest.get('models')
+    if not isinstance(models, dict) or not models:
+        raise ValueError(f"{path} must map at least one model name to an artifact path")
+    base = os.path.dirname(os.path.abspath(path))
+    models = {name: os.path.join(base, model_path) for name, model_path in models.items()}
+
+    # A registry without routes sends all default traffic to its first model
+    routes = manifest.get('routes') or {DEFAULT_ROUTE: {next(iter(models)): 1}}
+    if DEFAULT_ROUTE not in routes:
+        raise ValueError(f"{path} has no '{DEFAULT_ROUTE}' route")
+    for route, weights in routes.items():
+        if route in models:
+            raise ValueError(f"Route '{route}' has the same name as a model")
+        if not isinstance(weights, dict) or not weights:
+            raise ValueError(f"Route '{route}' must map model names to weights")
+        unknown = set(weights) - set(models)
+        if unknown:
+            raise ValueError(f"Route '{route}' refers to unknown models: {', '.join(sorted(unknown))}")
+        if not all(isinstance(w, (int, float)) and w >= 0 for w in weights.values()) or not sum(weights.values()):
+            raise ValueError(f"Route '{route}' weights must be non-negative numbers with a positive total")
+    return {'models': models, 'routes': routes}
+
+
+def _hash_fraction(route, routing_key):
+    """Map a routing key to a stable point in [0, 1), independently per route"""
+    digest = hashlib.blake2b(f'{route}\0{routing_key}'.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') / 2.0 ** 64
+
+
+class ModelRegistry:
+    """Named fused engines plus weighted routes between them"""
+
+    def __init__(self, artifacts, routes, versions=None, paths=None):
+        """`artifacts` maps model names to dicts returned by inference.read_artifact"""
+        names = list(artifacts)
+        # One contiguous block: fused coefficients, then the intercept, per model
+        weights = np.empty((len(names), len(FEATURES) + 1), dtype=np.float64)
+        for i, name in enumerate(names):
+            fused = FusedLinearEngine.from_artifact(artifacts[name])
+            weights[i, :-1] = fused.coef
+            weights[i, -1] = fused.intercept
+        weights.flags.writeable = False
+        self.weights = weights
+
+        self.engines = {}
+        for i, name in enumerate(names):
+            engine = FusedLinearEngine(weights[i, :-1], weights[i, -1])
+            engine.version = (versions or {}).get(name)
+            self.engines[name] = engine
+        self.paths = paths or {}
+
+        # route -> (model names, cumulative weights normalised to end at 1.0)
+        self.routes = {}
+        for route, split in routes.items():
+            arms = [(name, float(weight)) for name, weight in split.items() if weight > 0]
+            total = sum(weight for _, weight in arms)
+            cumulative = np.cumsum([weight / total for _, weight in arms]).tolist()
+            self.routes[route] = ([name for name, _ in arms], cumulative)
+
+    @property
+    def names(self):
+        return list(self.engines)
+
+    @property
+    def primary(self):
+        """Most heavily weighted model of the default route"""
+        names, cumulative = self.routes[DEFAULT_ROUTE]
+        shares = np.diff([0.0] + cumulative)
+        return self.engines[names[int(np.argmax(shares))]]
+
+    def route(self, selector=None, routing_key=None):
+        """Return (model_name, engine) for a request, or None if `selector` is unknown"""
+        if selector is not None and not isinstance(selector, str):
+            return None
+        if selector in self.engines:
+            return selector, self.engines[selector]
+        split = self.routes.get(selector or DEFAULT_ROUTE)
+        if split is None:
+            return None
+
+        names, cumulative = split
+        if len(names) == 1:
+            name = names[0]
+        else:
+            point = _hash_fraction(selector or DEFAULT_ROUTE, routing_key) if routing_key else random.random()
+            name = names[min(bisect.bisect_right(cumulative, point), len(names) - 1)]
+        return name, self.engines[name]
+
+    def stats(self):
+        """Models and routes, for /health"""
+        return {
+            'enabled': True,
+            'models': {
+                name: {'version': engine.version, 'path': self.paths.get(name)}
+                for name, engine in self.engines.items()
+            },
+            'routes': {
+                route: {name: round(share, 6) for name, share in zip(names, np.diff([0.0] + cumulative).tolist())}
+                for route, (names, cumulative) in self.routes.items()
+            },
+        }
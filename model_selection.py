@@ -0,0 +1,199 @@
+"""Parallel k-fold cross-validation over a grid of scalers and regressors
+
+Every (candidate, fold) pair is one task on a process pool. The training
+matrix is copied once into a `multiprocessing.shared_memory` block; workers
+attach to it by name and index their folds from it, so no task pickles or
+copies the data. Fold assignment is a seeded permutation recomputed in each
+worker, which keeps results identical for any number of workers.
+
+A grid maps scaler names and regressor names to lists of keyword-argument
+dicts, e.g.
+
+    {"scalers": {"standard": [{}], "robust": [{}]},
+     "regressors": {"linear": [{}], "ridge": [{"alpha": 1.0}, {"alpha": 10.0}]}}
+
+Only scalers that are per-feature affine maps are offered, so every selected
+pipeline can be served by the fused engine and exported as a JSON artifact.
+"""
+import itertools
+import json
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+from sklearn.linear_model import ElasticNet, HuberRegressor, Lasso, LinearRegression, Ridge
+from sklearn.preprocessing import MaxAbsScaler, MinMaxScaler, RobustScaler, StandardScaler
+
+SCALERS = {
+    'standard': StandardScaler,
+    'robust': RobustScaler,
+    'minmax': MinMaxScaler,
+    'maxabs': MaxAbsScaler,
+}
+
+REGRESSORS = {
+    'linear': LinearRegression,
+    'ridge': Ridge,
+    'lasso': Lasso,
+    'elasticnet': ElasticNet,
+    'huber': HuberRegressor,
+}
+
+DEFAULT_GRID = {
+    'scalers': {'standard': [{}], 'robust': [{}], 'minmax': [{}]},
+    'regressors': {
+        'linear': [{}],
+        'ridge': [{'alpha': alpha} for alpha in (0.1, 1.0, 10.0, 100.0)],
+        'lasso': [{'alpha': alpha, 'max_iter': 10000} for alpha in (1.0, 100.0)],
+        'huber': [{'epsilon': 1.35, 'max_iter': 1000}],
+    },
+}
+
+# One scaler + regressor configuration from the grid
+Candidate = namedtuple('Candidate', ['scaler', 'scaler_params', 'regressor', 'regressor_params'])
+
+# Cross-validation result for one candidate
+#   fit_seconds  - time spent fitting, summed over folds
+#   wall_seconds - from the start of its first fold to the end of its last
+CandidateResult = namedtuple('CandidateResult', [
+    'candidate', 'r2_mean', 'r2_std', 'rmse_mean', 'fit_seconds', 'wall_seconds', 'folds',
+])
+
+
+def load_grid(path=None):
+    """Read a grid JSON file, or return DEFAULT_GRID"""
+    if path is None:
+        return DEFAULT_GRID
+    with open(path) as f:
+        grid = json.load(f)
+    for section, known in (('scalers', SCALERS), ('regressors', REGRESSORS)):
+        unknown = set(grid.get(section, {})) - set(known)
+        if unknown:
+            raise ValueError(f"Unknown {section}: {', '.join(sorted(unknown))} (expected one of {', '.join(known)})")
+    return grid
+
+
+def expand_grid(grid):
+    """List every Candidate in a grid"""
+    scalers = [(name, params) for name, options in grid['scalers'].items() for params in options]
+    regressors = [(name, params) for name, options in grid['regressors'].items() for params in options]
+    return [Candidate(s, sp, r, rp) for (s, sp), (r, rp) in itertools.product(scalers, regressors)]
+
+
+def describe(candidate):
+    """Short label such as 'robust + ridge(alpha=10.0)'"""
+    def label(name, params):
+        return f"{name}({', '.join(f'{k}={v}' for k, v in params.items())})" if params else name
+    return f"{label(candidate.scaler, candidate.scaler_params)} + {label(candidate.regressor, candidate.regressor_params)}"
+
+
+def build(candidate):
+    """Unfitted (model, scaler) for a candidate"""
+    scaler = SCALERS[candidate.scaler](**candidate.scaler_params)
+    model = REGRESSORS[candidate.regressor](**candidate.regressor_params)
+    return model, scaler
+
+
+def fit(candidate, features, target):
+    """Fit a candidate's scaler and model; returns (model, scaler)"""
+    model, scaler = build(candidate)
+    model.fit(scaler.fit_transform(features), target)
+    return model, scaler
+
+
+def fold_indices(n_rows, folds, seed, fold):
+    """(train, test) row indices of one fold of a seeded shuffled k-fold split"""
+    order = np.random.default_rng(seed).permutation(n_rows)
+    test = np.sort(np.array_split(order, folds)[fold])
+    train = np.setdiff1d(np.arange(n_rows), test, assume_unique=True)
+    return train, test
+
+
+# Views onto the shared training data, attached once per worker process
+_shared = {}
+
+
+def _attach(block_name, shape):
+    """Initializer: map the shared [features, target] matrix without copying it"""
+    block = shared_memory.SharedMemory(name=block_name)
+    _shared['block'] = block
+    _shared['data'] = np.ndarray(shape, dtype=np.float64, buffer=block.buf)
+
+
+def _run_fold(index, candidate, folds, seed, fold):
+    """Fit and score one candidate on one fold
+
+    Returns (index, fold, r2, rmse, fit_seconds, started, ended); the wall-clock
+    timestamps let the parent compute each candidate's elapsed time.
+    """
+    started = time.time()
+    data = _shared['data']
+    train, test = fold_indices(data.shape[0], folds, seed, fold)
+    fit_started = time.perf_counter()
+    model, scaler = fit(candidate, data[train, :-1], data[train, -1])
+    fit_seconds = time.perf_counter() - fit_started
+
+    target = data[test, -1]
+    residual = target - model.predict(scaler.transform(data[test, :-1]))
+    sse = float(residual @ residual)
+    sst = float(((target - target.mean()) ** 2).sum())
+    return index, fold, 1.0 - sse / sst, float(np.sqrt(sse / len(target))), fit_seconds, started, time.time()
+
+
+def cross_validate(features, target, candidates, folds=5, workers=None, seed=42):
+    """Score every candidate with k-fold CV on a process pool
+
+    Returns a list of CandidateResult sorted best first (highest mean R²).
+    """
+    data = np.column_stack([features, target]).astype(np.float64)
+    block = shared_memory.SharedMemory(create=True, size=data.nbytes)
+    try:
+        np.ndarray(data.shape, dtype=np.float64, buffer=block.buf)[:] = data
+        del data
+
+        # Scores are kept by fold so the averages do not depend on completion order
+        scores = {i: [None] * folds for i in range(len(candidates))}
+        fit_seconds = dict.fromkeys(scores, 0.0)
+        spans = {i: [] for i in scores}
+
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                                 initializer=_attach, initargs=(block.name, (len(target), features.shape[1] + 1))) as pool:
+            futures = [
+                pool.submit(_run_fold, i, candidate, folds, seed, fold)
+                for i, candidate in enumerate(candidates) for fold in range(folds)
+            ]
+            for future in as_completed(futures):
+                i, fold, r2, rmse, seconds, started, ended = future.result()
+                scores[i][fold] = (r2, rmse)
+                fit_seconds[i] += seconds
+                spans[i].extend((started, ended))
+    finally:
+        block.close()
+        block.unlink()
+
+    results = []
+    for i, candidate in enumerate(candidates):
+        r2 = np.array([score[0] for score in scores[i]])
+        rmse = np.array([score[1] for score in scores[i]])
+        results.append(CandidateResult(
+            candidate, float(r2.mean()), float(r2.std()), float(rmse.mean()),
+            fit_seconds[i], max(spans[i]) - min(spans[i]), folds
+        ))
+    return sorted(results, key=lambda result: -result.r2_mean)
+
+
+def print_report(results, wall_seconds, out=None):
+    """Print one line per candidate, best first"""
+    print(f"{'candidate':<48} {'R² mean':>9} {'R² std':>8} {'RMSE':>12} {'fit s':>8} {'wall s':>8}", file=out)
+    for result in results:
+        print(
+            f"{describe(result.candidate):<48} {result.r2_mean:>9.4f} {result.r2_std:>8.4f} "
+            f"{result.rmse_mean:>12,.0f} {result.fit_seconds:>8.2f} {result.wall_seconds:>8.2f}",
+            file=out
+        )
+    total_fit = sum(result.fit_seconds for result in results)
+    print(f"{len(results)} candidates x {results[0].folds} folds in {wall_seconds:.2f}s wall "
+          f"({total_fit:.2f}s of fitting, {total_fit / wall_seconds if wall_seconds else 0:.1f}x parallel)", file=out)
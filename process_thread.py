@@ -0,0 +1,46 @@
+"""A background thread started lazily, once in each process
+
+Gunicorn forks its workers from a preloaded master, and only the forking
+thread survives a fork. An object created at import time (the audit log, the
+micro-batcher) cannot start its thread then: the master would own it and the
+workers would have none. Instead it starts one on first use in each process,
+and resets the per-process state that thread consumes (e.g. its queue) first.
+"""
+import os
+import threading
+
+
+class ProcessThread:
+    """Daemon thread running `target`, started by the first `ensure_started()` in each process"""
+
+    def __init__(self, target, name, on_start=None):
+        self.target = target
+        self.name = name
+        # Called with the lock held, in the new process, before the thread starts
+        self.on_start = on_start
+        self.thread = None
+        self.pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        """Whether this process has started its thread (and not joined it)"""
+        return self.pid == os.getpid()
+
+    def ensure_started(self):
+        """Start this process's thread if it has not been started yet"""
+        if self.pid == os.getpid():
+            return
+        with self._lock:
+            if self.pid != os.getpid():
+                if self.on_start is not None:
+                    self.on_start()
+                self.thread = threading.Thread(target=self.target, name=self.name, daemon=True)
+                self.thread.start()
+                self.pid = os.getpid()
+
+    def join(self, timeout=None):
+        """Wait for this process's thread to finish; a later ensure_started() starts a new one"""
+        if self.running:
+            self.thread.join(timeout)
+            self.pid = None
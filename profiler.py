@@ -0,0 +1,156 @@
+"""Opt-in per-request profiling with collapsed-stack (flamegraph) output
+
+A profiled request runs with `sys.setprofile` installed on its thread. Every
+Python call and every call into C (NumPy ufuncs, BLAS dot products, sklearn
+validation helpers) becomes a frame, labelled `module.qualname`. The time
+between consecutive events is charged to the stack active at that moment, so
+each stack's total is its self time in microseconds.
+
+Stacks from all profiled requests of a process are summed and rendered in the
+collapsed format read by flamegraph.pl, speedscope and inferno:
+
+    predict;app.predict;inference.FusedLinearEngine.predict;numpy.dot 412
+
+Collapsed files can simply be concatenated, so dumps from several workers
+merge with `cat profile.folded.* | flamegraph.pl > flame.svg`.
+
+Requests that are not profiled never touch this module, so profiling costs
+nothing when it is off.
+"""
+import atexit
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+def _python_label(frame):
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__', '?')}.{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def _c_label(function):
+    module = getattr(function, '__module__', None)
+    if module is None:
+        owner = getattr(function, '__self__', None)
+        module = type(owner).__module__ if owner is not None else 'builtins'
+    return f"{module}.{getattr(function, '__qualname__', repr(function))}"
+
+
+class _Trace:
+    """Stack bookkeeping for one profiled request on one thread"""
+
+    __slots__ = ('stack', 'frames', 'totals', 'last')
+
+    def __init__(self, root):
+        self.stack = [root]
+        # Parallel to `stack`: the Python frame of each entry, None for C calls and the root
+        self.frames = [None]
+        self.totals = Counter()
+        self.last = time.perf_counter_ns()
+
+    def __call__(self, frame, event, arg):
+        now = time.perf_counter_ns()
+        self.totals[tuple(self.stack)] += now - self.last
+
+        if event == 'call':
+            self.stack.append(_python_label(frame))
+            self.frames.append(frame)
+        elif event == 'return':
+            # Frames that were already running when profiling started are not on the stack
+            for depth in range(len(self.frames) - 1, 0, -1):
+                if self.frames[depth] is frame:
+                    del self.stack[depth:], self.frames[depth:]
+                    break
+        elif event == 'c_call':
+            self.stack.append(_c_label(arg))
+            self.frames.append(None)
+        elif len(self.stack) > 1 and self.frames[-1] is None:
+            # c_return / c_exception
+            self.stack.pop()
+            self.frames.pop()
+
+        # Exclude the time spent in this function from the next interval
+        self.last = time.perf_counter_ns()
+
+
+class RequestProfiler:
+    """Profile selected requests and aggregate their stacks for this process"""
+
+    def __init__(self, output=None, dump_every=100):
+        # Collapsed stacks are written to `<output>.<pid>` every `dump_every`
+        # profiled requests and at exit; None keeps them in memory only
+        self.output = output
+        self.dump_every = dump_every
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._totals = Counter()
+        self._pid = os.getpid()
+        self.requests = 0
+        self._atexit_pid = None
+
+    def start(self, root):
+        """Start profiling the current thread; `root` labels the bottom frame (e.g. the endpoint)"""
+        trace = _Trace(root)
+        self._local.trace = trace
+        sys.setprofile(trace)
+
+    def stop(self):
+        """Stop profiling the current thread and add its stacks to the totals"""
+        sys.setprofile(None)
+        trace = getattr(self._local, 'trace', None)
+        if trace is None:
+            return
+        self._local.trace = None
+
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked worker: the parent's samples are not ours
+                self._totals = Counter()
+                self.requests = 0
+                self._pid = os.getpid()
+            self._totals.update(trace.totals)
+            self.requests += 1
+            due = self.output and self.dump_every and self.requests % self.dump_every == 0
+        if self.output and self._atexit_pid != os.getpid():
+            atexit.register(self.dump)
+            self._atexit_pid = os.getpid()
+        if due:
+            self.dump()
+
+    @property
+    def active(self):
+        return getattr(self._local, 'trace', None) is not None
+
+    def collapsed(self):
+        """Aggregated stacks in collapsed format, microseconds per stack"""
+        with self._lock:
+            totals = list(self._totals.items()) if self._pid == os.getpid() else []
+        lines = [f"{';'.join(stack)} {nanoseconds // 1000}" for stack, nanoseconds in totals if nanoseconds >= 1000]
+        return ''.join(line + '\n' for line in sorted(lines))
+
+    def reset(self):
+        with self._lock:
+            self._totals = Counter()
+            self.requests = 0
+
+    def dump(self):
+        """Write the collapsed stacks of this process to `<output>.<pid>`"""
+        if not self.output:
+            return None
+        path = f'{self.output}.{os.getpid()}'
+        partial = path + '.partial'
+        with open(partial, 'w') as f:
+            f.write(self.collapsed())
+        os.replace(partial, path)
+        return path
+
+    def stats(self):
+        with self._lock:
+            mine = self._pid == os.getpid()
+            return {
+                'requests': self.requests if mine else 0,
+                'stacks': len(self._totals) if mine else 0,
+                'output': f'{self.output}.{os.getpid()}' if self.output else None,
+            }
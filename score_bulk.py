@@ -0,0 +1,210 @@
+"""Offline bulk scoring for large house datasets
+
+Loads the model and scaler once, splits the input into chunks and scores them
+across a process pool. Output is written in the same format as the input:
+
+    python score_bulk.py houses.npy predictions.npy
+    python score_bulk.py houses.csv predictions.csv --chunk-size 200000
+    python score_bulk.py houses.parquet predictions.parquet --workers 8
+
+`.npy` input must be a 2-D numeric matrix with columns in FEATURES order; it is
+memory-mapped and each worker writes its slice of a memory-mapped `.npy` of
+predictions. CSV and Parquet input must have the FEATURES columns; the output
+is the input with `prediction` and `error` columns added. Rows that fail
+validation get a NaN prediction (and, for CSV/Parquet, the validation message).
+Parquet support needs pyarrow.
+"""
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+
+from inference import FEATURES, build_engine
+from validation import validate_columns, validate_matrix
+
+# Engine loaded once per worker process by the pool initializer
+_engine = None
+
+
+def _init_worker(engine):
+    global _engine
+    _engine = engine
+
+
+def _predict_checked(checked):
+    """Predictions for every row of a ColumnarResult, NaN where invalid"""
+    predictions = np.full(len(checked.valid), np.nan)
+    if len(checked.features):
+        predictions[checked.valid] = _engine.predict(checked.features)
+    return predictions
+
+
+def _score_columns(columns, n_rows):
+    """Validate and score an in-memory chunk
+
+    Returns (pid, rows, seconds, predictions, errors).
+    """
+    start = time.perf_counter()
+    checked = validate_columns(columns, n_rows)
+    predictions = _predict_checked(checked)
+    return os.getpid(), n_rows, time.perf_counter() - start, predictions, checked.errors
+
+
+def _score_npy_slice(input_path, output_path, start, stop):
+    """Score rows [start, stop) of a memory-mapped .npy straight into the output file"""
+    began = time.perf_counter()
+    checked = validate_matrix(np.load(input_path, mmap_mode='r')[start:stop])
+    output = np.load(output_path, mmap_mode='r+')
+    output[start:stop] = _predict_checked(checked)
+    output.flush()
+    return os.getpid(), stop - start, time.perf_counter() - began, None, checked.errors
+
+
+class ThroughputReport:
+    """Accumulate rows and compute time per worker process"""
+
+    def __init__(self):
+        self.rows = defaultdict(int)
+        self.seconds = defaultdict(float)
+        self.invalid = 0
+        self.started = time.perf_counter()
+
+    def add(self, pid, rows, seconds, invalid=0):
+        self.rows[pid] += rows
+        self.seconds[pid] += seconds
+        self.invalid += invalid
+
+    def summary(self, out=sys.stderr):
+        wall = time.perf_counter() - self.started
+        total = sum(self.rows.values())
+        print(f"{'worker':>10} {'rows':>14} {'busy s':>10} {'rows/sec':>14}", file=out)
+        for pid in sorted(self.rows):
+            busy = self.seconds[pid]
+            rate = self.rows[pid] / busy if busy else float('inf')
+            print(f"{pid:>10} {self.rows[pid]:>14,} {busy:>10.2f} {rate:>14,.0f}", file=out)
+        print(f"Scored {total:,} rows in {wall:.2f}s ({total / wall if wall else 0:,.0f} rows/sec overall)", file=out)
+        if self.invalid:
+            print(f"{self.invalid:,} rows failed validation and have no prediction", file=out)
+
+
+def _collect(future, report):
+    pid, rows, seconds, predictions, errors = future.result()
+    report.add(pid, rows, seconds, len(errors))
+    return predictions, errors
+
+
+def score_npy(pool, input_path, output_path, chunk_size, report):
+    features = np.load(input_path, mmap_mode='r')
+    if features.ndim != 2 or features.shape[1] != len(FEATURES):
+        raise ValueError(f"Expected a (rows, {len(FEATURES)}) matrix, got shape {features.shape}")
+
+    n_rows = features.shape[0]
+    np.lib.format.open_memmap(output_path, mode='w+', dtype=np.float64, shape=(n_rows,)).flush()
+
+    futures = [
+        pool.submit(_score_npy_slice, input_path, output_path, start, min(start + chunk_size, n_rows))
+        for start in range(0, n_rows, chunk_size)
+    ]
+    for future in futures:
+        _collect(future, report)
+
+
+def _scored_frame(frame, future, report):
+    predictions, errors = _collect(future, report)
+    messages = np.full(len(frame), '', dtype=object)
+    for index, message in errors:
+        messages[index] = message
+    return frame.assign(prediction=predictions, error=messages)
+
+
+def _score_frames(pool, frames, write, max_pending, report):
+    """Score DataFrame chunks in order, keeping at most max_pending chunks in flight"""
+    pending = deque()
+    for frame in frames:
+        missing = [field for field in FEATURES if field not in frame.columns]
+        if missing:
+            raise ValueError(f"Missing required columns: {', '.join(missing)}")
+        columns = {field: frame[field].to_numpy() for field in FEATURES}
+        pending.append((frame, pool.submit(_score_columns, columns, len(frame))))
+        if len(pending) >= max_pending:
+            write(_scored_frame(*pending.popleft(), report))
+    while pending:
+        write(_scored_frame(*pending.popleft(), report))
+
+
+def score_csv(pool, input_path, output_path, chunk_size, max_pending, report):
+    import pandas as pd
+
+    first = [True]
+
+    def write(frame):
+        frame.to_csv(output_path, mode='w' if first[0] else 'a', header=first[0], index=False)
+        first[0] = False
+
+    _score_frames(pool, pd.read_csv(input_path, chunksize=chunk_size), write, max_pending, report)
+
+
+def score_parquet(pool, input_path, output_path, chunk_size, max_pending, report):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("Parquet support requires pyarrow: pip install pyarrow")
+
+    source = pq.ParquetFile(input_path)
+    writer = None
+    try:
+        def write(frame):
+            nonlocal writer
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(output_path, table.schema)
+            writer.write_table(table)
+
+        frames = (batch.to_pandas() for batch in source.iter_batches(batch_size=chunk_size))
+        _score_frames(pool, frames, write, max_pending, report)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Score a large file of houses offline.')
+    parser.add_argument('input', help='Input .npy, .csv or .parquet file')
+    parser.add_argument('output', help='Output file (same format as the input)')
+    parser.add_argument('--model', default=os.environ.get('MODEL_PATH', 'house_price_model.joblib'))
+    parser.add_argument('--scaler', default=os.environ.get('SCALER_PATH', 'scaler.joblib'))
+    parser.add_argument('--engine', default=os.environ.get('INFERENCE_ENGINE', 'fused'))
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Worker processes (default: all cores)')
+    parser.add_argument('--chunk-size', type=int, default=None,
+                        help='Rows per chunk (default: 1,000,000 for .npy, 200,000 otherwise)')
+    args = parser.parse_args(argv)
+
+    extension = os.path.splitext(args.input)[1].lower()
+    if extension not in ('.npy', '.csv', '.parquet', '.pq'):
+        parser.error(f"Unsupported input format: {extension}")
+    if os.path.splitext(args.output)[1].lower() != extension:
+        parser.error("Output must use the same format as the input")
+
+    chunk_size = args.chunk_size or (1_000_000 if extension == '.npy' else 200_000)
+    engine = build_engine(args.engine, joblib.load(args.model), joblib.load(args.scaler))
+    report = ThroughputReport()
+
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(engine,)) as pool:
+        if extension == '.npy':
+            score_npy(pool, args.input, args.output, chunk_size, report)
+        elif extension == '.csv':
+            score_csv(pool, args.input, args.output, chunk_size, args.workers * 2, report)
+        else:
+            score_parquet(pool, args.input, args.output, chunk_size, args.workers * 2, report)
+
+    report.summary()
+
+
+if __name__ == '__main__':
+    main()
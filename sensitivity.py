@@ -0,0 +1,80 @@
+"""What-if grids: one house with one or two features swept over a range
+
+A price curve (price against sqft) or surface (sqft by age) is the base house
+repeated once per grid point, with the swept features replaced. The whole grid
+is built as one (points, 4) matrix and scored in a single call, instead of one
+/predict round trip per point.
+
+Each swept feature is given either as explicit values or as a linear range:
+
+    {"sqft": {"min": 1000, "max": 4000, "steps": 31}, "age": [0, 10, 20, 30]}
+
+The model is linear, so each feature's marginal effect (the price change per
+unit) is its fused coefficient. It is the same everywhere on the grid; see
+FusedLinearEngine.marginal_effects.
+"""
+import math
+
+import numpy as np
+
+from inference import FEATURES
+from validation import FEATURE_BOUNDS
+
+MAX_AXES = 2
+
+
+def _axis_values(field, spec, max_steps):
+    """Values of one swept feature as a float64 vector, checked against its bounds"""
+    if isinstance(spec, list):
+        try:
+            values = np.array(spec, dtype=np.float64)
+        except (ValueError, TypeError):
+            raise ValueError(f"'{field}' values must be numbers")
+        if values.ndim != 1 or not len(values):
+            raise ValueError(f"'{field}' must list at least one value")
+    elif isinstance(spec, dict):
+        try:
+            low, high, steps = float(spec['min']), float(spec['max']), spec['steps']
+        except KeyError as e:
+            raise ValueError(f"'{field}' range is missing {e}")
+        except (ValueError, TypeError):
+            raise ValueError(f"'{field}' min and max must be numbers")
+        if not isinstance(steps, int) or isinstance(steps, bool) or not 2 <= steps <= max_steps:
+            raise ValueError(f"'{field}' steps must be an integer between 2 and {max_steps}")
+        values = np.linspace(low, high, steps)
+    else:
+        raise ValueError(f"'{field}' must be a list of values or {{\"min\", \"max\", \"steps\"}}")
+
+    low, high, message = FEATURE_BOUNDS[field]
+    if not np.all((values >= low) & (values <= high)):
+        raise ValueError(f"'{field}' values out of range: {message}")
+    return values
+
+
+def grid_axes(vary, max_points):
+    """Parse the `vary` object into [(field, values), ...] in FEATURES order
+
+    Raises ValueError for a malformed object, unknown features, out-of-range
+    values or more than `max_points` grid points.
+    """
+    if not isinstance(vary, dict) or not 1 <= len(vary) <= MAX_AXES:
+        raise ValueError(f"'vary' must map 1 to {MAX_AXES} features to their values")
+    unknown = set(vary) - set(FEATURES)
+    if unknown:
+        raise ValueError(f"Unknown features in 'vary': {', '.join(sorted(unknown))}")
+
+    axes = [(field, _axis_values(field, vary[field], max_points)) for field in FEATURES if field in vary]
+    points = math.prod(len(values) for _, values in axes)
+    if points > max_points:
+        raise ValueError(f"Grid has {points} points, maximum is {max_points}")
+    return axes
+
+
+def grid_features(base, axes):
+    """The (points, len(FEATURES)) matrix of the grid, first axis varying slowest"""
+    shape = tuple(len(values) for _, values in axes)
+    features = np.empty((math.prod(shape), len(FEATURES)), dtype=np.float64)
+    features[:] = [base[field] for field in FEATURES]
+    for (field, _), column in zip(axes, np.meshgrid(*(values for _, values in axes), indexing='ij')):
+        features[:, FEATURES.index(field)] = column.ravel()
+    return features, shape
@@ -0,0 +1,84 @@
+"""Precompressed static assets with strong ETags
+
+The file is read and compressed once (gzip, plus brotli when the optional
+`brotli` package is installed), so serving it is a dictionary lookup. Each
+encoding has its own strong ETag, `If-None-Match` is answered with 304 and
+responses carry `Vary: Accept-Encoding` for shared caches.
+"""
+import gzip
+import hashlib
+
+from flask import Response
+
+from serialization import SECURITY_HEADERS
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+# Preferred first when the client accepts several
+ENCODINGS = ('br', 'gzip', 'identity')
+
+
+def cache_control(max_age):
+    """Cache-Control value for a max age in seconds (0 = always revalidate)"""
+    if max_age <= 0:
+        return 'no-cache'
+    return f'public, max-age={int(max_age)}'
+
+
+class StaticAsset:
+    """One file held in memory in every supported content encoding
+
+    `headers` are extra headers (e.g. a page-specific CSP) sent with every
+    response; the standard security headers are always included.
+    """
+
+    def __init__(self, path, mimetype, max_age=0, headers=None):
+        with open(path, 'rb') as f:
+            body = f.read()
+
+        digest = hashlib.sha256(body).hexdigest()[:20]
+        self.path = path
+        self.mimetype = mimetype
+
+        encoded = {'identity': body}
+        # Compressed output is deterministic (mtime=0), so ETags are stable across workers
+        encoded['gzip'] = gzip.compress(body, compresslevel=9, mtime=0)
+        if brotli is not None:
+            encoded['br'] = brotli.compress(body, quality=11)
+
+        # encoding -> (body, etag, headers for 200, headers for 304), all built once
+        self.variants = {}
+        for encoding, data in encoded.items():
+            if encoding != 'identity' and len(data) >= len(body):
+                continue
+            etag = digest if encoding == 'identity' else f'{digest}-{encoding}'
+            common = [
+                ('ETag', f'"{etag}"'),
+                ('Cache-Control', cache_control(max_age)),
+                ('Vary', 'Accept-Encoding'),
+            ] + list((headers or {}).items()) + list(SECURITY_HEADERS)
+            full = [('Content-Type', mimetype)] + common
+            if encoding != 'identity':
+                full.append(('Content-Encoding', encoding))
+            self.variants[encoding] = (data, etag, full, common)
+
+    def select(self, accept_encodings):
+        """Pick the best stored encoding allowed by an Accept-Encoding header"""
+        for encoding in ENCODINGS:
+            if encoding in self.variants and (encoding == 'identity' or accept_encodings.quality(encoding) > 0):
+                return encoding
+        return 'identity'
+
+    def response(self, request):
+        """Serve the asset for a request, honouring Accept-Encoding and If-None-Match"""
+        body, etag, headers, not_modified_headers = self.variants[self.select(request.accept_encodings)]
+
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304, headers=not_modified_headers)
+        else:
+            response = Response(body, headers=headers)
+        response.security_headers_applied = True
+        return response
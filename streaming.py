@@ -0,0 +1,123 @@
+"""Incremental parsing and formatting for streamed NDJSON/CSV scoring
+
+Nothing here buffers more than one read block plus one chunk of rows, so
+memory stays flat regardless of how large the uploaded body is.
+"""
+import csv
+import io
+import json
+
+from serialization import dumps
+
+NDJSON = 'ndjson'
+CSV = 'csv'
+
+FORMAT_MIMETYPES = {
+    NDJSON: 'application/x-ndjson',
+    CSV: 'text/csv',
+}
+MIMETYPE_FORMATS = {mimetype: fmt for fmt, mimetype in FORMAT_MIMETYPES.items()}
+
+# Content types accepted for each input format
+INPUT_CONTENT_TYPES = {
+    'application/x-ndjson': NDJSON,
+    'application/ndjson': NDJSON,
+    'application/jsonl': NDJSON,
+    'application/json-lines': NDJSON,
+    'text/csv': CSV,
+    'application/csv': CSV,
+}
+
+OUTPUT_FIELDS = ['index', 'bedrooms', 'bathrooms', 'sqft', 'age', 'prediction', 'error', 'message']
+
+
+class LineTooLong(Exception):
+    """Raised when a single input line exceeds the configured maximum"""
+
+
+def iter_lines(stream, read_size=64 * 1024, max_line_length=64 * 1024):
+    """Yield complete lines (without line endings) from a binary stream"""
+    remainder = b''
+    while True:
+        block = stream.read(read_size)
+        if not block:
+            break
+        lines = (remainder + block).split(b'\n')
+        remainder = lines.pop()
+        if len(remainder) > max_line_length:
+            raise LineTooLong(f'Input line exceeds {max_line_length} bytes')
+        for line in lines:
+            yield line.rstrip(b'\r')
+    if remainder.strip():
+        yield remainder.rstrip(b'\r')
+
+
+def iter_records(lines, input_format):
+    """Yield (index, record, error_message) for every data line
+
+    ``record`` is a dict for well-formed lines; otherwise it is None and
+    ``error_message`` explains why the line could not be parsed.
+    """
+    if input_format == CSV:
+        yield from _iter_csv_records(lines)
+    else:
+        yield from _iter_ndjson_records(lines)
+
+
+def _iter_ndjson_records(lines):
+    index = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield index, None, 'Invalid JSON'
+        else:
+            if isinstance(record, dict):
+                yield index, record, None
+            else:
+                yield index, None, 'Each house must be a JSON object'
+        index += 1
+
+
+def _iter_csv_records(lines):
+    header = None
+    index = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            values = next(csv.reader([line.decode('utf-8')]))
+        except (UnicodeDecodeError, csv.Error):
+            if header is None:
+                raise ValueError('CSV header row could not be parsed')
+            yield index, None, 'Invalid CSV row'
+            index += 1
+            continue
+        if header is None:
+            header = [value.strip() for value in values]
+            continue
+        yield index, dict(zip(header, values)), None
+        index += 1
+
+
+def format_rows(rows, output_format):
+    """Serialize a list of output row dicts as one NDJSON or CSV block"""
+    if output_format == CSV:
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=OUTPUT_FIELDS, extrasaction='ignore', lineterminator='\n')
+        writer.writerows(_flatten(row) for row in rows)
+        return buffer.getvalue()
+    return b''.join(dumps(row) + b'\n' for row in rows).decode('utf-8')
+
+
+def csv_header():
+    """Header line for CSV output"""
+    return ','.join(OUTPUT_FIELDS) + '\n'
+
+
+def _flatten(row):
+    flat = dict(row)
+    flat.update(flat.pop('input', None) or {})
+    return flat
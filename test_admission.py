@@ -0,0 +1,57 @@
+import multiprocessing
+
+import pytest
+
+from admission import InFlightTracker, TokenBucketLimiter, queue_wait
+
+
+def test_queue_wait_units():
+    now = 1700000010.0
+    assert queue_wait('t=1700000000.000', now) == pytest.approx(10.0)
+    assert queue_wait('t=1700000000000', now) == pytest.approx(10.0)
+    assert queue_wait('1700000000000000', now) == pytest.approx(10.0)
+    assert queue_wait('t=1700000020', now) == 0.0
+    assert queue_wait('garbage', now) is None and queue_wait(None, now) is None
+
+
+def test_token_bucket_refills_at_rate():
+    limiter = TokenBucketLimiter(rate=10, burst=3, buckets=64)
+    assert [limiter.acquire('a', now=1000.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.acquire('a', now=1000.0) == pytest.approx(0.1)
+    # Other clients have their own bucket
+    assert limiter.acquire('b', now=1000.0) == 0.0
+    assert limiter.acquire('a', now=1000.1) == 0.0
+
+
+def _hold(tracker, entered, release):
+    tracker.try_enter()
+    entered.release()
+    release.acquire()
+    tracker.leave()
+
+
+def test_in_flight_is_counted_across_processes():
+    tracker = InFlightTracker(slots=8)
+    context = multiprocessing.get_context('fork')
+    entered = context.Semaphore(0)
+    releases = [context.Semaphore(0) for _ in range(3)]
+    processes = [context.Process(target=_hold, args=(tracker, entered, release)) for release in releases]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        entered.acquire()
+
+    assert tracker.total() == 3
+    assert not tracker.try_enter(limit=3)
+    releases[0].release()
+    processes[0].join()
+    assert tracker.total() == 2
+
+    # A worker that dies mid-request is cleared by its pid
+    processes[1].kill()
+    processes[1].join()
+    tracker.release(processes[1].pid)
+    assert tracker.total() == 1
+    releases[2].release()
+    processes[2].join()
+    assert tracker.total() == 0
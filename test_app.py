@@ -0,0 +1,632 @@
+import gzip
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import joblib
+import numpy as np
+import pytest
+
+import app as app_module
+import columnar
+import serialization
+from admission import TokenBucketLimiter
+from audit import AuditLog
+from batching import MicroBatcher
+from inference import FEATURES, export_artifact
+from metrics import MetricsRegistry
+from profiler import RequestProfiler
+
+
+@pytest.fixture
+def client():
+    app_module.app.config['TESTING'] = True
+    return app_module.app.test_client()
+
+
+def test_home_is_precompressed_and_cacheable(client):
+    plain = client.get('/')
+    assert plain.status_code == 200
+    assert plain.headers['Vary'] == 'Accept-Encoding'
+    assert 'max-age' in plain.headers['Cache-Control']
+
+    compressed = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(compressed.data) == plain.data
+    assert compressed.headers['ETag'] != plain.headers['ETag']
+
+    revalidated = client.get('/', headers={'Accept-Encoding': 'gzip', 'If-None-Match': compressed.headers['ETag']})
+    assert revalidated.status_code == 304
+    assert revalidated.data == b''
+    assert revalidated.headers['ETag'] == compressed.headers['ETag']
+
+
+def test_predict_single(client):
+    response = client.post('/predict', json={'bedrooms': 3, 'bathrooms': 2, 'sqft': 2000, 'age': 10})
+    assert response.status_code == 200
+    assert response.get_json()['success'] is True
+
+
+def test_fast_serialization_matches_schema(client, monkeypatch):
+    house = {'bedrooms': 3, 'bathrooms': 2, 'sqft': 2000, 'age': 10}
+    response = client.post('/predict', json=house)
+    body = response.get_json()
+    assert set(body) == {'success', 'prediction', 'currency', 'input', 'request_id'}
+    assert body['input'] == {field: float(value) for field, value in house.items()}
+    assert response.headers['X-Frame-Options'] == 'DENY'
+    assert response.headers['Content-Security-Policy'] == "default-src 'self'"
+
+    # The standard library fallback produces the same batch document
+    fast = client.post('/predict/batch', json=[house]).get_json()
+    monkeypatch.setattr(serialization, 'orjson', None)
+    fallback = client.post('/predict/batch', json=[house]).get_json()
+    fast.pop('request_id'), fallback.pop('request_id')
+    assert fast == fallback
+
+
+def test_predictions_are_audited(client, tmp_path, monkeypatch):
+    path = tmp_path / 'audit.jsonl'
+    log = AuditLog(str(path), flush_interval=0.01)
+    monkeypatch.setattr(app_module, 'audit_log', log)
+
+    house = {'bedrooms': 3, 'bathrooms': 2, 'sqft': 2000, 'age': 10}
+    single = client.post('/predict', json=house).get_json()
+    client.post('/predict/batch', json=[house, {'bedrooms': 3}])
+    log.close()
+
+    first, second = [json.loads(line) for line in path.read_text().splitlines()]
+    assert first['endpoint'] == 'predict' and first['request_id'] == single['request_id']
+    assert first['prediction'] == single['prediction'] and first['input']['sqft'] == 2000.0
+    assert first['model_version'] == app_module.engine.version and first['latency_ms'] > 0
+    assert second['endpoint'] == 'predict_batch' and second['count'] == 2 and second['failed'] == 1
+    assert client.get('/health').get_json()['audit_log']['written'] == 2
+
+    # Records lost to a failed write are exported as dropped, like a full queue
+    failing = AuditLog(str(tmp_path / 'missing' / 'audit.jsonl'), flush_interval=0.01,
+                       on_drop=app_module.count_audit_drops)
+    monkeypatch.setattr(app_module, 'audit_log', failing)
+    dropped = app_module.AUDIT_RECORDS.value(('dropped',))
+    client.post('/predict', json=house)
+    failing.close()
+    assert app_module.AUDIT_RECORDS.value(('dropped',)) == dropped + 1
+
+
+def test_get_predict_is_cacheable(client, model_files):
+    house = {'bedrooms': 3, 'bathrooms': 2, 'sqft': 2000, 'age': 10}
+    expected = client.post('/predict', json=house).get_json()['prediction']
+
+    redirect = client.get('/predict?age=10.0&sqft=2000&bedrooms=3&bathrooms=2&utm=x')
+    assert redirect.status_code == 301
+    assert redirect.headers['Location'].endswith('/predict?bedrooms=3&bathrooms=2&sqft=2000&age=10')
+
+    response = client.get('/predict?bedrooms=3&bathrooms=2&sqft=2000&age=10')
+    assert response.status_code == 200
+    assert response.get_json()['prediction'] == expected
+    assert response.headers['Cache-Control'] == 'public, max-age=60'
+    etag = response.headers['ETag']
+
+    revalidated = client.get('/predict?bedrooms=3&bathrooms=2&sqft=2000&age=10', headers={'If-None-Match': etag})
+    assert revalidated.status_code == 304 and revalidated.data == b''
+    assert client.get('/predict?bedrooms=3&bathrooms=2&sqft=2&age=10').status_code == 400
+    assert client.get('/predict?bedrooms=-0&bathrooms=2&sqft=2000&age=10').headers['Location'].endswith(
+        '/predict?bedrooms=0&bathrooms=2&sqft=2000&age=10')
+
+    # Without a registry the model selector changes nothing, so it is not part of the URL
+    dropped = client.get('/predict?bedrooms=3&bathrooms=2&sqft=2000&age=10&model=x')
+    assert dropped.status_code == 301 and dropped.headers['Location'].endswith('/predict?bedrooms=3&bathrooms=2&sqft=2000&age=10')
+
+    # A new model invalidates the ETag
+    retrain_with_offset(model_files[0], 1000)
+    assert app_module.check_for_model_update()
+    changed = client.get('/predict?bedrooms=3&bathrooms=2&sqft=2000&age=10', headers={'If-None-Match': etag})
+    assert changed.status_code == 200 and changed.headers['ETag'] != etag
+    assert changed.get_json()['prediction'] == pytest.approx(expected + 1000)
+
+
+def test_grid_matches_single_predictions(client, monkeypatch):
+    base = {'bedrooms': 3, 'bathrooms': 2, 'age': 10}
+    response = client.post('/predict/grid', json={
+        'base': base, 'vary': {'age': [0, 25], 'sqft': {'min': 1000, 'max': 3000, 'steps': 3}}
+    })
+    assert response.status_code == 200
+    body = response.get_json()
+    # Axes come back in FEATURES order, the first varying slowest
+    assert body['axes'] == {'sqft': [1000.0, 2000.0, 3000.0], 'age': [0.0, 25.0]}
+    for i, sqft in enumerate(body['axes']['sqft']):
+        for j, age in enumerate(body['axes']['age']):
+            single = client.post('/predict', json=dict(base, sqft=sqft, age=age)).get_json()['prediction']
+            assert body['prices'][i][j] == pytest.approx(single, abs=0.01)
+
+    # Linear model: a step along an axis changes the price by the marginal effect
+    effects = body['marginal_effects']
+    assert body['prices'][1][0] - body['prices'][0][0] == pytest.approx(1000 * effects['sqft'], rel=1e-4)
+    assert body['prices'][0][1] - body['prices'][0][0] == pytest.approx(25 * effects['age'], rel=1e-4)
+    sklearn_engine = app_module.build_engine('sklearn', app_module.model, app_module.scaler)
+    assert sklearn_engine.marginal_effects() == pytest.approx(app_module.engine.marginal_effects())
+
+    # A non-linear model still prices the grid, without constant marginal effects
+    from sklearn.tree import DecisionTreeRegressor
+    tree = DecisionTreeRegressor(max_depth=3, random_state=0)
+    tree.fit(app_module.scaler.transform(np.array([[1, 1, 800, 0], [5, 3, 4000, 40]])), [200000.0, 700000.0])
+    monkeypatch.setattr(app_module, 'engine', app_module.build_engine('sklearn', tree, app_module.scaler))
+    nonlinear = client.post('/predict/grid', json={'base': base, 'vary': {'sqft': [1000, 4000]}})
+    assert nonlinear.status_code == 200
+    assert nonlinear.get_json()['marginal_effects'] is None and len(nonlinear.get_json()['prices']) == 2
+    monkeypatch.undo()
+
+    monkeypatch.setitem(app_module.app.config, 'GRID_MAX_POINTS', 50)
+    for vary in ({'sqft': {'min': 1000, 'max': 3000, 'steps': 51}}, {'sqft': [50]}, {'pool': [1]}, {}):
+        assert client.post('/predict/grid', json={'base': base, 'vary': vary}).status_code == 400
+
+
+def test_batch_matches_single_predictions(client):
+    houses = [
+        {'bedrooms': 2, 'bathrooms': 1, 'sqft': 1000, 'age': 20},
+        {'bedrooms': 3, 'bathrooms': 2, 'sqft': 2000, 'age': 10},
+        {'bedrooms': 5, 'bathrooms': 3, 'sqft': 4000, 'age': 5},
+    ]
+    response = client.post('/predict/batch', json={'houses': houses})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['predicted'] == 3 and data['failed'] == 0
+
+    for house, row in zip(houses, data['predictions']):
+        single = client.post('/predict', json=house).get_json()
+        assert row['prediction'] == single['prediction']
+
+
+def test_batch_reports_per_row_errors(client):
+    houses = [
+        {'bedrooms': 3, 'bathrooms': 2, 'sqft': 2000, 'age': 10},
+        {'bedrooms': 3, 'bathrooms': 2, 'sqft': 50},
+        {'bedrooms': 3, 'bathrooms': 2, 'sqft': 50, 'age': 10},
+        'not a house',
+    ]
+    data = client.post('/predict/batch', json=houses).get_json()
+    assert [row['index'] for row in data['predictions']] == [0]
+    assert data['errors'] == [
+        {'index': 1, 'error': 'Validation error', 'message': 'Missing required field: age'},
+        {'index': 2, 'error': 'Validation error', 'message': 'Square footage must be between 100 and 50,000'},
+        {'index': 3, 'error': 'Validation error', 'message': 'Each house must be a JSON object'},
+    ]
+
+
+def test_batch_binary_formats(client):
+    houses = [
+        {'bedrooms': 2, 'bathrooms': 1, 'sqft': 1000, 'age': 20},
+        {'bedrooms': 3, 'bathrooms': 2, 'sqft': 50, 'age': 10},
+        {'bedrooms': 5, 'bathrooms': 3, 'sqft': 4000, 'age': 5},
+    ]
+    expected = {row['index']: row['prediction'] for row in client.post('/predict/batch', json=houses).get_json()['predictions']}
+    matrix = np.array([[house[field] for field in FEATURES] for house in houses], dtype=np.float64)
+
+    response = client.post('/predict/batch', data=columnar.write_npy(matrix), content_type='application/x-npy')
+    assert response.status_code == 200 and response.mimetype == 'application/x-npy'
+    assert response.headers['X-Predicted'] == '2' and response.headers['X-Failed'] == '1'
+    predictions = np.load(io.BytesIO(response.data))
+    assert np.isnan(predictions[1])
+    np.testing.assert_allclose(predictions[[0, 2]], [expected[0], expected[2]], atol=0.005)
+
+    pa = pytest.importorskip('pyarrow')
+    # Workers import pyarrow on their first Arrow body, not at startup
+    probe = "import sys, columnar; assert 'pyarrow' not in sys.modules; assert columnar.available('arrow')"
+    subprocess.run([sys.executable, '-c', probe], check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    table = pa.table({field: matrix[:, j] for j, field in enumerate(FEATURES) if field != 'age'})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    response = client.post('/predict/batch', data=sink.getvalue().to_pybytes(),
+                           content_type='application/vnd.apache.arrow.stream')
+    result = pa.ipc.open_stream(response.data).read_all().to_pydict()
+    assert result['prediction'] == [None, None, None]
+    assert result['error'] == ['Missing required field: age'] * 3
+
+    bad = client.post('/predict/batch', data=b'not numpy', content_type='application/x-npy')
+    assert bad.status_code == 400 and bad.get_json()['error'] == 'Invalid request format'
+    objects = io.BytesIO()
+    np.save(objects, np.array([[object()] * 4], dtype=object), allow_pickle=True)
+    assert client.post('/predict/batch', data=objects.getvalue(), content_type='application/x-npy').status_code == 400
+
+
+def test_batch_payload_limit_is_separate(client):
+    house = {'bedrooms': 3, 'bathrooms': 2, 'sqft': 2000, 'age': 10}
+    houses = [house] * 1000  # well over the 16 KB single-prediction limit
+    assert client.post('/predict/batch', json=houses).status_code == 200
+    assert client.post('/predict', json=dict(house, padding='x' * 20000)).status_code != 200
+
+
+def test_batch_row_limit(client, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, 'BATCH_MAX_ROWS', 2)
+    house = {'bedrooms': 3, 'bathrooms': 2, 'sqft': 2000, 'age': 10}
+    assert client.post('/predict/batch', json=[house] * 3).status_code == 413
+
+
+def test_stream_ndjson(client):
+    body = '\n'.join([
+        '{"bedrooms": 3, "bathrooms": 2, "sqft": 2000, "age": 10}',
+        '{"bedrooms": 3, "bathrooms": 2, "sqft": 50, "age": 10}',
+        'not json',
+        '',
+        '{"bedrooms": 5, "bathrooms": 3, "sqft": 4000, "age": 5}',
+    ])
+    response = client.post('/predict/stream', data=body, content_type='application/x-ndjson')
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [row['index'] for row in rows] == [0, 1, 2, 3]
+    assert rows[0]['prediction'] == client.post('/predict', json=rows[0]['input']).get_json()['prediction']
+    assert rows[1]['message'] == 'Square footage must be between 100 and 50,000'
+    assert rows[2]['message'] == 'Invalid JSON'
+    assert 'prediction' in rows[3]
+
+
+def test_stream_csv_in_chunks(client, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, 'STREAM_CHUNK_ROWS', 2)
+    monkeypatch.setitem(app_module.app.config, 'STREAM_READ_SIZE', 7)
+    body = 'bedrooms,bathrooms,sqft,age\n' + '3,2,2000,10\n' * 5
+    response = client.post('/predict/stream', data=body, content_type='text/csv')
+    lines = response.get_data(as_text=True).splitlines()
+    assert lines[0] == 'index,bedrooms,bathrooms,sqft,age,prediction,error,message'
+    assert len(lines) == 6
+    assert len({line.split(',')[5] for line in lines[1:]}) == 1
+
+
+def test_stream_output_format_override(client):
+    response = client.post(
+        '/predict/stream?format=ndjson',
+        data='bedrooms,bathrooms,sqft,age\n3,2,2000,10\n',
+        content_type='text/csv'
+    )
+    assert response.mimetype == 'application/x-ndjson'
+    assert json.loads(response.get_data(as_text=True))['index'] == 0
+
+
+def test_stream_rejects_unknown_content_type(client):
+    assert client.post('/predict/stream', data='x', content_type='text/plain').status_code == 415
+
+
+def test_prediction_cache_hits_and_reload(client, monkeypatch):
+    monkeypatch.setattr(app_module, 'prediction_cache', app_module.PredictionCache(maxsize=10))
+    house = {'bedrooms': 3, 'bathrooms': 2, 'sqft': 2000, 'age': 10}
+
+    first = client.post('/predict', json=house).get_json()
+    second = client.post('/predict', json=dict(house, bedrooms=3.0)).get_json()
+    assert first['prediction'] == second['prediction']
+
+    stats = client.get('/health').get_json()['cache']
+    assert (stats['hits'], stats['misses'], stats['size']) == (1, 1, 1)
+
+    assert app_module.load_model()
+    assert app_module.prediction_cache.stats()['size'] == 0
+
+
+def test_prediction_cache_eviction_and_ttl(monkeypatch):
+    cache = app_module.PredictionCache(maxsize=2, ttl=60)
+    cache.put('a', 1.0)
+    cache.put('b', 2.0)
+    assert cache.get('a') == 1.0
+    cache.put('c', 3.0)  # evicts 'b', the least recently used
+    assert cache.get('b') is None
+    assert cache.stats()['evictions'] == 1
+
+    now = time.monotonic()
+    monkeypatch.setattr(app_module.time, 'monotonic', lambda: now + 61)
+    assert cache.get('a') is None
+    assert cache.stats()['expirations'] == 1
+
+
+def test_micro_batcher_coalesces_concurrent_rows():
+    calls = []
+
+    def predict_fn(features):
+        calls.append(len(features))
+        time.sleep(0.01)
+        return features.sum(axis=1)
+
+    batcher = MicroBatcher(predict_fn, max_batch_size=8, max_wait_ms=5)
+    rows = [(float(i), 1.0, 1.0, 1.0) for i in range(40)]
+    with ThreadPoolExecutor(max_workers=20) as pool:
+        results = list(pool.map(lambda row: batcher.predict(row, timeout=5), rows))
+
+    assert results == [sum(row) for row in rows]
+    assert batcher.stats()['requests'] == 40
+    assert max(calls) > 1 and max(calls) <= 8
+
+
+def test_micro_batcher_propagates_errors():
+    def predict_fn(features):
+        raise ValueError('boom')
+
+    with pytest.raises(ValueError):
+        MicroBatcher(predict_fn).predict((1.0, 1.0, 1.0, 1.0), timeout=5)
+
+
+def test_predict_through_micro_batcher(client, monkeypatch):
+    monkeypatch.setattr(app_module, 'prediction_cache', app_module.PredictionCache(maxsize=0))
+    house = {'bedrooms': 3, 'bathrooms': 2, 'sqft': 2000, 'age': 10}
+    expected = client.post('/predict', json=house).get_json()['prediction']
+
+    monkeypatch.setattr(app_module, 'micro_batcher', MicroBatcher(app_module.predict_features))
+    assert client.post('/predict', json=house).get_json()['prediction'] == expected
+    assert client.get('/health').get_json()['micro_batching']['requests'] == 1
+
+
+@pytest.fixture
+def model_files(tmp_path, monkeypatch):
+    model_path = tmp_path / 'model.joblib'
+    scaler_path = tmp_path / 'scaler.joblib'
+    shutil.copy('house_price_model.joblib', model_path)
+    shutil.copy('scaler.joblib', scaler_path)
+    monkeypatch.setenv('MODEL_PATH', str(model_path))
+    monkeypatch.setenv('SCALER_PATH', str(scaler_path))
+    monkeypatch.setitem(app_module.app.config, 'MODEL_SETTLE_SECONDS', 0)
+    assert app_module.load_model()
+    yield model_path, scaler_path
+    monkeypatch.undo()
+    assert app_module.load_model()
+
+
+def retrain_with_offset(model_path, offset):
+    model = joblib.load(model_path)
+    model.intercept_ += offset
+    joblib.dump(model, model_path)
+
+
+def test_hot_reload_on_file_change(client, model_files, monkeypatch):
+    model_path, scaler_path = model_files
+    house = {'bedrooms': 3, 'bathrooms': 2, 'sqft': 2000, 'age': 10}
+    before = client.post('/predict', json=house).get_json()['prediction']
+    version = app_module.engine.version
+
+    assert not app_module.check_for_model_update()
+    retrain_with_offset(model_path, 1000)
+    # Just written: the scaler may still be on its way, so nothing is loaded yet
+    monkeypatch.setitem(app_module.app.config, 'MODEL_SETTLE_SECONDS', 60)
+    assert not app_module.check_for_model_update()
+    assert app_module.engine.version == version
+    settled = time.time() - 120
+    for path in model_files:
+        os.utime(path, (settled, settled))
+    assert app_module.check_for_model_update()
+
+    assert app_module.engine.version != version
+    assert client.post('/predict', json=house).get_json()['prediction'] == pytest.approx(before + 1000)
+
+
+def test_invalid_model_keeps_previous(model_files):
+    model_path, _ = model_files
+    engine = app_module.engine
+    model_path.write_bytes(b'not a model')
+
+    assert not app_module.check_for_model_update()
+    assert app_module.engine is engine
+    # The rejected files are not retried until they change again
+    assert not app_module.check_for_model_update()
+
+
+def test_artifact_format_serves_same_prices(client, tmp_path, monkeypatch):
+    house = {'bedrooms': 3, 'bathrooms': 2, 'sqft': 2000, 'age': 10}
+    expected = client.post('/predict', json=house).get_json()['prediction']
+
+    artifact_path = tmp_path / 'model.json'
+    shutil.copy('house_price_model.json', artifact_path)
+    monkeypatch.setitem(app_module.app.config, 'MODEL_FORMAT', 'artifact')
+    monkeypatch.setenv('ARTIFACT_PATH', str(artifact_path))
+    monkeypatch.setitem(app_module.app.config, 'MODEL_SETTLE_SECONDS', 0)
+    try:
+        assert app_module.load_model()
+        assert app_module.model is None and app_module.engine.name == 'fused'
+        assert client.get('/health').get_json()['model_format'] == 'artifact'
+        assert client.post('/predict', json=house).get_json()['prediction'] == expected
+
+        # A corrupted artifact is rejected and the loaded one keeps serving
+        artifact_path.write_text(artifact_path.read_text().replace('"intercept": ', '"intercept": 1'))
+        assert not app_module.check_for_model_update()
+        assert client.post('/predict', json=house).get_json()['prediction'] == expected
+    finally:
+        monkeypatch.undo()
+        assert app_module.load_model()
+
+
+def test_model_registry_routes_requests(client, tmp_path, monkeypatch):
+    house = {'bedrooms': 3, 'bathrooms': 2, 'sqft': 2000, 'age': 10}
+    expected = client.post('/predict', json=house).get_json()['prediction']
+
+    model, scaler = joblib.load('house_price_model.joblib'), joblib.load('scaler.joblib')
+    model.intercept_ += 1000
+    export_artifact(model, scaler, tmp_path / 'plus1000.json')
+    shutil.copy('house_price_model.json', tmp_path / 'baseline.json')
+    (tmp_path / 'registry.json').write_text(json.dumps({
+        'models': {'baseline': 'baseline.json', 'plus1000': 'plus1000.json'},
+        'routes': {'default': {'baseline': 1, 'plus1000': 1}, 'experiment': {'plus1000': 1}},
+    }))
+    monkeypatch.setitem(app_module.app.config, 'MODEL_REGISTRY', str(tmp_path / 'registry.json'))
+    try:
+        assert app_module.load_model()
+        health = client.get('/health').get_json()
+        assert health['model_format'] == 'registry'
+        assert set(health['model_registry']['models']) == {'baseline', 'plus1000'}
+
+        response = client.post('/predict', json=dict(house, model='plus1000'))
+        assert response.headers['X-Model'] == 'plus1000'
+        assert response.get_json()['prediction'] == pytest.approx(expected + 1000)
+        batch = client.post('/predict/batch', json=[house], headers={'X-Model': 'experiment'})
+        assert batch.headers['X-Model'] == 'plus1000'
+        assert batch.get_json()['predictions'][0]['prediction'] == pytest.approx(expected + 1000)
+
+        # The A/B split is sticky for a routing key
+        arms = {client.post('/predict', json=house, headers={'X-Routing-Key': 'user-7'}).headers['X-Model'] for _ in range(5)}
+        assert len(arms) == 1
+
+        # GET picks the model from the URL only: X-Model is redirected into it
+        url = '/predict?bedrooms=3&bathrooms=2&sqft=2000&age=10'
+        moved = client.get(url, headers={'X-Model': 'plus1000'})
+        assert moved.status_code == 302 and moved.headers['Location'].endswith(url + '&model=plus1000')
+        assert 'public' not in moved.headers['Cache-Control'] and moved.headers['Vary'] == 'X-Model'
+        explicit = client.get(moved.headers['Location'])
+        assert explicit.get_json()['prediction'] == pytest.approx(expected + 1000)
+        assert explicit.headers['Cache-Control'] == 'public, max-age=60' and explicit.headers['Vary'] == 'X-Model'
+        # Model names that need percent-encoding redirect once, to a URL that is its own canonical form
+        for model_name, expected_query in (('a%20b', 'model=a%20b'), ('a+b', 'model=a%20b'), ('x%26y', 'model=x%26y')):
+            location = client.get(f'{url}&model={model_name}').headers.get('Location', f'{url}&model={model_name}')
+            assert location.endswith(expected_query)
+            assert client.get(location).get_json()['error'] == 'Unknown model'
+        # Naming the default route is the same URL as naming nothing
+        assert client.get(url + '&model=default').headers['Location'].endswith(url)
+        # Without a model the default route is a split: per user, never shared
+        for routed in (client.get(url), client.get(url, headers={'X-Routing-Key': 'user-7', 'X-Model': 'default'})):
+            assert routed.headers['Cache-Control'] == 'private, no-cache'
+            assert routed.headers['Vary'] == 'X-Model, X-Routing-Key'
+
+        unknown = client.post('/predict', json=dict(house, model='nope'))
+        assert unknown.status_code == 400 and unknown.get_json()['error'] == 'Unknown model'
+    finally:
+        monkeypatch.undo()
+        assert app_module.load_model()
+    assert app_module.model_registry is None
+
+
+def test_admin_reload(client, model_files, monkeypatch):
+    assert client.post('/admin/reload').status_code == 404
+
+    monkeypatch.setitem(app_module.app.config, 'ADMIN_TOKEN', 's3cret')
+    assert client.post('/admin/reload', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+
+    retrain_with_offset(model_files[0], 1000)
+    response = client.post('/admin/reload', headers={'Authorization': 'Bearer s3cret'})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['model_version'] != data['previous_version']
+
+    # Another worker's reload bumps the shared generation: this one follows on its next request
+    generation = app_module.MODEL_RELOAD_GENERATION.value()
+    assert data['reload_generation'] == generation
+    reloads = []
+    monkeypatch.setattr(app_module, 'load_model', lambda: reloads.append(1) or True)
+    client.get('/health')
+    assert reloads == []
+    app_module.MODEL_RELOAD_GENERATION.set(generation + 1)
+    client.get('/health')
+    client.get('/health')
+    assert reloads == [1]
+
+
+def test_admission_control_sheds_load(client, monkeypatch):
+    house = {'bedrooms': 3, 'bathrooms': 2, 'sqft': 2000, 'age': 10}
+    monkeypatch.setitem(app_module.app.config, 'ADMISSION_MAX_QUEUE_WAIT_MS', 500)
+    stale = client.post('/predict', json=house, headers={'X-Request-Start': 't=1'})
+    assert stale.status_code == 503 and stale.headers['Retry-After'] == '1'
+    assert stale.get_json()['error'] == 'Service overloaded'
+    assert client.post('/predict', json=house, headers={'X-Request-Start': f't={time.time():.3f}'}).status_code == 200
+
+    monkeypatch.setattr(app_module, 'rate_limiter', TokenBucketLimiter(rate=1, burst=2))
+    statuses = [client.post('/predict', json=house).status_code for _ in range(3)]
+    assert statuses == [200, 200, 429]
+    monkeypatch.setitem(app_module.app.config, 'RATE_LIMIT_KEY_HEADER', 'X-API-Key')
+    assert client.post('/predict', json=house, headers={'X-API-Key': 'other'}).status_code == 200
+    monkeypatch.setattr(app_module, 'rate_limiter', None)
+
+    # Nothing left in flight, so a limit of one admits one request at a time
+    assert app_module.in_flight.total() == 0
+    monkeypatch.setitem(app_module.app.config, 'ADMISSION_MAX_IN_FLIGHT', 1)
+    assert client.post('/predict', json=house).status_code == 200
+    assert app_module.in_flight.try_enter()
+    try:
+        assert client.post('/predict', json=house).status_code == 503
+    finally:
+        app_module.in_flight.leave()
+    assert client.get('/health').status_code == 200
+
+    admission = client.get('/health').get_json()['admission']
+    assert admission['max_in_flight'] == 1 and admission['in_flight'] == 0
+    assert all(admission['rejected'][reason] >= 1 for reason in ('queue_wait', 'rate_limit', 'in_flight'))
+    assert 'house_price_admission_rejections_total{reason="rate_limit"}' in client.get('/metrics').get_data(as_text=True)
+
+
+def test_request_profiling(client, tmp_path, monkeypatch):
+    house = {'bedrooms': 3, 'bathrooms': 2, 'sqft': 2000, 'age': 10}
+    profiler = RequestProfiler(str(tmp_path / 'profile.folded'), dump_every=2)
+    monkeypatch.setattr(app_module, 'profiler', profiler)
+    monkeypatch.setitem(app_module.app.config, 'ADMIN_TOKEN', 's3cret')
+    admin = {'Authorization': 'Bearer s3cret'}
+
+    # X-Profile is ignored without the admin token
+    client.post('/predict', json=house, headers={'X-Profile': '1'})
+    assert profiler.requests == 0
+    client.post('/predict', json=house, headers=dict(admin, **{'X-Profile': '1'}))
+    monkeypatch.setitem(app_module.app.config, 'PROFILE_SAMPLE_RATE', 1.0)
+    client.post('/predict/batch', json=[house] * 10)
+    monkeypatch.setitem(app_module.app.config, 'PROFILE_SAMPLE_RATE', 0.0)
+    assert profiler.requests == 2
+
+    assert client.get('/admin/profile').status_code == 401
+    stacks = client.get('/admin/profile', headers=admin).get_data(as_text=True).splitlines()
+    assert all(line.rsplit(' ', 1)[1].isdigit() for line in stacks)
+    assert any(line.startswith('predict;') and ';app.predict;' in line for line in stacks)
+    # Calls into C, such as NumPy, are frames too
+    assert any(';app.predict_batch;' in line and ';numpy.' in line for line in stacks)
+
+    dumped = (tmp_path / f'profile.folded.{os.getpid()}').read_text().splitlines()
+    assert dumped == stacks
+    client.get('/admin/profile?reset=1', headers=admin)
+    assert client.get('/admin/profile', headers=admin).data == b''
+
+
+def test_worker_warm_up_and_memory_report(client, monkeypatch):
+    cache = app_module.prediction_cache.stats()
+    app_module.warm_worker()
+    # Warming scores outside any request: nothing is cached
+    assert app_module.prediction_cache.stats() == cache
+
+    memory = client.get('/health').get_json()['memory']
+    assert memory['pid'] == os.getpid()
+    assert memory['gc_frozen_objects'] >= 0
+    if os.path.exists('/proc/self/smaps_rollup'):
+        assert memory['private_kb'] > 0
+        assert memory['shared_kb'] + memory['private_kb'] == memory['rss_kb']
+        # Probes within the TTL reuse the snapshot instead of reading /proc again
+        monkeypatch.setattr(app_module, 'memory_usage', lambda: pytest.fail('read /proc again'))
+        assert client.get('/health').get_json()['memory'] == memory
+
+
+def test_metrics_endpoint(client):
+    house = {'bedrooms': 3, 'bathrooms': 2, 'sqft': 2000, 'age': 10}
+    client.post('/predict', json=house)
+    client.post('/predict', json={'bedrooms': 3})
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    assert 'house_price_requests_total{endpoint="predict",status="200"}' in text
+    assert 'house_price_requests_total{endpoint="predict",status="400"}' in text
+    assert 'house_price_predict_stage_duration_seconds_bucket{stage="validate",le="+Inf"}' in text
+    assert 'house_price_predict_stage_duration_seconds_quantile{stage="parse",quantile="0.99"}' in text
+    assert 'house_price_model_loads_total{outcome="success"}' in text
+    assert 'house_price_model_requests_total{model="default"}' in text
+
+
+def test_metrics_are_shared_with_forked_workers():
+    registry = MetricsRegistry('test')
+    counter = registry.counter('events_total', 'Events')
+    histogram = registry.histogram('latency_seconds', 'Latency')
+
+    def worker():
+        with registry.lock:
+            counter.inc()
+            histogram.observe(0.003)
+
+    processes = [multiprocessing.get_context('fork').Process(target=worker) for _ in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    assert 'test_events_total 4' in registry.expose()
+    assert histogram.snapshot()[2] == 4
+    assert 0.0025 <= histogram.quantile(0.5) <= 0.005
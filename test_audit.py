@@ -0,0 +1,106 @@
+import builtins
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import threading
+
+import audit
+from audit import AuditLog
+
+
+def read_records(path):
+    records = []
+    for name in sorted(path.parent.glob(path.name + '*')):
+        if not name.name.endswith('.lock'):
+            records.extend(json.loads(line) for line in name.read_text().splitlines())
+    return records
+
+
+def test_records_are_written_in_batches(tmp_path):
+    path = tmp_path / 'audit.jsonl'
+    written = []
+    log = AuditLog(str(path), batch_size=10, flush_interval=0.05, on_write=written.append)
+    for i in range(25):
+        assert log.record({'i': i})
+    log.close()
+
+    assert [record['i'] for record in read_records(path)] == list(range(25))
+    assert sum(written) == 25 and max(written) <= 10
+    assert log.stats()['dropped'] == 0
+
+
+def test_full_queue_drops_instead_of_blocking(tmp_path):
+    log = AuditLog(str(tmp_path / 'audit.jsonl'), max_queue=2, batch_size=1, flush_interval=0)
+    release = threading.Event()
+    original = log._write_batch
+    log._write_batch = lambda batch: (release.wait(), original(batch))
+
+    results = [log.record({'i': i}) for i in range(10)]
+    assert results.count(False) >= 7
+    assert log.stats()['dropped'] == results.count(False)
+    release.set()
+    log.close()
+
+
+def _write_from_process(path, offset):
+    log = AuditLog(path, batch_size=7, flush_interval=0.01, max_bytes=2000, backup_count=100)
+    for i in range(300):
+        log.record({'worker': offset, 'i': i, 'padding': 'x' * 20})
+    log.close()
+
+
+def test_failed_writes_are_reported_as_drops(tmp_path):
+    written, dropped = [], []
+    # The directory does not exist, so every batch write fails
+    log = AuditLog(str(tmp_path / 'missing' / 'audit.jsonl'), batch_size=5, flush_interval=0.01,
+                   on_write=written.append, on_drop=dropped.append)
+    for i in range(12):
+        assert log.record({'i': i})
+    log.close()
+
+    assert written == [] and sum(dropped) == 12
+    stats = log.stats()
+    assert stats['dropped'] == 12 and stats['write_errors'] == len(dropped)
+
+
+def test_processes_share_file_with_rotation(tmp_path):
+    path = tmp_path / 'audit.jsonl'
+    context = multiprocessing.get_context('fork')
+    processes = [context.Process(target=_write_from_process, args=(str(path), n)) for n in range(3)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(30)
+
+    records = read_records(path)
+    assert len(records) == 900
+    for n in range(3):
+        assert sorted(record['i'] for record in records if record['worker'] == n) == list(range(300))
+    rotated = [name for name in tmp_path.iterdir() if name.suffix.lstrip('.').isdigit()]
+    assert rotated and all(name.stat().st_size <= 2000 for name in rotated)
+
+
+def test_works_without_fcntl(tmp_path, monkeypatch):
+    # Importing the app must not need fcntl (Windows); the writer falls back
+    probe = "import sys; sys.modules['fcntl'] = None; import app"
+    subprocess.run([sys.executable, '-W', 'ignore', '-c', probe], check=True, capture_output=True,
+                   cwd=os.path.dirname(os.path.abspath(__file__)))
+
+    real_import = builtins.__import__
+
+    def no_fcntl(name, *args, **kwargs):
+        if name in ('fcntl', 'msvcrt'):
+            raise ImportError(name)
+        return real_import(name, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, '__import__', no_fcntl)
+    lock, unlock = audit._file_locking()
+    monkeypatch.undo()
+    log = AuditLog(str(tmp_path / 'audit.jsonl'), flush_interval=0.01)
+    log._lock_file, log._unlock_file = lock, unlock
+    for i in range(3):
+        log.record({'i': i})
+    log.close()
+    assert [record['i'] for record in read_records(tmp_path / 'audit.jsonl')] == [0, 1, 2]
@@ -0,0 +1,45 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from generate_data import COLUMNS, generate, generate_chunk
+from incremental import iter_training_chunks
+
+
+def load_shards(path):
+    return np.concatenate(list(iter_training_chunks(str(path), 10_000)))
+
+
+def test_output_depends_only_on_seed_and_chunking(tmp_path):
+    serial = generate(str(tmp_path / 'serial'), 2500, chunk_size=1000, file_format='npy', workers=1)
+    parallel = generate(str(tmp_path / 'parallel'), 2500, chunk_size=1000, file_format='npy', workers=3)
+    assert [shard['rows'] for shard in serial['shards']] == [1000, 1000, 500]
+    np.testing.assert_array_equal(load_shards(tmp_path / 'serial'), load_shards(tmp_path / 'parallel'))
+
+    manifest = json.loads((tmp_path / 'serial' / 'manifest.json').read_text())
+    assert manifest['rows'] == 2500 and manifest['columns'] == COLUMNS
+
+    other_seed = generate(str(tmp_path / 'other'), 2500, chunk_size=1000, file_format='npy', seed=7, workers=1)
+    assert other_seed['seed'] == 7
+    assert not np.array_equal(load_shards(tmp_path / 'serial'), load_shards(tmp_path / 'other'))
+
+
+def test_chunks_are_independent_and_in_range():
+    first, second = generate_chunk(42, 0, 5000), generate_chunk(42, 1, 5000)
+    assert not np.array_equal(first['price'], second['price'])
+    np.testing.assert_array_equal(first['sqft'], generate_chunk(42, 0, 5000)['sqft'])
+    assert first['bedrooms'].min() >= 1 and first['bedrooms'].max() <= 5
+    assert first['sqft'].min() >= 800 and first['sqft'].max() < 5000
+
+
+@pytest.mark.parametrize('file_format', ['csv', 'parquet'])
+def test_tabular_shards_match_npy(tmp_path, file_format):
+    if file_format == 'parquet':
+        pytest.importorskip('pyarrow')
+    generate(str(tmp_path / 'npy'), 1200, chunk_size=500, file_format='npy', workers=1)
+    generate(str(tmp_path / file_format), 1200, chunk_size=500, file_format=file_format, workers=1)
+    np.testing.assert_allclose(load_shards(tmp_path / file_format), load_shards(tmp_path / 'npy'), rtol=1e-15)
+    if file_format == 'csv':
+        assert list(pd.read_csv(tmp_path / 'csv' / 'part-00000.csv').columns) == COLUMNS
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from sklearn.linear_model import LinearRegression
+from sklearn.preprocessing import StandardScaler
+
+from incremental import MomentAccumulator, holdout_mask, train_streaming
+from inference import FEATURES
+from train_model import make_dataset
+
+
+@pytest.fixture(scope='module')
+def dataset():
+    return make_dataset()
+
+
+def test_streaming_fit_matches_in_memory_fit(dataset, tmp_path):
+    path = tmp_path / 'houses.csv'
+    dataset.to_csv(path, index=False)
+    model, scaler, report = train_streaming(str(path), chunk_size=97, test_fraction=0)
+
+    expected_scaler = StandardScaler().fit(dataset[FEATURES])
+    scaled = expected_scaler.transform(dataset[FEATURES])
+    expected_model = LinearRegression().fit(scaled, dataset['price'])
+
+    np.testing.assert_allclose(scaler.mean_, expected_scaler.mean_, rtol=1e-12)
+    np.testing.assert_allclose(scaler.scale_, expected_scaler.scale_, rtol=1e-12)
+    np.testing.assert_allclose(model.coef_, expected_model.coef_, rtol=1e-10)
+    assert model.intercept_ == pytest.approx(expected_model.intercept_, rel=1e-12)
+    assert report['train_r2'] == pytest.approx(expected_model.score(scaled, dataset['price']), rel=1e-10)
+    np.testing.assert_allclose(
+        model.predict(scaler.transform(dataset[FEATURES])), expected_model.predict(scaled), rtol=1e-10
+    )
+
+
+def test_holdout_split_is_independent_of_chunking(dataset, tmp_path):
+    path = tmp_path / 'houses.npy'
+    np.save(path, dataset[FEATURES + ['price']].to_numpy(dtype=np.float64))
+
+    _, _, small = train_streaming(str(path), chunk_size=33)
+    model, scaler, large = train_streaming(str(path), chunk_size=1000)
+    assert small['test_rows'] == large['test_rows'] == int(holdout_mask(np.arange(1000), 0.2).sum())
+    assert small['test_r2'] == pytest.approx(large['test_r2'], rel=1e-12)
+
+    # Holdout R² from sufficient statistics equals scoring the held-out rows
+    test = dataset[holdout_mask(np.arange(len(dataset)), 0.2)]
+    assert large['test_r2'] == pytest.approx(model.score(scaler.transform(test[FEATURES]), test['price']), rel=1e-10)
+
+
+def test_non_finite_rows_are_skipped(dataset, tmp_path):
+    data = dataset[FEATURES + ['price']].to_numpy(dtype=np.float64)
+    data[[3, 10], 2] = np.nan
+    path = tmp_path / 'houses.npy'
+    np.save(path, data)
+    _, _, report = train_streaming(str(path), chunk_size=100, test_fraction=0)
+    assert report['skipped_rows'] == 2
+    assert report['train_rows'] == len(data) - 2
+
+
+def test_merged_accumulators_match_single_pass():
+    rows = np.random.default_rng(0).normal(size=(500, 3)) * [1, 100, 1e4] + [5, -3, 1e6]
+    single = MomentAccumulator(3)
+    single.update(rows)
+    left, right = MomentAccumulator(3), MomentAccumulator(3)
+    left.update(rows[:123])
+    right.update(rows[123:])
+    left.merge(right)
+
+    assert left.count == 500
+    np.testing.assert_allclose(left.mean, rows.mean(axis=0), rtol=1e-12)
+    np.testing.assert_allclose(left.comoment, single.comoment, rtol=1e-10)
+    np.testing.assert_allclose(single.comoment / 500, np.cov(rows.T, bias=True), rtol=1e-10)
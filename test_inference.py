@@ -0,0 +1,95 @@
+import joblib
+import numpy as np
+import pytest
+from sklearn.linear_model import Ridge
+from sklearn.preprocessing import FunctionTransformer, MaxAbsScaler, MinMaxScaler, RobustScaler
+
+from inference import FusedLinearEngine, SklearnEngine, build_engine, export_artifact, read_artifact
+
+
+@pytest.fixture(scope='module')
+def artifacts():
+    return joblib.load('house_price_model.joblib'), joblib.load('scaler.joblib')
+
+
+def random_houses(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        rng.integers(0, 21, n),
+        rng.integers(0, 31, n) / 2,
+        rng.uniform(100, 50000, n),
+        rng.uniform(0, 200, n),
+    ]).astype(np.float64)
+
+
+def test_fused_engine_matches_sklearn(artifacts):
+    model, scaler = artifacts
+    features = random_houses(10000)
+
+    expected = SklearnEngine.from_sklearn(model, scaler).predict(features)
+    actual = FusedLinearEngine.from_sklearn(model, scaler).predict(features)
+
+    np.testing.assert_allclose(actual, expected, rtol=1e-12, atol=1e-6)
+    # Served prices are rounded to cents and must be identical
+    np.testing.assert_array_equal(np.round(actual, 2), np.round(expected, 2))
+
+
+def test_fused_engine_single_row(artifacts):
+    model, scaler = artifacts
+    row = np.array([[3.0, 2.0, 2000.0, 10.0]])
+    expected = model.predict(scaler.transform(row))
+    np.testing.assert_allclose(build_engine('fused', model, scaler).predict(row), expected, rtol=1e-12)
+
+
+def test_unknown_engine(artifacts):
+    with pytest.raises(ValueError):
+        build_engine('onnx', *artifacts)
+
+
+def test_fused_engine_requires_linear_model(artifacts):
+    _, scaler = artifacts
+    with pytest.raises(ValueError):
+        FusedLinearEngine.from_sklearn(object(), scaler)
+
+
+def test_artifact_round_trip_is_exact(artifacts, tmp_path):
+    model, scaler = artifacts
+    path = tmp_path / 'model.json'
+    export_artifact(model, scaler, path, {'note': 'test'})
+
+    features = random_houses(1000)
+    expected = FusedLinearEngine.from_sklearn(model, scaler).predict(features)
+    actual = FusedLinearEngine.from_artifact(read_artifact(path)).predict(features)
+    np.testing.assert_array_equal(actual, expected)
+
+
+def test_artifact_rejects_tampering(artifacts, tmp_path):
+    model, scaler = artifacts
+    path = tmp_path / 'model.json'
+    export_artifact(model, scaler, path)
+    path.write_text(path.read_text().replace('"format_version": 1', '"format_version": 2'))
+    with pytest.raises(ValueError, match='Unsupported artifact version'):
+        read_artifact(path)
+
+    export_artifact(model, scaler, path)
+    path.write_text(path.read_text().replace('"intercept": ', '"intercept": 1'))
+    with pytest.raises(ValueError, match='Checksum mismatch'):
+        read_artifact(path)
+
+
+@pytest.mark.parametrize('scaler', [RobustScaler(), MinMaxScaler(), MaxAbsScaler()])
+def test_fused_engine_probes_affine_scalers(scaler):
+    features = random_houses(2000)
+    target = features @ np.array([30000.0, 25000.0, 150.0, -2000.0]) + 50000.0
+    scaled = scaler.fit_transform(features)
+    model = Ridge(alpha=1.0).fit(scaled, target)
+
+    expected = model.predict(scaler.transform(features))
+    np.testing.assert_allclose(FusedLinearEngine.from_sklearn(model, scaler).predict(features), expected, rtol=1e-9)
+
+
+def test_fused_engine_rejects_non_affine_scaler():
+    scaler = FunctionTransformer(np.log1p).fit(random_houses(10))
+    model = Ridge().fit(scaler.transform(random_houses(100)), np.arange(100.0))
+    with pytest.raises(ValueError, match='affine'):
+        build_engine('fused', model, scaler)
@@ -0,0 +1,64 @@
+import json
+
+import numpy as np
+import pytest
+
+from inference import FusedLinearEngine, read_artifact
+from model_registry import ModelRegistry, read_manifest
+
+
+def write_manifest(tmp_path, manifest):
+    path = tmp_path / 'registry.json'
+    path.write_text(json.dumps(manifest))
+    return str(path)
+
+
+@pytest.fixture
+def registry():
+    artifact = read_artifact('house_price_model.json')
+    shifted = dict(artifact, intercept=artifact['intercept'] + 1000)
+    return ModelRegistry(
+        {'a': artifact, 'b': shifted},
+        {'default': {'a': 3, 'b': 1}, 'only-b': {'b': 1}},
+        versions={'a': 'v1', 'b': 'v2'}
+    )
+
+
+def test_manifest_is_checked(tmp_path):
+    models = {'a': 'a.json', 'b': 'b.json'}
+    manifest = read_manifest(write_manifest(tmp_path, {'models': models}))
+    assert manifest['models']['a'] == str(tmp_path / 'a.json')
+    assert manifest['routes'] == {'default': {'a': 1}}
+
+    for routes, message in (
+        ({'west': {'a': 1}}, "no 'default' route"),
+        ({'default': {'c': 1}}, 'unknown models: c'),
+        ({'default': {'a': 1}, 'b': {'a': 1}}, 'same name as a model'),
+        ({'default': {'a': 0}}, 'positive total'),
+    ):
+        with pytest.raises(ValueError, match=message):
+            read_manifest(write_manifest(tmp_path, {'models': models, 'routes': routes}))
+
+
+def test_engines_share_one_read_only_block(registry):
+    features = np.array([[3.0, 2.0, 2000.0, 10.0], [5.0, 3.0, 4000.0, 5.0]])
+    expected = FusedLinearEngine.from_artifact(read_artifact('house_price_model.json')).predict(features)
+
+    assert not registry.weights.flags.writeable
+    for engine in registry.engines.values():
+        assert np.shares_memory(engine.coef, registry.weights)
+    np.testing.assert_array_equal(registry.engines['a'].predict(features), expected)
+    np.testing.assert_allclose(registry.engines['b'].predict(features), expected + 1000)
+
+
+def test_routing(registry):
+    assert registry.route('b')[0] == 'b'
+    assert registry.route('only-b')[0] == 'b'
+    assert registry.route('missing') is None and registry.route(['a']) is None
+    assert registry.primary is registry.engines['a']
+
+    # Weighted split: sticky per routing key, close to the weights overall
+    assert len({registry.route(None, 'user-42')[0] for _ in range(20)}) == 1
+    picks = [registry.route(None, f'user-{i}')[0] for i in range(4000)]
+    assert picks.count('b') / len(picks) == pytest.approx(0.25, abs=0.03)
+    assert registry.stats()['routes']['default'] == {'a': 0.75, 'b': 0.25}
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+import model_selection
+from inference import FEATURES, build_engine
+from train_model import make_dataset, select_and_train
+
+GRID = {
+    'scalers': {'standard': [{}], 'robust': [{}]},
+    'regressors': {'linear': [{}], 'ridge': [{'alpha': 1.0}, {'alpha': 1000.0}]},
+}
+
+
+@pytest.fixture(scope='module')
+def data():
+    df = make_dataset()
+    return df[FEATURES].to_numpy(dtype=np.float64), df['price'].to_numpy(dtype=np.float64)
+
+
+def test_results_do_not_depend_on_worker_count(data):
+    candidates = model_selection.expand_grid(GRID)
+    parallel = model_selection.cross_validate(*data, candidates, folds=4, workers=3)
+    serial = model_selection.cross_validate(*data, candidates, folds=4, workers=1)
+
+    assert len(parallel) == 6
+    assert [r.candidate for r in parallel] == [r.candidate for r in serial]
+    assert [r.r2_mean for r in parallel] == [r.r2_mean for r in serial]
+    assert all(r.wall_seconds >= 0 and r.folds == 4 for r in parallel)
+    # A heavily regularized ridge cannot win on this data
+    assert parallel[-1].candidate.regressor_params == {'alpha': 1000.0}
+
+
+def test_folds_partition_rows():
+    tests = [model_selection.fold_indices(103, 5, 0, fold) for fold in range(5)]
+    assert sorted(np.concatenate([test for _, test in tests]).tolist()) == list(range(103))
+    for train, test in tests:
+        assert len(np.intersect1d(train, test)) == 0 and len(train) + len(test) == 103
+
+
+def test_unknown_grid_entries_are_rejected(tmp_path):
+    path = tmp_path / 'grid.json'
+    path.write_text('{"scalers": {"quantile": [{}]}, "regressors": {"linear": [{}]}}')
+    with pytest.raises(ValueError, match='Unknown scalers: quantile'):
+        model_selection.load_grid(str(path))
+
+
+def test_selected_model_is_servable(data):
+    model, scaler, _, test_score, best = select_and_train(*data, GRID, folds=3, workers=2)
+    assert test_score > 0.85
+    assert type(model) is model_selection.REGRESSORS[best.candidate.regressor]
+
+    features = data[0][:50]
+    fused = build_engine('fused', model, scaler).predict(features)
+    np.testing.assert_allclose(fused, build_engine('sklearn', model, scaler).predict(features), rtol=1e-9)
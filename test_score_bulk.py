@@ -0,0 +1,55 @@
+import joblib
+import numpy as np
+import pandas as pd
+
+import score_bulk
+from inference import FEATURES
+
+
+def expected_prices(features):
+    model = joblib.load('house_price_model.joblib')
+    scaler = joblib.load('scaler.joblib')
+    return model.predict(scaler.transform(features))
+
+
+def sample_features(n=1000):
+    rng = np.random.default_rng(1)
+    return np.column_stack([
+        rng.integers(1, 6, n), rng.integers(1, 4, n), rng.integers(800, 5000, n), rng.integers(0, 50, n)
+    ]).astype(np.float64)
+
+
+def test_score_npy(tmp_path):
+    features = sample_features()
+    np.save(tmp_path / 'houses.npy', features)
+
+    score_bulk.main([str(tmp_path / 'houses.npy'), str(tmp_path / 'out.npy'), '--workers', '2', '--chunk-size', '300'])
+
+    np.testing.assert_allclose(np.load(tmp_path / 'out.npy'), expected_prices(features), rtol=1e-12)
+
+
+def test_score_csv_preserves_rows_and_order(tmp_path):
+    features = sample_features()
+    pd.DataFrame(features, columns=FEATURES).assign(listing_id=range(len(features))).to_csv(tmp_path / 'houses.csv', index=False)
+
+    score_bulk.main([str(tmp_path / 'houses.csv'), str(tmp_path / 'out.csv'), '--workers', '2', '--chunk-size', '300'])
+
+    scored = pd.read_csv(tmp_path / 'out.csv')
+    assert list(scored['listing_id']) == list(range(len(features)))
+    np.testing.assert_allclose(scored['prediction'], expected_prices(features), rtol=1e-12)
+
+
+def test_invalid_rows_have_no_prediction(tmp_path):
+    features = sample_features(10)
+    features[3, 2] = 50  # sqft out of range
+    pd.DataFrame(features, columns=FEATURES).to_csv(tmp_path / 'houses.csv', index=False)
+    np.save(tmp_path / 'houses.npy', features)
+
+    score_bulk.main([str(tmp_path / 'houses.csv'), str(tmp_path / 'out.csv'), '--workers', '1'])
+    score_bulk.main([str(tmp_path / 'houses.npy'), str(tmp_path / 'out.npy'), '--workers', '1'])
+
+    scored = pd.read_csv(tmp_path / 'out.csv', keep_default_na=False)
+    assert scored['error'][3] == 'Square footage must be between 100 and 50,000'
+    assert scored['prediction'][3] == ''
+    assert np.isnan(np.load(tmp_path / 'out.npy')[3])
+    assert np.isfinite(np.delete(np.load(tmp_path / 'out.npy'), 3)).all()
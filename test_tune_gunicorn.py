@@ -0,0 +1,22 @@
+from tune_gunicorn import candidate_settings, choose
+
+
+def test_grid_skips_meaningless_combinations():
+    settings = candidate_settings(['sync', 'gthread'], [1, 4], [1, 8], [1], [False, True])
+    # sync: threads fixed at 1; gthread: micro-batching only varies with several threads
+    assert len(settings) == 2 + 2 + 2 * 2
+    assert all(s['threads'] == 1 for s in settings if s['worker_class'] == 'sync')
+    assert not any(
+        s['env']['MICRO_BATCH_ENABLED'] == 'true' for s in settings if s['threads'] == 1
+    )
+
+
+def test_choose_prefers_throughput_within_latency_objective():
+    fast_but_slow_tail = ({'name': 'a'}, {'throughput_rps': 900, 'p99_ms': 80, 'errors': 0})
+    balanced = ({'name': 'b'}, {'throughput_rps': 700, 'p99_ms': 30, 'errors': 0})
+    erroring = ({'name': 'c'}, {'throughput_rps': 1000, 'p99_ms': 10, 'errors': 3})
+    results = [fast_but_slow_tail, balanced, erroring]
+    assert choose(results, p99_ms=50)[0]['name'] == 'b'
+    # Nothing meets the objective: lowest p99 among the error-free settings wins
+    assert choose(results, p99_ms=5)[0]['name'] == 'b'
+    assert choose([erroring, fast_but_slow_tail], p99_ms=5)[0]['name'] == 'a'
@@ -0,0 +1,56 @@
+import itertools
+
+import numpy as np
+
+from inference import FEATURES
+from validation import validate_input, validate_matrix, validate_records
+
+VALID = {'bedrooms': 3, 'bathrooms': 2, 'sqft': 2000, 'age': 10}
+VALUES = [3, 2.5, 0, 20, 21, -1, '3', ' 4 ', 'abc', None, True, 'nan', float('inf'), [1], 150, 50001, '', 200, 201]
+
+
+def sample_records():
+    records = []
+    for field, value in itertools.product(FEATURES, VALUES):
+        records.append(dict(VALID, **{field: value}))
+    for field in FEATURES:
+        records.append({key: value for key, value in VALID.items() if key != field})
+    records.append({'bedrooms': 'abc', 'bathrooms': 2})
+    records.append({'bedrooms': 50, 'bathrooms': 'x', 'sqft': 2000, 'age': 10})
+    records.append({'bedrooms': 50, 'bathrooms': 2, 'sqft': 5, 'age': 10})
+    return records
+
+
+def test_records_match_validate_input():
+    records = sample_records()
+    checked = validate_records(records)
+    errors = dict(checked.errors)
+
+    valid_rows = iter(checked.features.tolist())
+    for index, record in enumerate(records):
+        is_valid, result = validate_input(record)
+        if is_valid:
+            assert checked.valid[index]
+            assert next(valid_rows) == [result[field] for field in FEATURES]
+        else:
+            assert errors[index] == result
+
+
+def test_non_objects_are_reported():
+    checked = validate_records([VALID, 'house', [1, 2]])
+    assert checked.errors == [(1, 'Each house must be a JSON object'), (2, 'Each house must be a JSON object')]
+    assert checked.features.shape == (1, 4)
+
+
+def test_matrix_range_checks():
+    features = np.array([[3, 2, 2000, 10], [3, 2, 50, 10], [np.nan, 2, 2000, 10]], dtype=np.float64)
+    checked = validate_matrix(features)
+    assert checked.valid.tolist() == [True, False, False]
+    assert checked.errors == [
+        (1, 'Square footage must be between 100 and 50,000'),
+        (2, 'Bedrooms must be between 0 and 20'),
+    ]
+
+    # Float matrices that pass are returned without a copy; other dtypes give the same result
+    assert validate_matrix(features[:1]).features.base is features
+    assert validate_matrix(features.astype(np.float32)).errors == checked.errors
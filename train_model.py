@@ -1,60 +1,169 @@
-import pandas as pd
+"""Train the house price model and export its serving artifacts
+
+    python train_model.py                  # train, save joblib files and the JSON artifact
+    python train_model.py --export-only    # re-export the JSON artifact from existing joblib files
+    python train_model.py --stream houses.parquet --chunk-size 500000
+    python train_model.py --stream data/houses          # shard directory from generate_data.py
+    python train_model.py --select --folds 5 --workers 16 [--grid grid.json] [--data houses.parquet]
+
+--stream trains out of core (see incremental.py): the file is read in chunks
+and only O(features²) statistics are kept, so memory does not grow with the
+number of rows. CSV, Parquet and .npy ([FEATURES..., price] columns) are read.
+
+--select cross-validates a grid of scalers and regressors in parallel (see
+model_selection.py), refits the best one on the training split and saves it.
+
+The JSON artifact (see inference.export_artifact) is what the API loads with
+MODEL_FORMAT=artifact, without importing scikit-learn.
+"""
+import argparse
+import time
+from datetime import datetime
+
 import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.linear_model import LinearRegression
 from sklearn.preprocessing import StandardScaler
 import joblib
 
-# Create a simple synthetic house price dataset
-np.random.seed(42)
-n_samples = 1000
-
-# Features: bedrooms, bathrooms, sqft, age
-data = {
-    'bedrooms': np.random.randint(1, 6, n_samples),
-    'bathrooms': np.random.randint(1, 4, n_samples),
-    'sqft': np.random.randint(800, 5000, n_samples),
-    'age': np.random.randint(0, 50, n_samples),
-}
-
-df = pd.DataFrame(data)
-
-# Generate target: house price (simplified formula)
-df['price'] = (
-    50000 +
-    df['bedrooms'] * 30000 +
-    df['bathrooms'] * 25000 +
-    df['sqft'] * 150 +
-    df['age'] * -2000 +
-    np.random.normal(0, 50000, n_samples)
-)
-
-# Prepare features and target
-X = df[['bedrooms', 'bathrooms', 'sqft', 'age']]
-y = df['price']
-
-# Split the data
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-# Scale features
-scaler = StandardScaler()
-X_train_scaled = scaler.fit_transform(X_train)
-X_test_scaled = scaler.transform(X_test)
-
-# Train model
-model = LinearRegression()
-model.fit(X_train_scaled, y_train)
-
-# Evaluate
-train_score = model.score(X_train_scaled, y_train)
-test_score = model.score(X_test_scaled, y_test)
-
-print(f"Training R² Score: {train_score:.4f}")
-print(f"Testing R² Score: {test_score:.4f}")
-
-# Save model and scaler
-joblib.dump(model, 'house_price_model.joblib')
-joblib.dump(scaler, 'scaler.joblib')
-
-print("\nModel and scaler saved successfully!")
-print("Files created: house_price_model.joblib, scaler.joblib")
+import model_selection
+from generate_data import make_dataset
+from incremental import iter_training_chunks, train_streaming
+from inference import FEATURES, export_artifact
+
+
+def train(df):
+    """Fit the scaler and model; returns (model, scaler, train_r2, test_r2)"""
+    # Prepare features and target
+    X = df[FEATURES]
+    y = df['price']
+
+    # Split the data
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+    # Scale features
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
+
+    # Train model
+    model = LinearRegression()
+    model.fit(X_train_scaled, y_train)
+
+    # Evaluate
+    train_score = model.score(X_train_scaled, y_train)
+    test_score = model.score(X_test_scaled, y_test)
+    return model, scaler, train_score, test_score
+
+
+def load_training_data(path=None):
+    """(features, price) arrays from a training file, or from the synthetic dataset"""
+    if path is None:
+        df = make_dataset()
+        return df[FEATURES].to_numpy(dtype=np.float64), df['price'].to_numpy(dtype=np.float64)
+    data = np.concatenate(list(iter_training_chunks(path, 1_000_000)))
+    data = data[np.isfinite(data).all(axis=1)]
+    return data[:, :-1], data[:, -1]
+
+
+def select_and_train(features, target, grid, folds, workers):
+    """Cross-validate the grid, then refit the best candidate on the training split
+
+    Returns (model, scaler, train_r2, test_r2, best CandidateResult).
+    """
+    X_train, X_test, y_train, y_test = train_test_split(features, target, test_size=0.2, random_state=42)
+
+    candidates = model_selection.expand_grid(grid)
+    started = time.perf_counter()
+    results = model_selection.cross_validate(X_train, y_train, candidates, folds=folds, workers=workers)
+    model_selection.print_report(results, time.perf_counter() - started)
+
+    best = results[0]
+    print(f"\nBest candidate: {model_selection.describe(best.candidate)} (CV R² {best.r2_mean:.4f})")
+    model, scaler = model_selection.fit(best.candidate, X_train, y_train)
+    train_score = model.score(scaler.transform(X_train), y_train)
+    test_score = model.score(scaler.transform(X_test), y_test)
+    return model, scaler, train_score, test_score, best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default='house_price_model.joblib', help='Model joblib path')
+    parser.add_argument('--scaler', default='scaler.joblib', help='Scaler joblib path')
+    parser.add_argument('--artifact', default='house_price_model.json', help='JSON serving artifact path')
+    parser.add_argument('--export-only', action='store_true',
+                        help='Skip training and export the artifact from the existing joblib files')
+    parser.add_argument('--stream', metavar='PATH',
+                        help='Train out of core from a CSV, Parquet or .npy file instead of the synthetic data')
+    parser.add_argument('--chunk-size', type=int, default=200_000, help='Rows per chunk with --stream (default: 200,000)')
+    parser.add_argument('--test-fraction', type=float, default=0.2, help='Holdout fraction with --stream (default: 0.2)')
+    parser.add_argument('--select', action='store_true',
+                        help='Pick the best scaler/regressor by parallel k-fold cross-validation')
+    parser.add_argument('--grid', help='JSON grid for --select (default: model_selection.DEFAULT_GRID)')
+    parser.add_argument('--folds', type=int, default=5, help='Cross-validation folds with --select (default: 5)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes for --select (default: all cores)')
+    parser.add_argument('--data', help='Training file for --select (default: the synthetic dataset)')
+    args = parser.parse_args(argv)
+
+    metadata = {'exported_at': datetime.utcnow().isoformat()}
+    if args.export_only:
+        model = joblib.load(args.model)
+        scaler = joblib.load(args.scaler)
+        metadata['source'] = [args.model, args.scaler]
+    elif args.select:
+        features, target = load_training_data(args.data)
+        grid = model_selection.load_grid(args.grid)
+        model, scaler, train_score, test_score, best = select_and_train(
+            features, target, grid, args.folds, args.workers
+        )
+        metadata.update(candidate=model_selection.describe(best.candidate), cv_r2=round(best.r2_mean, 6),
+                        train_r2=round(train_score, 6), test_r2=round(test_score, 6))
+
+        print(f"Training R² Score: {train_score:.4f}")
+        print(f"Testing R² Score: {test_score:.4f}")
+
+        joblib.dump(model, args.model)
+        joblib.dump(scaler, args.scaler)
+        print(f"Files created: {args.model}, {args.scaler}")
+    elif args.stream:
+        model, scaler, report = train_streaming(args.stream, args.chunk_size, args.test_fraction)
+        metadata.update(source=args.stream, rows=report['train_rows'],
+                        train_r2=round(report['train_r2'], 6), test_r2=round(report['test_r2'], 6))
+
+        print(f"Read {report['rows']:,} rows in {report['chunks']} chunks of {report['chunk_size']:,} "
+              f"({report['train_rows']:,} train, {report['test_rows']:,} holdout, {report['skipped_rows']:,} skipped)")
+        print(f"Throughput: {report['rows_per_sec']:,.0f} rows/sec ({report['seconds']:.2f}s, "
+              f"{report['read_seconds']:.2f}s reading)")
+        try:
+            import resource  # Unix only
+        except ImportError:
+            pass
+        else:
+            # ru_maxrss is in KB on Linux
+            print(f"Peak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MB")
+        print(f"Training R² Score: {report['train_r2']:.4f}")
+        print(f"Testing R² Score: {report['test_r2']:.4f}")
+
+        joblib.dump(model, args.model)
+        joblib.dump(scaler, args.scaler)
+        print(f"Files created: {args.model}, {args.scaler}")
+    else:
+        model, scaler, train_score, test_score = train(make_dataset())
+        metadata.update(train_r2=round(train_score, 6), test_r2=round(test_score, 6))
+
+        print(f"Training R² Score: {train_score:.4f}")
+        print(f"Testing R² Score: {test_score:.4f}")
+
+        # Save model and scaler
+        joblib.dump(model, args.model)
+        joblib.dump(scaler, args.scaler)
+
+        print("\nModel and scaler saved successfully!")
+        print(f"Files created: {args.model}, {args.scaler}")
+
+    artifact = export_artifact(model, scaler, args.artifact, metadata)
+    print(f"Serving artifact written to {args.artifact} ({artifact['checksum']})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""Find gunicorn settings for this machine by load-testing the app
+
+    python tune_gunicorn.py                                   # default grid, writes gunicorn_profile.json
+    python tune_gunicorn.py --workers 2,4,8 --threads 1,4,8 --concurrency 64 --p99-ms 25
+    python tune_gunicorn.py --endpoint /predict/batch --duration 10
+
+Every combination of worker class, worker count, threads per worker (gthread
+only), micro-batching (gthread with several threads only) and native
+BLAS/OpenMP threads is started with gunicorn_config.py, warmed up, and loaded
+with the same client mix. The winner is the highest-throughput setting whose
+p99 latency stays within --p99-ms without errors. If no setting meets that,
+the error-free one with the lowest p99 wins; a setting with errors is chosen
+only if every setting had errors, with a warning. It is written as a profile that
+gunicorn_config.py picks up automatically (GUNICORN_PROFILE, default
+gunicorn_profile.json); explicit environment variables still override it.
+"""
+import argparse
+import json
+import os
+import sys
+
+import benchmark
+
+
+def candidate_settings(worker_classes, workers, threads, native_threads, micro_batch):
+    """Expand the grid into gunicorn settings dicts, skipping meaningless combinations"""
+    settings = []
+    for worker_class in worker_classes:
+        # Gunicorn turns a sync worker with threads > 1 into gthread
+        for thread_count in (threads if worker_class == 'gthread' else [1]):
+            batching = micro_batch if worker_class == 'gthread' and thread_count > 1 else [False]
+            for worker_count in workers:
+                for native in native_threads:
+                    for enabled in batching:
+                        settings.append({
+                            'worker_class': worker_class,
+                            'workers': worker_count,
+                            'threads': thread_count,
+                            'native_threads': native,
+                            'env': {'MICRO_BATCH_ENABLED': 'true' if enabled else 'false'},
+                        })
+    return settings
+
+
+def describe(setting):
+    batching = ' +batch' if setting['env']['MICRO_BATCH_ENABLED'] == 'true' else '       '
+    return (f"{setting['worker_class']:<8} workers {setting['workers']:>3} threads {setting['threads']:>3} "
+            f"native {setting['native_threads']:>2}{batching}")
+
+
+def evaluate(setting, concurrency, duration, path, payload):
+    """Start gunicorn with one setting, warm it up and measure it under load"""
+    env = {
+        # Ignore any existing profile while tuning
+        'GUNICORN_PROFILE': '',
+        'GUNICORN_WORKER_CLASS': setting['worker_class'],
+        'GUNICORN_THREADS': str(setting['threads']),
+        'NATIVE_THREADS': str(setting['native_threads']),
+        'MODEL_WATCH_INTERVAL': '0',
+    }
+    env.update(setting['env'])
+    process, port = benchmark.start_server(setting['workers'], env)
+    try:
+        benchmark.drive_load('127.0.0.1', port, concurrency, 1.0, path, payload)
+        result = benchmark.drive_load('127.0.0.1', port, concurrency, duration, path, payload)
+        rss = [benchmark.process_memory(pid).get('rss_kb', 0) for pid in benchmark.child_pids(process.pid)]
+        result['worker_rss_kb'] = sum(rss) / len(rss) if rss else None
+        result['total_rss_kb'] = sum(rss)
+    finally:
+        benchmark.stop_server(process)
+    return result
+
+
+def choose(results, p99_ms):
+    """Pick the best (setting, result) pair; see the module docstring"""
+    within_slo = [
+        (setting, result) for setting, result in results
+        if result['errors'] == 0 and result.get('p99_ms', float('inf')) <= p99_ms
+    ]
+    if within_slo:
+        return max(within_slo, key=lambda pair: pair[1]['throughput_rps'])
+    # A setting that failed requests is never preferred to one that did not
+    return min(results, key=lambda pair: (pair[1]['errors'] > 0, pair[1].get('p99_ms', float('inf'))))
+
+
+def _int_list(text):
+    return [int(value) for value in text.split(',') if value]
+
+
+def main(argv=None):
+    cpus = os.cpu_count() or 1
+    default_workers = ','.join(str(n) for n in sorted({1, cpus, 2 * cpus, 2 * cpus + 1}))
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--worker-classes', default='sync,gthread', help='Comma-separated (default: sync,gthread)')
+    parser.add_argument('--workers', default=default_workers, help=f'Comma-separated worker counts (default: {default_workers})')
+    parser.add_argument('--threads', default='1,4,8', help='Comma-separated gthread thread counts (default: 1,4,8)')
+    parser.add_argument('--native-threads', default='1', help='Comma-separated BLAS/OpenMP threads per worker (default: 1)')
+    parser.add_argument('--micro-batch', default='off,on', help='Micro-batching options for gthread (default: off,on)')
+    parser.add_argument('--concurrency', type=int, default=32, help='Concurrent clients (default: 32)')
+    parser.add_argument('--duration', type=float, default=5.0, help='Seconds measured per setting (default: 5)')
+    parser.add_argument('--endpoint', default='/predict', help='Endpoint to load (default: /predict)')
+    parser.add_argument('--p99-ms', type=float, default=50.0, help='p99 latency objective in ms (default: 50)')
+    parser.add_argument('--output', default='gunicorn_profile.json', help='Profile to write (default: gunicorn_profile.json)')
+    args = parser.parse_args(argv)
+
+    payload = None
+    if args.endpoint == '/predict/batch':
+        payload = [benchmark.SAMPLE_HOUSE] * 100
+
+    settings = candidate_settings(
+        args.worker_classes.split(','), _int_list(args.workers), _int_list(args.threads),
+        _int_list(args.native_threads), [option == 'on' for option in args.micro_batch.split(',')]
+    )
+    print(f"Testing {len(settings)} settings at concurrency {args.concurrency} on {cpus} CPUs", file=sys.stderr)
+
+    results = []
+    for setting in settings:
+        result = evaluate(setting, args.concurrency, args.duration, args.endpoint, payload)
+        results.append((setting, result))
+        print(
+            f"{describe(setting)}  {result['throughput_rps']:>9,.0f} req/s  p50 {result.get('p50_ms', float('nan')):>7.2f} ms  "
+            f"p99 {result.get('p99_ms', float('nan')):>7.2f} ms  errors {result['errors']:>4}  "
+            f"rss/worker {(result['worker_rss_kb'] or 0) / 1024:>6.1f} MB",
+            file=sys.stderr
+        )
+
+    best, measured = choose(results, args.p99_ms)
+    if measured['errors']:
+        print(f"\nWARNING: every setting had errors; {describe(best)} had {measured['errors']}", file=sys.stderr)
+    elif measured.get('p99_ms', float('inf')) > args.p99_ms:
+        print(f"\nWARNING: no setting met p99 <= {args.p99_ms} ms; choosing the lowest p99", file=sys.stderr)
+    profile = {
+        'config': best,
+        'measured': measured,
+        'objective': {'endpoint': args.endpoint, 'concurrency': args.concurrency, 'p99_ms': args.p99_ms},
+        'candidates': [dict(setting, result=result) for setting, result in results],
+        'meta': benchmark.metadata(),
+    }
+    with open(args.output, 'w') as f:
+        json.dump(profile, f, indent=2)
+        f.write('\n')
+    print(f"\nRecommended: {describe(best)} -> {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""Input validation for house records
+
+`validate_input` checks one dict at a time. `validate_columns` and
+`validate_records` apply the same rules to many rows at once as NumPy masks
+and produce exactly the messages `validate_input` would give for each row.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from inference import FEATURES
+
+# (low, high, message) for each feature, checked in FEATURES order
+FEATURE_BOUNDS = {
+    'bedrooms': (0, 20, 'Bedrooms must be between 0 and 20'),
+    'bathrooms': (0, 15, 'Bathrooms must be between 0 and 15'),
+    'sqft': (100, 50000, 'Square footage must be between 100 and 50,000'),
+    'age': (0, 200, 'Age must be between 0 and 200 years'),
+}
+
+NOT_AN_OBJECT = 'Each house must be a JSON object'
+
+# Result of columnar validation:
+#   features - float64 matrix of the valid rows, columns in FEATURES order
+#   valid    - boolean mask over all input rows
+#   errors   - list of (row_index, message) for the invalid rows, in row order
+ColumnarResult = namedtuple('ColumnarResult', ['features', 'valid', 'errors'])
+
+_MISSING = object()
+
+
+def validate_input(data):
+    """Validate input data with proper bounds checking"""
+    # Check for missing fields
+    for field in FEATURES:
+        if field not in data:
+            return False, f'Missing required field: {field}'
+
+    # Validate data types and ranges
+    try:
+        values = {field: float(data[field]) for field in FEATURES}
+
+        # Reasonable bounds checking
+        for field, (low, high, message) in FEATURE_BOUNDS.items():
+            if not (low <= values[field] <= high):
+                return False, message
+
+        return True, values
+
+    except (ValueError, TypeError) as e:
+        return False, f'Invalid data type: {str(e)}'
+
+
+def _to_float_column(values):
+    """Convert one column to float64
+
+    Returns (array, missing_mask, {row: type error message}); missing and
+    invalid values become NaN.
+    """
+    if isinstance(values, np.ndarray) and values.dtype.kind in 'biuf':
+        return values.astype(np.float64, copy=False), np.zeros(len(values), dtype=bool), {}
+
+    if not isinstance(values, list):
+        values = list(values)
+    # Fast path: plain numbers convert exactly as float() would
+    if set(map(type, values)) <= {int, float}:
+        try:
+            return np.array(values, dtype=np.float64), np.zeros(len(values), dtype=bool), {}
+        except OverflowError:
+            pass
+
+    column = np.empty(len(values), dtype=np.float64)
+    missing = np.zeros(len(values), dtype=bool)
+    type_errors = {}
+    for i, value in enumerate(values):
+        if value is _MISSING:
+            column[i] = np.nan
+            missing[i] = True
+            continue
+        try:
+            column[i] = float(value)
+        except (ValueError, TypeError, OverflowError) as e:
+            # OverflowError (huge ints) fails the row here instead of the whole table
+            column[i] = np.nan
+            type_errors[i] = f'Invalid data type: {str(e)}'
+    return column, missing, type_errors
+
+
+def validate_columns(columns, n_rows=None, not_objects=None):
+    """Validate a table given as {field: column} with vectorized masks
+
+    Columns may be NumPy arrays or lists (validate_records marks absent values
+    with a sentinel). `not_objects` optionally flags rows that were not
+    records at all. Each invalid row gets the message validate_input would
+    return: missing fields first, then type errors, then range errors.
+    """
+    if n_rows is None:
+        n_rows = len(next(iter(columns.values()))) if columns else 0
+
+    matrix = np.empty((n_rows, len(FEATURES)), dtype=np.float64)
+    first_missing = np.full(n_rows, -1)
+    first_type_error = {}
+
+    for j, field in enumerate(FEATURES):
+        values = columns.get(field)
+        if values is None:
+            missing = np.ones(n_rows, dtype=bool)
+            matrix[:, j] = np.nan
+        else:
+            matrix[:, j], missing, type_errors = _to_float_column(values)
+            for i, message in type_errors.items():
+                first_type_error.setdefault(i, message)
+        first_missing[missing & (first_missing < 0)] = j
+
+    # Range checks on whole columns; NaN fails them just as in validate_input
+    first_out_of_range = np.full(n_rows, -1)
+    for j, (low, high, _) in enumerate(FEATURE_BOUNDS.values()):
+        column = matrix[:, j]
+        out_of_range = ~((low <= column) & (column <= high)) & (first_out_of_range < 0)
+        first_out_of_range[out_of_range] = j
+
+    # Missing values and type errors are NaN, so they are out of range too
+    invalid = first_out_of_range >= 0
+    if not_objects is not None:
+        invalid |= not_objects
+
+    range_messages = [message for _, _, message in FEATURE_BOUNDS.values()]
+    errors = []
+    for i in np.flatnonzero(invalid):
+        if not_objects is not None and not_objects[i]:
+            message = NOT_AN_OBJECT
+        elif first_missing[i] >= 0:
+            message = f'Missing required field: {FEATURES[first_missing[i]]}'
+        elif i in first_type_error:
+            message = first_type_error[i]
+        else:
+            message = range_messages[first_out_of_range[i]]
+        errors.append((int(i), message))
+
+    valid = ~invalid
+    return ColumnarResult(matrix[valid], valid, errors)
+
+
+def validate_records(records):
+    """Validate a list of record dicts at once (see validate_columns)"""
+    n_rows = len(records)
+    is_object = np.fromiter((isinstance(record, dict) for record in records), dtype=bool, count=n_rows)
+    empty = {}
+    rows = records if is_object.all() else [record if ok else empty for record, ok in zip(records, is_object)]
+    columns = {field: [row.get(field, _MISSING) for row in rows] for field in FEATURES}
+    return validate_columns(columns, n_rows, not_objects=~is_object)
+
+
+def validate_matrix(features):
+    """Range-check a numeric (rows, len(FEATURES)) matrix; returns ColumnarResult
+
+    A float64 matrix is checked in place: when every row is valid the result
+    holds the input itself, not a copy.
+    """
+    features = np.asarray(features)
+    if features.ndim != 2 or features.shape[1] != len(FEATURES):
+        raise ValueError(f"Expected a (rows, {len(FEATURES)}) matrix, got shape {features.shape}")
+    if features.dtype != np.float64:
+        columns = {field: features[:, j] for j, field in enumerate(FEATURES)}
+        return validate_columns(columns, features.shape[0])
+
+    # Same checks and messages as validate_columns, which cannot hit missing
+    # fields or type errors for a float matrix
+    first_out_of_range = np.full(features.shape[0], -1)
+    for j, (low, high, _) in enumerate(FEATURE_BOUNDS.values()):
+        column = features[:, j]
+        out_of_range = ~((low <= column) & (column <= high)) & (first_out_of_range < 0)
+        first_out_of_range[out_of_range] = j
+
+    invalid = first_out_of_range >= 0
+    if not invalid.any():
+        return ColumnarResult(features, ~invalid, [])
+    range_messages = [message for _, _, message in FEATURE_BOUNDS.values()]
+    errors = [(int(i), range_messages[first_out_of_range[i]]) for i in np.flatnonzero(invalid)]
+    return ColumnarResult(features[~invalid], ~invalid, errors)